@@ -11,6 +11,7 @@ using PlayerService.Models;
 using PlayerService.Models.Login;
 using PlayerService.Services;
 using PlayerService.Services.ComponentServices;
+using PlayerService.Utilities;
 using Rumble.Platform.Common.Attributes;
 using Rumble.Platform.Common.Enums;
 using Rumble.Platform.Common.Exceptions;
@@ -482,6 +483,9 @@ public class AccountController : PlatformController
             DeviceInfo device = Optional<DeviceInfo>(Player.FRIENDLY_KEY_DEVICE);
             bool isWeb = device == null;
             sso = Optional<SsoData>("sso")?.ValidateTokens();
+            if (!string.IsNullOrWhiteSpace(sso?.RumbleAccount?.Email))
+                using (RequestTimings.Measure("lockout"))
+                    _lockoutService.EnsureNotLockedOut(sso.RumbleAccount.Email, IpAddress);
             Player player;
             Player[] others = _playerService.FromSso(sso, IpAddress, isWeb);
             Log.Local(Owner.Will, others.FirstOrDefault()?.PlariumAccount?.Id);
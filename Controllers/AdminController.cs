@@ -30,6 +30,10 @@ public class AdminController : PlatformController
 	private readonly PlayerAccountService _playerService;
 	private readonly NameGeneratorService _nameGeneratorService;
 	private readonly ItemService _itemService;
+	private readonly RecordService _recordService;
+	private readonly StorageStatsService _storageStats;
+	private readonly ComponentCacheService _componentCache;
+	private readonly PlayerSearchService _playerSearch;
 
 	// Component Services
 	private readonly AbTestService _abTestService;
@@ -63,7 +67,7 @@ public class AdminController : PlatformController
 		};
 	
 	[HttpPatch, Route("component")]
-	public ActionResult UpdateComponent()
+	public async Task<ActionResult> UpdateComponent()
 	{
 		// TODO: Mock player?
 		Component update = Require<Component>("component");
@@ -76,43 +80,87 @@ public class AdminController : PlatformController
 		if (string.IsNullOrEmpty(update.AccountId))
 			throw new ComponentInvalidException(update.AccountId, reason: "Missing accountId; can not be used for an update.");
 		
-		IClientSessionHandle session = ComponentServices[update.Name].StartTransaction();
-		try
-		{
-			ComponentServices[update.Name].UpdateAsync(update.AccountId, update.Data, session, update.Version).Wait();
-			session.CommitTransaction();
-		}
-		catch (Exception e)
+		ComponentStorage storage = RecordService.ConfiguredStorage;
+		using IClientSessionHandle session = await ComponentServices[update.Name].StartSessionAsync();
+		await session.WithTransactionAsync(async (handle, cancellationToken) =>
 		{
-			session.AbortTransaction();
-			if (e.InnerException is PlatformException platEx)
-				throw platEx;
-			throw;
-		}
+			if (storage != ComponentStorage.Record)
+				await ComponentServices[update.Name].UpdateAsync(update.AccountId, update.Data, handle, update.Version);
+			if (storage != ComponentStorage.Collections)
+				await _recordService.UpdateAsync(update.AccountId, new[] { update }, handle, checkVersions: storage == ComponentStorage.Record);
+			if (update.Name == Component.ACCOUNT)
+				await _summaryService.SyncAccountAsync(update.AccountId, update.Data, handle);
+			return true;
+		});
+		_componentCache.Invalidate(update.AccountId, update.Name);
+		if (update.Name == Component.ACCOUNT)
+			_componentCache.Invalidate(update.AccountId, Component.SUMMARY);
 		
 		return Ok();
 	}
 
+	/// <summary>
+	/// Copies components from the per-component collections into single-document records, and creates the /lookup
+	/// summaries accounts don't have yet.  Either pass specific accountIds, or walk every account in batches: start with
+	/// no "after" and pass the returned "next" until it's null.
+	/// </summary>
+	[HttpPatch, Route("storage/migrate")]
+	public ActionResult MigrateStorage()
+	{
+		string[] accountIds = Optional<string[]>("accountIds");
+		int limit = Math.Clamp(Optional<int?>("limit") ?? 500, 1, 5_000);
+		bool paging = accountIds == null;
+
+		accountIds ??= _accountService.PageAccountIds(Optional<string>("after"), limit).ToArray();
+		long migrated = _recordService.Migrate(accountIds, ComponentServices);
+		_summaryService.Lookup(accountIds, out string[] unsummarized);
+		_summaryService.Create(_playerService.CreateLookupResults(unsummarized));
+
+		return Ok(new
+		{
+			Migrated = migrated,
+			Summarized = unsummarized.Length,
+			Next = paging && accountIds.Length == limit
+				? accountIds.Last()
+				: null
+		});
+	}
+
+	[HttpGet, Route("storage/stats")]
+	public ActionResult StorageStats() => Ok(new
+	{
+		Storage = RecordService.ConfiguredStorage.ToString().ToLower(),
+		Stats = _storageStats.Snapshot(),
+		Cache = _componentCache.Stats()
+	});
+
+	/// <summary>
+	/// Allocation and garbage collection counters for this pod.  Load tests diff two snapshots to see what a run cost.
+	/// </summary>
+	[HttpGet, Route("gc")]
+	public ActionResult GarbageCollection() => Ok(GcStats.Capture());
+
+	/// <summary>
+	/// Per-route phase histograms and operation counters for this pod, in the Prometheus text format.
+	/// </summary>
+	[HttpGet, Route("metrics")]
+	public ContentResult Metrics() => Content(RequestTimings.Prometheus(), "text/plain; version=0.0.4; charset=utf-8");
+
 	[HttpGet, Route("details")]
-	public ActionResult Details()
+	public async Task<ActionResult> Details()
 	{
 		string accountId = Require<string>("accountId");
 		string[] componentNames = Optional<string>("components")?.Split(',') ?? Array.Empty<string>();
 
 		RumbleJson output = new();
 
-		List<Task<Component>> tasks = new ();
-		if (componentNames.Any())
-			foreach (string name in componentNames)
-			{
-				if (!ComponentServices.ContainsKey(name))
-					continue;
-				tasks.Add(ComponentServices[name].LookupAsync(accountId));
-			}
-		Task.WaitAll(tasks.ToArray());
-		foreach (Component c in tasks.Select(task => task.Result))
+		// Admin reads skip the component cache so they always show what's in the database.
+		string[] known = componentNames
+			.Where(name => ComponentServices.ContainsKey(name))
+			.Distinct()
+			.ToArray();
+		foreach (Component c in await _recordService.LookupAsync(accountId, known, RecordService.ConfiguredStorage, ComponentServices))
 			output[c.Name] = c;
-		// output["components"] = tasks.Select(task => task.Result);
 
 		Player player = _playerService.Find(accountId);
 		if (player == null)
@@ -135,7 +183,7 @@ public class AdminController : PlatformController
 		if (string.IsNullOrWhiteSpace(name))
 			throw new InvalidFieldException("screenname", "Field is null or empty.");
 		
-		int affected = _playerService.SyncScreenname(name, accountId, true);
+		int affected = _playerService.ChangeScreennameFromAdmin(accountId, name);
 		
 		// TODO: Invalidate tokens
 
@@ -161,29 +209,59 @@ public class AdminController : PlatformController
 		});
 	}
 
+	/// <summary>
+	/// Adds existing players to the search index in batches: start with no "after" and pass the returned "next" until
+	/// it's null.  Search switches over to the index once the last batch is done.
+	/// </summary>
+	[HttpPatch, Route("search/reindex")]
+	public ActionResult ReindexSearch()
+	{
+		int limit = Math.Clamp(Optional<int?>("limit") ?? 1_000, 1, 10_000);
+
+		return Ok(new
+		{
+			Next = _playerSearch.Reindex(Optional<string>("after"), limit)
+		});
+	}
+
+	/// <summary>
+	/// Copies every component from one account to another, reading and writing whichever layout the storage mode
+	/// calls for, the same way UpdateComponent() does.  The target's versions are left as they are.
+	/// </summary>
 	[HttpPost, Route("clone")]
-	public ActionResult Clone()
+	public async Task<ActionResult> Clone()
 	{
 		PlatformEnvironment.EnforceNonprod();
 
 		string source = Require<string>("sourceAccountId");
 		string target = Require<string>("targetAccountId");
+		ComponentStorage storage = RecordService.ConfiguredStorage;
 
 		try
 		{
-			foreach (ComponentService service in ComponentServices.Select(pair => pair.Value))
-			{
-				Component sourceComponent = service.Lookup(source);
-				Component targetComponent = service.Lookup(target);
+			Component[] copies = (await _recordService.LookupAsync(source, ComponentServices.Keys.ToArray(), storage, ComponentServices))
+				.Select(component => new Component(target, component.Name, component.Data) { Version = 0 })
+				.ToArray();
 
-				targetComponent.Data = sourceComponent.Data;
-				service.Update(targetComponent);
-			}
+			using IClientSessionHandle session = await ComponentServices[Component.ACCOUNT].StartSessionAsync();
+			await session.WithTransactionAsync(async (handle, cancellationToken) =>
+			{
+				if (storage != ComponentStorage.Record)
+					foreach (Component copy in copies)
+						await ComponentServices[copy.Name].UpdateAsync(target, copy.Data, handle, version: null);
+				if (storage != ComponentStorage.Collections)
+					await _recordService.UpdateAsync(target, copies, handle, checkVersions: false);
+				return true;
+			});
 		}
 		catch (Exception e)
 		{
 			throw new PlatformException("Unable to clone account", inner: e);
 		}
+		finally
+		{
+			_componentCache.Invalidate(target, ComponentServices.Keys.ToArray());
+		}
 		return Ok();
 	}
 
@@ -0,0 +1,69 @@
+using System;
+using System.Diagnostics;
+using System.Linq;
+using Microsoft.AspNetCore.Mvc;
+using Microsoft.Extensions.Configuration;
+using MongoDB.Bson;
+using PlayerService.Models;
+using Rumble.Platform.Common.Attributes;
+using Rumble.Platform.Common.Enums;
+using Rumble.Platform.Common.Utilities;
+using Rumble.Platform.Common.Web;
+using Rumble.Platform.Common.Utilities.JsonTools;
+
+namespace PlayerService.Controllers;
+
+/// <summary>
+/// CPU micro-benchmarks for code paths that can't be measured in isolation from the load tests, e.g. how /update reads
+/// its body.  They run inside the service, on the posted data, so they see the same platform parsing a real request
+/// does.  Every route refuses to run in prod, and nothing here writes to the database.
+/// </summary>
+[ApiController, Route("player/v2/admin/benchmark"), RequireAuth(AuthType.ADMIN_TOKEN), IgnorePerformance]
+public class BenchmarkController : PlatformController
+{
+	public BenchmarkController(IConfiguration config) : base(config) { }
+
+	/// <summary>
+	/// Reads the posted /update body's components both ways /update can, many times over, and reports the allocations
+	/// and time per update for each, including serializing the data to BSON as the driver would.  The outer body is
+	/// parsed once by the platform for both, so only the difference between the paths is measured.
+	/// </summary>
+	[HttpPost, Route("update")]
+	public ActionResult Update()
+	{
+		PlatformEnvironment.EnforceNonprod();
+
+		int iterations = Math.Clamp(Optional<int?>("iterations") ?? 1_000, 1, 100_000);
+
+		return Ok(new
+		{
+			Iterations = iterations,
+			RumbleJson = Measure(iterations, () => Require<Component[]>("components")
+				.Sum(component => component.Data?.ToBson().Length ?? 0)
+			),
+			Raw = Measure(iterations, () => Component.ReadRaw(Token?.AccountId, Require<RumbleJson[]>("components"))
+				.Sum(component => component.RawData?.ToBson().Length ?? 0)
+			)
+		});
+	}
+
+	private static object Measure(int iterations, Func<int> update)
+	{
+		int bytes = update();
+
+		long allocated = GC.GetAllocatedBytesForCurrentThread();
+		int collections = GC.CollectionCount(0);
+		long started = Stopwatch.GetTimestamp();
+		for (int i = 0; i < iterations; i++)
+			update();
+		double elapsed = Stopwatch.GetElapsedTime(started).TotalMicroseconds;
+
+		return new
+		{
+			AllocatedBytesPerUpdate = (GC.GetAllocatedBytesForCurrentThread() - allocated) / iterations,
+			MicrosecondsPerUpdate = elapsed / iterations,
+			Gen0Collections = GC.CollectionCount(0) - collections,
+			BsonBytes = bytes
+		};
+	}
+}
@@ -1,5 +1,6 @@
 using System;
 using System.Collections.Generic;
+using System.Diagnostics;
 using System.Diagnostics.CodeAnalysis;
 using System.IO;
 using System.Linq;
@@ -7,6 +8,7 @@ using System.Runtime.Serialization.Formatters.Binary;
 using System.Text;
 using System.Text.Json;
 using System.Threading.Tasks;
+using Microsoft.AspNetCore.Http;
 using Microsoft.AspNetCore.Mvc;
 using Microsoft.Extensions.Configuration;
 using MongoDB.Driver;
@@ -40,6 +42,11 @@ public class TopController : PlatformController
 	private readonly DynamicConfig _dynamicConfig;
 	private readonly ItemService _itemService;
 	private readonly NameGeneratorService _nameGeneratorService;
+	private readonly RecordService _recordService;
+	private readonly StorageStatsService _storageStats;
+	private readonly ComponentCacheService _componentCache;
+	private readonly ClientConfigService _clientConfig;
+	private readonly UpdateCoalescer _coalescer;
 	
 	// Component Services
 	private readonly AbTestService _abTestService;
@@ -55,6 +62,9 @@ public class TopController : PlatformController
 	private readonly WorldService _worldService;
 #pragma warning restore
 	private Dictionary<string, ComponentService> ComponentServices { get; init; }
+
+	public const string CONFIG_STREAM = "streamResponses";
+	public const string CONFIG_RAW_DATA = "rawComponentData";
 	
 	/// <summary>
 	/// Will on 2021.12.16
@@ -104,104 +114,224 @@ public class TopController : PlatformController
 		};
 
 	[HttpPatch, Route("update"), RequireAccountId, HealthMonitor(weight: 10)]
-	public ActionResult Update()
+	public async Task<ActionResult> Update()
 	{
-		IClientSessionHandle session = _itemService.StartTransaction();
-		Component[] components = Require<Component[]>("components");
+		string accountId = Token.AccountId;
+		Component[] components = RawComponentData
+			? Component.ReadRaw(accountId, Require<RumbleJson[]>("components"))
+			: Require<Component[]>("components");
 		Item[] items = Optional<Item[]>("items") ?? Array.Empty<Item>();
 		Item[] itemUpdates = Optional<Item[]>(key: "updatedItems") ?? Array.Empty<Item>();
 		Item[] itemCreations = Optional<Item[]>(key: "newItems") ?? Array.Empty<Item>();
 		Item[] itemDeletions = Optional<Item[]>(key: "deletedItems") ?? Array.Empty<Item>();
 		string origin = Optional<string>("origin") ?? "Unknown origin";
 		
+		if (components.Any(component => component.Name == Component.SUMMARY))
+			throw new InvalidFieldException("components", "The summary component is maintained by the server and can't be updated.");
+		foreach (Component component in components.Where(component => component.Patch != null))
+			PatchOperation.Validate(accountId, component.Name, component.Patch);
+
 		// TODO: Remove this when "items" is removed.
 		if ((itemCreations.Any() || itemUpdates.Any() || itemDeletions.Any()) && items.Any())
 			throw new ObsoleteOperationException("If using the new item update capabilities, passing 'items' is not supported.  Remove the key from your request.");
 
 		foreach (Item item in items)
-			item.AccountId = Token.AccountId;
+			item.AccountId = accountId;
 		foreach (Item item in itemUpdates)
-			item.AccountId = Token.AccountId;
+			item.AccountId = accountId;
 		foreach (Item item in itemCreations)
-			item.AccountId = Token.AccountId;
-
-		long totalMS = TimestampMs.Now;
-		long componentMS = TimestampMs.Now;
-
-		List<Task<bool>> tasks = components.Select(data => ComponentServices[data.Name]
-			.UpdateAsync(
-				accountId: Token.AccountId,
-				data: data.Data,
-				version: data.Version,
-				session: session,
-				origin: origin
-			)
-		).ToList();
-
-		componentMS = TimestampMs.Now - componentMS;
-
-		long itemMS = TimestampMs.Now;
+			item.AccountId = accountId;
 
+		UpdateBatch update = new()
+		{
+			AccountId = accountId,
+			Storage = RecordService.Resolve(Optional<string>("storage")),
+			Components = components.ToList(),
 #region Deprecated Item Code
-		Item[] toSave = items.Where(item => !item.MarkedForDeletion).ToArray();
-		Item[] toDelete = items.Where(item => item.MarkedForDeletion).ToArray();
-
-		if (toSave.Any())
-			tasks.Add(_itemService.BulkUpdateAsync(toSave, session));
-		if (toDelete.Any())
-			tasks.Add(_itemService.BulkDeleteAsync(toDelete, session));
+			Saves = items.Where(item => !item.MarkedForDeletion).ToList(),
+			Deletes = items.Where(item => item.MarkedForDeletion).ToList(),
 #endregion
+			Creations = itemCreations.ToList(),
+			Updates = itemUpdates.ToList(),
+			Deletions = itemDeletions.ToList(),
+			Origins = new List<string> { origin }
+		};
+		long totalMS = TimestampMs.Now;
 
-		if (itemCreations.Any())
-			tasks.Add(_itemService.InsertAsync(itemCreations, session));
-		if (itemUpdates.Any())
-			tasks.Add(_itemService.BulkUpdateAsync2(itemUpdates, session));
-		if (itemDeletions.Any())
-			tasks.Add(_itemService.BulkDeleteAsync(itemDeletions, session));
-
-		itemMS = TimestampMs.Now - itemMS;
-
+		bool coalesce = Optional<bool?>("coalesce") ?? _coalescer.Enabled;
+		UpdateBatch committed = update;
 		try
 		{
-			Task.WaitAll(tasks.ToArray());
+			if (coalesce)
+				committed = await _coalescer.SubmitAsync(update, CommitAsync);
+			else
+				await CommitAsync(update);
 		}
-		catch (AggregateException e)
+		catch (MongoException e)
 		{
-			throw e?.InnerException ?? e;
-		}
-
-		if (tasks.Where(task => task != null).Select(task => task.Result).Any(success => !success))
-		{
-			session.AbortTransaction();
-			Log.Warn(Owner.Default, "The update was aborted.  One or more updates was unsuccessful.");
+			Log.Error(Owner.Will, "The update was aborted.  The transaction could not be committed.", data: new
+			{
+				AccountId = accountId,
+				Origin = origin
+			}, exception: e);
+			_apiService.Alert(
+				title: "Player Component Update Failure",
+				message: "The /update transaction failed, even after the driver's transient error retries.",
+				countRequired: 15,
+				timeframe: 600,
+				owner: Owner.Will,
+				impact: ImpactType.ServicePartiallyUsable,
+				confluenceLink: "https://rumblegames.atlassian.net/wiki/spaces/TH/pages/3549429770/player-service+Player+Component+Update+Failure"
+			);
 			return Problem(detail: "Transaction aborted.");
 		}
-		
-		session.CommitTransaction();
 
 		totalMS = TimestampMs.Now - totalMS;
 
 		return Ok(new
 		{
 			Token = Token, 
-			componentTaskCreationMS = componentMS, 
-			itemTaskCreationMS = itemMS, 
+			componentTaskCreationMS = committed.ComponentMS, 
+			itemTaskCreationMS = committed.ItemMS, 
 			totalMS = totalMS,
-			itemMap = itemCreations.Select(item => item.Map)
+			itemMap = itemCreations.Select(item => item.Map),
+			// Only covers the deprecated "items" key; unchanged items there are skipped instead of rewritten.  When
+			// coalesced, this covers every request in the transaction.
+			itemWrites = new
+			{
+				Applied = committed.Saves.Count - committed.ItemsSkipped,
+				Skipped = committed.ItemsSkipped
+			},
+			coalescedRequests = coalesce
+				? committed.Requests
+				: (int?)null
 		});
 	}
 
-	[HttpGet, Route("read"), RequireAccountId]
-	public ActionResult Read()
+	/// <summary>
+	/// Writes an /update batch in one transaction, then updates the component cache.  Only singletons and the batch
+	/// are used, since a coalesced batch is written on behalf of several requests.  Mongo errors and version conflicts
+	/// are counted and rethrown.
+	/// </summary>
+	private async Task CommitAsync(UpdateBatch update)
 	{
-		// ~900 ms sequential reads
-		// ~250-350ms concurrent reads
-		string[] names = Optional<string>("names")?.Split(',');
+		string accountId = update.AccountId;
+		ComponentStorage storage = update.Storage;
+		string origin = update.Origin;
+		Item[] toSave = update.Saves.ToArray();
+		Item[] toDelete = update.Deletes.ToArray();
+		// Decided once: a retried attempt sees the IDs the aborted one assigned, and must still insert these items.
+		Item[] toInsert = update.Creations.Where(item => item.Id == null).ToArray();
+
+		// A session can only run one operation at a time, so every write is awaited in turn.  WithTransactionAsync()
+		// retries the whole callback on transient transaction errors and retries the commit when its result is unknown.
+		using IClientSessionHandle session = await _itemService.StartSessionAsync();
+		int attempts = 0;
+		long callbackFinished = 0;
+		try
+		{
+			await session.WithTransactionAsync(async (handle, cancellationToken) =>
+			{
+				if (attempts++ > 0)
+					RequestTimings.Count(RequestTimings.COUNTER_RETRIES);
+				_storageStats.Attempted(storage);
+				update.ComponentMS = TimestampMs.Now;
+				using (RequestTimings.Measure("components"))
+				{
+					if (storage != ComponentStorage.Record)
+						foreach (Component data in update.Components)
+							await ComponentServices[data.Name].UpdateAsync(
+								accountId: accountId,
+								data: data.Data,
+								version: data.Version,
+								session: handle,
+								origin: origin,
+								patch: data.Patch,
+								rawData: data.RawData,
+								expectedVersion: data.ExpectedVersion
+							);
+					// In dual mode the collections are still authoritative and have already checked versions.
+					if (storage != ComponentStorage.Collections)
+						await _recordService.UpdateAsync(accountId, update.Components, handle, origin, checkVersions: storage == ComponentStorage.Record);
+					Component account = update.Components.LastOrDefault(component => component.Name == Component.ACCOUNT);
+					if (account?.Patch != null)
+					{
+						// A patch only carries what changed, so the summary fields are read back, and only when the
+						// patch touched one of them.
+						if (account.Patch.Any(operation => SummaryService.ACCOUNT_KEYS.Contains(operation.Root)))
+							await _summaryService.SyncAccountAsync(accountId, storage == ComponentStorage.Record
+								? await _recordService.FindDataAsync(accountId, Component.ACCOUNT, handle)
+								: await _accountService.FindDataAsync(accountId, handle), handle);
+					}
+					else if (account != null)
+						await _summaryService.SyncAccountAsync(accountId, account.LoadData(), handle);
+				}
+				update.ComponentMS = TimestampMs.Now - update.ComponentMS;
+
+				update.ItemMS = TimestampMs.Now;
+				using (RequestTimings.Measure("items"))
+				{
+					update.ItemsSkipped = toSave.Any()
+						? await _itemService.BulkUpdateAsync(accountId, toSave, handle)
+						: 0;
+					if (toDelete.Any())
+						await _itemService.BulkDeleteAsync(accountId, toDelete, handle);
+					if (toInsert.Any())
+						await _itemService.InsertAsync(accountId, toInsert, handle);
+					if (update.Updates.Any())
+						await _itemService.BulkUpdateAsync2(accountId, update.Updates, handle);
+					if (update.Deletions.Any())
+						await _itemService.BulkDeleteAsync(accountId, update.Deletions.ToArray(), handle);
+				}
+				update.ItemMS = TimestampMs.Now - update.ItemMS;
+
+				callbackFinished = Stopwatch.GetTimestamp();
+				return true;
+			});
+			// Everything after the last callback returned: the commit, plus any commit retries.
+			RequestTimings.Add("commit", Stopwatch.GetElapsedTime(callbackFinished).TotalMilliseconds);
+			_storageStats.Committed(storage);
+		}
+		catch (ComponentVersionException)
+		{
+			_storageStats.Conflicted(storage);
+			throw;
+		}
+		catch (MongoException e) when (update.Components.Any(component => component.Patch != null) && PatchOperation.Rejected(e))
+		{
+			_storageStats.Aborted(storage);
+			throw new ComponentInvalidException(accountId, $"a patch doesn't fit the stored data ({e.Message})");
+		}
+		catch (MongoException)
+		{
+			_storageStats.Aborted(storage);
+			throw;
+		}
 
+		// The cache can only change once the transaction has committed.  Without a version, the stored version is
+		// unknown; after a patch, the full data is.  Either way the entry is dropped instead of refreshed.  Raw data is
+		// only turned into RumbleJson when the cache will actually hold it.
+		foreach (Component component in update.Components)
+			if (component.Version > 0 && component.Patch == null)
+			{
+				if (_componentCache.Enabled)
+					_componentCache.Refresh(accountId, component.Name, component.LoadData(), component.Version);
+			}
+			else
+				_componentCache.Invalidate(accountId, component.Name);
+		// Account writes also rewrite the summary's lookup fields (see SummaryService).
+		if (update.Components.Any(component => component.Name == Component.ACCOUNT))
+			_componentCache.Invalidate(accountId, Component.SUMMARY);
+	}
 
+	[HttpGet, Route("read"), RequireAccountId]
+	public async Task<ActionResult> Read()
+	{
+		string[] names = Optional<string>("names")?.Split(',') ?? Array.Empty<string>();
+		ComponentStorage storage = RecordService.Resolve(Optional<string>("storage"));
 		string aid = Token.AccountId;
 
-		if (_playerService.Find(aid) == null)
+		if (!_playerService.Exists(aid))
 		{
 			Log.Warn(Owner.Will, "Unable to find player account.  This ID could be from another service, such as Portal", data: new
 			{
@@ -210,78 +340,42 @@ public class TopController : PlatformController
 			});
 			throw new PlatformException("Unable to find player account.", code: ErrorCode.AccountNotFound);
 		}
-		
-		List<Task<Component>> tasks = new ();
-		foreach (string name in names)
+
+		string[] known = names
+			.Where(name => ComponentServices.ContainsKey(name))
+			.Distinct()
+			.ToArray();
+
+		(List<Component> output, string[] missing) = await _componentCache.LookupAsync(aid, known);
+		RequestTimings.Count("cached", output.Count);
+		if (missing.Any())
 		{
-			if (!ComponentServices.ContainsKey(name))
-				continue;
-			tasks.Add(ComponentServices[name].LookupAsync(aid));
+			long started = _componentCache.Begin();
+			List<Component> loaded = await _recordService.LookupAsync(aid, missing, storage, ComponentServices);
+			_componentCache.Fill(loaded, started);
+			output.AddRange(loaded);
 		}
-		Task.WaitAll(tasks.ToArray());
+
+		if (Streaming)
+			return JsonStream.Result(async json =>
+			{
+				json.Write("accountId", aid);
+				await json.WriteArrayAsync("components", output, batchSize: 1);
+			});
 
 		return Ok(value: new RumbleJson
 		{
 			{ "accountId", Token.AccountId },
-			{ "components", tasks.Select(task => task.Result) }
+			{ "components", output }
 		});
 	}
 
 	[HttpGet, Route("config"), NoAuth, HealthMonitor(weight: 5)]
 	public ActionResult GetConfig()
 	{
-		const string OVERRIDE = ":";
 		Version clientVersion = new (Optional<string>("clientVersion") ?? "0.0.0.0");
-		RumbleJson config = _dynamicConfig.GetValuesFor(Audience.GameClient);
-		RumbleJson variables = new();
-		
-		List<ConfigOverride> overrides = new();
-		List<string> parsingErrors = new();
-		foreach (KeyValuePair<string, object> pair in config)
-		{
-			int index = pair.Key.IndexOf(OVERRIDE, StringComparison.Ordinal);
-
-			string key = index switch
-			{
-				-1 => pair.Key,
-				>= 0 when pair.Key.StartsWith("default") => null,
-				_ => pair.Key[..index]
-			};
-			if (key == null)
-				continue;
-
-			string version = index > -1
-				? pair.Key[(index + 1)..]
-				: null;
-
-			if (string.IsNullOrWhiteSpace(version))
-			{
-				variables[key] = pair.Value;
-				continue;
-			}
-
-			try
-			{
-				Version configVersion = new (version);
+		ClientConfigService.Resolved config = _clientConfig.Resolve(clientVersion);
 
-				if (clientVersion.CompareTo(configVersion) >= 0)
-					overrides.Add(new ConfigOverride
-					{
-						Key = key,
-						Version = new Version(version),
-						Value = pair.Value
-					});
-			}
-			catch (Exception e)
-			{
-				if (!PlatformEnvironment.IsProd)
-					parsingErrors.Add(index > -1
-						? $"'{pair.Key}' Couldn't parse version; expected format is 'key:version'"
-						: $"'{pair.Key}' Couldn't parse variable; {e?.Message}"
-					);
-			}
-		}
-		
 		// Previous response before refactor
 		// {
 		// 	"success": true,
@@ -297,33 +391,85 @@ public class TopController : PlatformController
 		// 	}
 		// }
 
-		IEnumerable<ConfigOverride> ordered = overrides
-			.OrderByDescending(o => o.Version)
-			.DistinctBy(o => o.Key);
+		Response.Headers.ETag = config.ETag;
+		Response.Headers.CacheControl = "no-cache";
+		if (Request.Headers.IfNoneMatch
+			.SelectMany(header => header.Split(','))
+			.Select(etag => etag.Trim())
+			.Any(etag => etag == config.ETag || etag == "*"))
+			return StatusCode(StatusCodes.Status304NotModified);
 
-		foreach (ConfigOverride o in ordered)
-			variables[o.Key] = o.Value;
+		return Ok(config.Body);
+	}
 
-		RumbleJson output = new()
-		{
-			{ "success", true }, // TODO: Remove this after the client is no longer dependent on it; hardcoded on 2022.11.22
-			{ "clientVersion", clientVersion.ToString() },
-			{ "clientVars", variables.Sort() }
-		};
+	/// <summary>
+	/// Whether large responses should be written straight to the response body as they're read.  Clients can opt in
+	/// or out per request with "stream"; otherwise the streamResponses dynamic config value decides.
+	/// </summary>
+	private bool Streaming => Optional<bool?>("stream") ?? DynamicConfig.Instance?.Optional<bool>(CONFIG_STREAM) ?? false;
 
-		if (parsingErrors.Any())
-			output["parsingErrors"] = parsingErrors;
-		
-		return Ok(output);
-	}
+	/// <summary>
+	/// Whether /update parses component data straight into BSON instead of into RumbleJson first; see
+	/// Component.ReadRaw().  Clients can opt in or out per request with "rawData"; otherwise the rawComponentData
+	/// dynamic config value decides.
+	/// </summary>
+	private bool RawComponentData => Optional<bool?>("rawData") ?? DynamicConfig.Instance?.Optional<bool>(CONFIG_RAW_DATA) ?? false;
 
 	[HttpGet, Route("items"), RequireAccountId]
-	public ActionResult GetItems()
+	public async Task<ActionResult> GetItems()
 	{
 		string[] ids = Optional<string>("ids")?.Split(',');
 		string[] types = Optional<string>("types")?.Split(',');
+		string since = Optional<string>("since");
 
 		long itemMS = TimestampMs.Now;
+		if (since == null && Streaming)
+		{
+			string accountId = Token.AccountId;
+			return JsonStream.Result(async json =>
+			{
+				Dictionary<string, int> breakdown = new();
+				using IAsyncCursor<Item> cursor = await _itemService.FindItemsAsync(accountId, ids, types);
+				int count = await json.WriteArrayAsync("items", cursor, item => breakdown[item.Type ?? ""] = breakdown.GetValueOrDefault(item.Type ?? "") + 1);
+				itemMS = TimestampMs.Now - itemMS;
+				json.Write("itemMS", itemMS);
+
+				if (count > 100)
+					Log.Warn(Owner.Will, "A lot of items were returned at once.  Consider refining the query to return fewer items.", data: new
+					{
+						itemCount = count,
+						TypeBreakdown = breakdown.Select(pair => new
+						{
+							Type = pair.Key,
+							Count = pair.Value
+						}),
+						DurationMs = itemMS,
+						Streamed = true
+					});
+			});
+		}
+		if (since != null)
+		{
+			ItemChanges changes = await _itemService.GetChangesFor(
+				accountId: Token.AccountId,
+				since: since,
+				limit: Optional<int?>("limit") ?? ItemService.DEFAULT_PAGE_SIZE,
+				ids: ids,
+				types: types
+			);
+			itemMS = TimestampMs.Now - itemMS;
+
+			return Ok(new
+			{
+				changes.Items,
+				changes.Deleted,
+				changes.Cursor,
+				changes.More,
+				changes.FullSync,
+				itemMS = itemMS
+			});
+		}
+
 		List<Item> output = _itemService.GetItemsFor(Token.AccountId, ids, types);
 		itemMS = TimestampMs.Now - itemMS;
 
@@ -374,32 +520,21 @@ public class TopController : PlatformController
 	[HttpGet, Route("lookup")]
 	public ActionResult PlayerLookup()
 	{
-		// TODO: This is a little janky, and once the SummaryComponent is implemented, this should just return those entries.
 		string[] accountIds = Require<string>("accountIds")
 			?.Split(",")
 			.Where(id => id.CanBeMongoId())
 			.ToArray();
 
-		Dictionary<string, LookupData> accountComponentData = new();
-
-		// Dictionary<string, string> avatars = new();
-		// Dictionary<string, int> accountLevels = new();
-		foreach (Component component in ComponentServices[Component.ACCOUNT].Find(accountIds))
-		{
-			// if (!avatars.ContainsKey(component.AccountId) || avatars[component.AccountId] == null)
-			// 	avatars[component.AccountId] = component.Data.Optional<string>("accountAvatar");
-			// accountLevels[component.AccountId] = component.Data.Optional<int?>("accountLevel") ?? -1;
-			accountComponentData[component.AccountId] = new LookupData
+		List<RumbleJson> output = _summaryService.Lookup(accountIds, out string[] missing);
+		if (!missing.Any())
+			return Ok(new
 			{
-				AccountLevel = component.Data.Optional<int?>("accountLevel") ?? -1,
-				Avatar = component.Data.Optional<string>("accountAvatar"),
-				ChatTitle = component.Data.Optional<string>("chatTitle"),
-				TotalHeroScore = component.Data.Optional<long>("totalHeroScore")
-			};
-		}
+				Results = output
+			});
 
-		// RumbleJson[] output = _playerService.CreateLookupResults(accountIds, avatars, accountLevels);
-		RumbleJson[] output = _playerService.CreateLookupResults(accountIds, accountComponentData);
+		// Accounts without a summary yet get their results built the long way.  Nothing is written here, so lookup
+		// bursts stay read-only; PATCH /admin/storage/migrate backfills the summaries.
+		output.AddRange(_playerService.CreateLookupResults(missing));
 
 		return Ok(new
 		{
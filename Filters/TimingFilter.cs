@@ -0,0 +1,38 @@
+using System.Threading.Tasks;
+using Microsoft.AspNetCore.Http;
+using Microsoft.AspNetCore.Mvc.Filters;
+using PlayerService.Utilities;
+using Rumble.Platform.Common.Filters;
+
+namespace PlayerService.Filters;
+
+/// <summary>
+/// Starts RequestTimings for every request and reports them.  This is a resource filter so it wraps result execution
+/// too; streamed responses keep recording phases while they write.  The Server-Timing header is added as the response
+/// starts, so for a streamed response it covers the work done before the first flush, while the histograms get the
+/// whole request.
+/// </summary>
+public class TimingFilter : PlatformFilter, IAsyncResourceFilter
+{
+    public async Task OnResourceExecutionAsync(ResourceExecutingContext context, ResourceExecutionDelegate next)
+    {
+        RequestTimings timings = RequestTimings.Start();
+        HttpResponse response = context.HttpContext.Response;
+        response.OnStarting(() =>
+        {
+            response.Headers["Server-Timing"] = timings.ToHeader();
+            return Task.CompletedTask;
+        });
+
+        try
+        {
+            await next();
+        }
+        finally
+        {
+            // Route templates keep the label set small; raw paths could carry IDs.
+            string template = context.ActionDescriptor.AttributeRouteInfo?.Template ?? "unknown";
+            timings.Record($"{context.HttpContext.Request.Method} /{template.TrimStart('/')}");
+        }
+    }
+}
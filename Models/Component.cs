@@ -1,7 +1,13 @@
+using System;
 using System.Collections.Generic;
+using System.Linq;
+using System.Text.Json;
 using System.Text.Json.Serialization;
 using MongoDB.Bson;
+using MongoDB.Bson.Serialization;
 using MongoDB.Bson.Serialization.Attributes;
+using PlayerService.Exceptions;
+using PlayerService.Utilities;
 using Rumble.Platform.Common.Attributes;
 using Rumble.Platform.Common.Models;
 using Rumble.Platform.Common.Utilities;
@@ -34,6 +40,7 @@ public class Component : PlatformCollectionDocument
 	public const string FRIENDLY_KEY_NAME = "name";
 	public const string FRIENDLY_KEY_VERSION = "version";
 	public const string FRIENDLY_KEY_AUDIT_LOGS = "auditLogs";
+	public const string FRIENDLY_KEY_PATCH = "patch";
 
 	[BsonElement(DB_KEY_ACCOUNT_ID), BsonRepresentation(BsonType.ObjectId)]
 	[JsonInclude, JsonPropertyName(FRIENDLY_KEY_ACCOUNT_ID)]
@@ -52,6 +59,20 @@ public class Component : PlatformCollectionDocument
 	[JsonInclude, JsonPropertyName(FRIENDLY_KEY_VERSION), JsonIgnore(Condition = JsonIgnoreCondition.WhenWritingDefault)]
 	public int Version { get; set; }
 
+	// Sent on /update instead of data, to change only part of the component.  When present, Data is ignored.
+	[BsonIgnore]
+	[JsonInclude, JsonPropertyName(FRIENDLY_KEY_PATCH), JsonIgnore(Condition = JsonIgnoreCondition.WhenWritingNull)]
+	public PatchOperation[] Patch { get; set; }
+
+	// Set instead of Data when /update reads data straight from the request's JSON into BSON; see ReadRaw().
+	[BsonIgnore, JsonIgnore]
+	internal BsonDocument RawData { get; set; }
+
+	// The stored version a versioned write requires, when it isn't Version - 1.  Coalesced writes spanning several
+	// saves of the component require the version before the first of them.
+	[BsonIgnore, JsonIgnore]
+	internal int? ExpectedVersion { get; set; }
+
 	public Component(string accountId, string name = null, RumbleJson data = null)
 	{
 		AccountId = accountId;
@@ -59,6 +80,55 @@ public class Component : PlatformCollectionDocument
 		Version = 1;
 		Data = data ?? new RumbleJson();
 	}
+
+	/// <summary>
+	/// Builds a RumbleJson tree from RawData for the few callers that still need one, like the summary sync or the
+	/// component cache.  Components read the usual way already have Data.
+	/// </summary>
+	internal RumbleJson LoadData() => Data ??= RawData == null
+		? null
+		: BsonSerializer.Deserialize<RumbleJson>(RawData);
+
+	/// <summary>
+	/// Reads /update's components without building a RumbleJson tree for their data.  Clients send data as an escaped
+	/// JSON string, which is parsed once, directly into the BSON document that gets written (see JsonBson).  The other
+	/// fields are read off the entry one by one.
+	/// </summary>
+	internal static Component[] ReadRaw(string accountId, IEnumerable<RumbleJson> entries) => entries
+		.Select(entry =>
+		{
+			Component output = new(accountId, entry.Optional<string>(FRIENDLY_KEY_NAME))
+			{
+				Data = null,
+				Patch = entry.Optional<PatchOperation[]>(FRIENDLY_KEY_PATCH)
+			};
+			if (entry.ContainsKey(FRIENDLY_KEY_VERSION))
+				output.Version = entry.Require<int>(FRIENDLY_KEY_VERSION);
+			if (output.Patch == null)
+				output.RawData = ParseRaw(accountId, output.Name, entry.GetValueOrDefault(FRIENDLY_KEY_DATA));
+			return output;
+		})
+		.ToArray();
+
+	private static BsonDocument ParseRaw(string accountId, string name, object data)
+	{
+		try
+		{
+			return data switch
+			{
+				null => new BsonDocument(),
+				string json => JsonBson.ReadDocument(json),
+				JsonElement { ValueKind: JsonValueKind.String } element => JsonBson.ReadDocument(element.GetString()),
+				JsonElement element => JsonBson.ReadDocument(element),
+				RumbleJson json => JsonBson.RejectOperators(json.ToBsonDocument()),
+				_ => throw new FormatException($"unexpected {data.GetType().Name}")
+			};
+		}
+		catch (FormatException e)
+		{
+			throw new ComponentInvalidException(accountId, $"{name} data is not a JSON object ({e.Message})");
+		}
+	}
 }
 
 
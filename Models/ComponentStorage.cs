@@ -0,0 +1,13 @@
+namespace PlayerService.Models;
+
+/// <summary>
+/// Where component data lives.  Collections is the original layout (one c_{name} collection per component); Record
+/// keeps every component of an account in one document in "records"; Dual writes both and reads from the record,
+/// falling back to the collections for components that haven't been migrated yet.
+/// </summary>
+public enum ComponentStorage
+{
+	Collections,
+	Record,
+	Dual
+}
@@ -0,0 +1,33 @@
+using System.Collections.Generic;
+using MongoDB.Bson.Serialization.Attributes;
+using Rumble.Platform.Common.Attributes;
+using Rumble.Platform.Common.Utilities.JsonTools;
+
+namespace PlayerService.Models;
+
+/// <summary>
+/// Tracks which discriminators are in use for one screenname.  Everything below Next is taken except the numbers in
+/// Free, which were released by renames; a claim takes the first free number, or Next if there isn't one, and leaves
+/// it in Claimed.
+/// </summary>
+[BsonIgnoreExtraElements]
+public class DiscriminatorPool : PlatformCollectionDocument
+{
+	internal const string DB_KEY_SCREENNAME = "sn";
+	internal const string DB_KEY_NEXT = "next";
+	internal const string DB_KEY_FREE = "free";
+	internal const string DB_KEY_CLAIMED = "claimed";
+
+	[BsonElement(DB_KEY_SCREENNAME)]
+	[SimpleIndex(Unique = true)]
+	public string Screenname { get; set; }
+
+	[BsonElement(DB_KEY_NEXT)]
+	public int Next { get; set; }
+
+	[BsonElement(DB_KEY_FREE)]
+	public List<int> Free { get; set; }
+
+	[BsonElement(DB_KEY_CLAIMED), BsonIgnoreIfDefault]
+	public int Claimed { get; set; }
+}
@@ -14,6 +14,8 @@ public class Item : PlatformCollectionDocument
 	internal const string DB_KEY_ITEM_ID = "iid";
 	internal const string DB_KEY_DATA = "data";
 	internal const string DB_KEY_TYPE = "type";
+	internal const string DB_KEY_MODIFIED = "mod";
+	internal const string DB_KEY_HASH = "hash";
 
 	public const string FRIENDLY_KEY_ACCOUNT_ID = "aid";
 	public const string FRIENDLY_KEY_ITEM_ID = "iid";
@@ -23,11 +25,13 @@ public class Item : PlatformCollectionDocument
 
 	private const string GROUP_ACCOUNT_LINK = "AccountLink";
 	private const string GROUP_ACCOUNT_TYPE = "aid_1_type_1";
+	private const string GROUP_ACCOUNT_MODIFIED = "aid_1_mod_1";
 
 	[BsonElement(DB_KEY_ACCOUNT_ID), BsonRepresentation(BsonType.ObjectId)]
 	[JsonInclude, JsonPropertyName(FRIENDLY_KEY_ACCOUNT_ID)]
 	[CompoundIndex(group: GROUP_ACCOUNT_LINK, priority: 1)]
 	[CompoundIndex(group: GROUP_ACCOUNT_TYPE, priority: 1)]
+	[CompoundIndex(group: GROUP_ACCOUNT_MODIFIED, priority: 1)]
 	public string AccountId { get; set; }
 	
 	[BsonElement(DB_KEY_ITEM_ID)]
@@ -46,6 +50,18 @@ public class Item : PlatformCollectionDocument
 	[CompoundIndex(group: GROUP_ACCOUNT_TYPE, priority: 2)]
 	public string Type { get; set; }
 	
+	// The account's item sequence number at this item's last write; used for incremental /items syncs.
+	[BsonElement(DB_KEY_MODIFIED), BsonIgnoreIfDefault]
+	[JsonIgnore]
+	[CompoundIndex(group: GROUP_ACCOUNT_MODIFIED, priority: 2)]
+	public long Modified { get; set; }
+	
+	// A hash of Data as of the last write, so upserts can tell when an item hasn't changed.  Null for items written
+	// before hashing; those are treated as changed once, then hashed.
+	[BsonElement(DB_KEY_HASH), BsonIgnoreIfNull]
+	[JsonIgnore]
+	public string Hash { get; set; }
+	
 	[BsonIgnore]
 	[JsonInclude, JsonPropertyName(FRIENDLY_KEY_DELETE), JsonIgnore(Condition = JsonIgnoreCondition.WhenWritingDefault)]
 	public bool MarkedForDeletion { get; set; }
@@ -0,0 +1,28 @@
+using System.Collections.Generic;
+using System.Text.Json.Serialization;
+using Rumble.Platform.Common.Utilities.JsonTools;
+
+namespace PlayerService.Models;
+
+/// <summary>
+/// One page of an incremental /items sync: items written and deleted after the client's cursor.  Pass Cursor back as
+/// "since" for the next page while More is true.  When FullSync is true, the cursor couldn't be honored and this is the
+/// first page of everything the account has; the client should drop its items and keep paging.
+/// </summary>
+public class ItemChanges : PlatformDataModel
+{
+	[JsonInclude, JsonPropertyName("items")]
+	public List<Item> Items { get; set; }
+
+	[JsonInclude, JsonPropertyName("deleted")]
+	public List<ItemTombstone> Deleted { get; set; }
+
+	[JsonInclude, JsonPropertyName("cursor")]
+	public string Cursor { get; set; }
+
+	[JsonInclude, JsonPropertyName("more")]
+	public bool More { get; set; }
+
+	[JsonInclude, JsonPropertyName("fullSync")]
+	public bool FullSync { get; set; }
+}
@@ -0,0 +1,46 @@
+using System.Collections.Generic;
+using System.Text.Json.Serialization;
+using MongoDB.Bson;
+using MongoDB.Bson.Serialization.Attributes;
+using Rumble.Platform.Common.Attributes;
+using Rumble.Platform.Common.Utilities.JsonTools;
+
+namespace PlayerService.Models;
+
+/// <summary>
+/// An account's item modification counter, plus its most recent item deletions.  Every item write takes the next
+/// values from the counter, so "everything after N" is always a well-defined set of changes.  Only the newest
+/// deletions are kept; a cursor older than the oldest one left has to fall back to a full sync.
+/// </summary>
+[BsonIgnoreExtraElements]
+public class ItemSequence : PlatformCollectionDocument
+{
+	internal const string DB_KEY_ACCOUNT_ID = "aid";
+	internal const string DB_KEY_SEQUENCE = "seq";
+	internal const string DB_KEY_TOMBSTONES = "del";
+
+	[BsonElement(DB_KEY_ACCOUNT_ID), BsonRepresentation(BsonType.ObjectId)]
+	[SimpleIndex(Unique = true)]
+	public string AccountId { get; set; }
+
+	[BsonElement(DB_KEY_SEQUENCE)]
+	public long Sequence { get; set; }
+
+	[BsonElement(DB_KEY_TOMBSTONES)]
+	public List<ItemTombstone> Tombstones { get; set; }
+}
+
+public class ItemTombstone : PlatformDataModel
+{
+	[BsonElement(Item.DB_KEY_ITEM_ID)]
+	[JsonInclude, JsonPropertyName(Item.FRIENDLY_KEY_ITEM_ID)]
+	public string ItemId { get; set; }
+
+	[BsonElement(Item.DB_KEY_TYPE), BsonIgnoreIfNull]
+	[JsonInclude, JsonPropertyName(Item.FRIENDLY_KEY_TYPE), JsonIgnore(Condition = JsonIgnoreCondition.WhenWritingNull)]
+	public string Type { get; set; }
+
+	[BsonElement(Item.DB_KEY_MODIFIED)]
+	[JsonIgnore]
+	public long Modified { get; set; }
+}
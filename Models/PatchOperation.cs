@@ -0,0 +1,143 @@
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Text.Json;
+using System.Text.Json.Serialization;
+using MongoDB.Bson;
+using MongoDB.Driver;
+using PlayerService.Exceptions;
+using PlayerService.Utilities;
+using Rumble.Platform.Common.Utilities.JsonTools;
+
+namespace PlayerService.Models;
+
+/// <summary>
+/// One change to a path inside a component's data, sent in a component's "patch" instead of its whole "data".  Paths
+/// are dot-separated and can index into arrays, e.g. "currencies.1.amount".  A component's operations are applied as
+/// one update, in the same transaction and with the same version check as a full write.
+/// </summary>
+public class PatchOperation : PlatformDataModel
+{
+	public const string SET = "set";
+	public const string UNSET = "unset";
+	public const string INCREMENT = "inc";
+	public const string APPEND = "push";
+
+	public const string FRIENDLY_KEY_OP = "op";
+	public const string FRIENDLY_KEY_PATH = "path";
+	public const string FRIENDLY_KEY_VALUE = "value";
+
+	private static readonly string[] Ops = { SET, UNSET, INCREMENT, APPEND };
+
+	[JsonInclude, JsonPropertyName(FRIENDLY_KEY_OP)]
+	public string Op { get; set; }
+
+	[JsonInclude, JsonPropertyName(FRIENDLY_KEY_PATH)]
+	public string Path { get; set; }
+
+	[JsonInclude, JsonPropertyName(FRIENDLY_KEY_VALUE), JsonIgnore(Condition = JsonIgnoreCondition.WhenWritingNull)]
+	public object Value { get; set; }
+
+	// Untyped values arrive as JsonElements, which are read straight into BSON the way raw component data is (see
+	// JsonBson).  Anything else goes through RumbleJson, the same way full component data does.
+	private BsonValue BsonValue => Value switch
+	{
+		null => BsonNull.Value,
+		JsonElement element => JsonBson.ReadValue(element),
+		_ => JsonBson.RejectOperators(new RumbleJson { { "v", Value } }.ToBsonDocument())["v"]
+	};
+
+	/// <summary>
+	/// The first segment of the path, i.e. the top-level key in the component's data that this operation changes.
+	/// </summary>
+	internal string Root => Path?.Split('.')[0];
+
+	/// <summary>
+	/// Throws if the operations can't be applied as a single update: an unknown op, a malformed path, a missing or
+	/// non-numeric value, a value with '$' keys, or two operations on overlapping paths, which Mongo would reject as a
+	/// conflict.
+	/// </summary>
+	internal static void Validate(string accountId, string component, PatchOperation[] operations)
+	{
+		if (operations == null || !operations.Any())
+			throw new ComponentInvalidException(accountId, $"{component} has an empty patch");
+
+		List<string> paths = new();
+		foreach (PatchOperation operation in operations)
+		{
+			if (!Ops.Contains(operation?.Op))
+				throw new ComponentInvalidException(accountId, $"{component} patch op must be one of {string.Join(", ", Ops)}");
+			if (string.IsNullOrWhiteSpace(operation.Path) || operation.Path.Split('.').Any(segment => segment.Length == 0 || segment.StartsWith('$')))
+				throw new ComponentInvalidException(accountId, $"{component} patch path '{operation.Path}' is not a valid path");
+			BsonValue value;
+			try
+			{
+				value = operation.BsonValue;
+			}
+			catch (FormatException e)
+			{
+				throw new ComponentInvalidException(accountId, $"{component} patch value for '{operation.Path}' is not valid ({e.Message})");
+			}
+			if (operation.Op == INCREMENT && !value.IsNumeric)
+				throw new ComponentInvalidException(accountId, $"{component} patch 'inc' on '{operation.Path}' needs a numeric value");
+			if (operation.Op == APPEND && operation.Value == null)
+				throw new ComponentInvalidException(accountId, $"{component} patch 'push' on '{operation.Path}' needs a value");
+
+			string overlap = paths.FirstOrDefault(path => Overlaps(path, operation.Path));
+			if (overlap != null)
+				throw new ComponentInvalidException(accountId, $"{component} patch paths '{overlap}' and '{operation.Path}' overlap");
+			paths.Add(operation.Path);
+		}
+	}
+
+	// BadValue ("push" to a non-array), TypeMismatch ("inc" on a non-number), and PathNotViable (a path through a
+	// value that isn't a document or array).
+	private static readonly int[] RejectedCodes = { 2, 14, 28 };
+
+	/// <summary>
+	/// Whether Mongo rejected an update because an operation doesn't fit the stored data, which Validate() can't see.
+	/// That's the client's mistake rather than a failed transaction, and retrying won't change it.
+	/// </summary>
+	internal static bool Rejected(MongoException exception)
+	{
+		if (exception.HasErrorLabel("TransientTransactionError"))
+			return false;
+		int? code = exception switch
+		{
+			MongoWriteException write => write.WriteError?.Code,
+			MongoCommandException command => command.Code,
+			_ => null
+		};
+		return code != null && RejectedCodes.Contains((int)code);
+	}
+
+	private static bool Overlaps(string a, string b) => a == b
+		|| a.StartsWith(b + ".", StringComparison.Ordinal)
+		|| b.StartsWith(a + ".", StringComparison.Ordinal);
+
+	/// <summary>
+	/// Translates the operations into Mongo update operators on paths under the provided prefix, e.g. "data" for a
+	/// c_{name} document or "c.{name}.data" for a record.  The update is built as a plain document, since paths inside
+	/// data don't map to any serializer.
+	/// </summary>
+	internal static UpdateDefinition<T> ToUpdate<T>(string prefix, IEnumerable<PatchOperation> operations)
+	{
+		BsonDocument update = new();
+		foreach (PatchOperation operation in operations)
+		{
+			string op = operation.Op switch
+			{
+				UNSET => "$unset",
+				INCREMENT => "$inc",
+				APPEND => "$push",
+				_ => "$set"
+			};
+			if (!update.Contains(op))
+				update[op] = new BsonDocument();
+			update[op][$"{prefix}.{operation.Path}"] = operation.Op == UNSET
+				? ""
+				: operation.BsonValue;
+		}
+		return new BsonDocumentUpdateDefinition<T>(update);
+	}
+}
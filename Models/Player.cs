@@ -107,6 +107,7 @@ public class Player : PlatformCollectionDocument
 	public RumbleAccount RumbleAccount { get; set; }
 
 	[BsonElement(DB_KEY_SCREENNAME)]
+	[SimpleIndex]
 	[JsonPropertyName(FRIENDLY_KEY_SCREENNAME)]
 	public string Screenname { get; set; }
 	
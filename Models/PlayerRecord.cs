@@ -0,0 +1,49 @@
+using System.Collections.Generic;
+using System.Text.Json.Serialization;
+using MongoDB.Bson;
+using MongoDB.Bson.Serialization.Attributes;
+using Rumble.Platform.Common.Attributes;
+using Rumble.Platform.Common.Utilities.JsonTools;
+
+namespace PlayerService.Models;
+
+/// <summary>
+/// All of an account's components in a single document.  Components are stored under c.{name}, each with its own
+/// data and version, so any subset can be read with one projected query and written with one update.
+/// </summary>
+[BsonIgnoreExtraElements]
+public class PlayerRecord : PlatformCollectionDocument
+{
+	internal const string DB_KEY_ACCOUNT_ID = "aid";
+	internal const string DB_KEY_COMPONENTS = "c";
+	internal const string DB_KEY_DATA = "data";
+	internal const string DB_KEY_VERSION = "v";
+
+	public const string FRIENDLY_KEY_ACCOUNT_ID = "aid";
+	public const string FRIENDLY_KEY_COMPONENTS = "components";
+
+	[BsonElement(DB_KEY_ACCOUNT_ID), BsonRepresentation(BsonType.ObjectId)]
+	[JsonInclude, JsonPropertyName(FRIENDLY_KEY_ACCOUNT_ID)]
+	[SimpleIndex(Unique = true)]
+	public string AccountId { get; set; }
+
+	[BsonElement(DB_KEY_COMPONENTS)]
+	[JsonInclude, JsonPropertyName(FRIENDLY_KEY_COMPONENTS)]
+	public Dictionary<string, RecordComponent> Components { get; set; }
+
+	internal static string ComponentPath(string name) => $"{DB_KEY_COMPONENTS}.{name}";
+	internal static string DataPath(string name) => $"{DB_KEY_COMPONENTS}.{name}.{DB_KEY_DATA}";
+	internal static string VersionPath(string name) => $"{DB_KEY_COMPONENTS}.{name}.{DB_KEY_VERSION}";
+}
+
+[BsonIgnoreExtraElements]
+public class RecordComponent : PlatformDataModel
+{
+	[BsonElement(PlayerRecord.DB_KEY_DATA)]
+	[JsonInclude, JsonPropertyName(Component.FRIENDLY_KEY_DATA)]
+	public RumbleJson Data { get; set; }
+
+	[BsonElement(PlayerRecord.DB_KEY_VERSION), BsonIgnoreIfDefault]
+	[JsonInclude, JsonPropertyName(Component.FRIENDLY_KEY_VERSION), JsonIgnore(Condition = JsonIgnoreCondition.WhenWritingDefault)]
+	public int Version { get; set; }
+}
@@ -0,0 +1,29 @@
+using MongoDB.Bson;
+using MongoDB.Bson.Serialization.Attributes;
+using Rumble.Platform.Common.Attributes;
+using Rumble.Platform.Common.Utilities.JsonTools;
+
+namespace PlayerService.Models;
+
+/// <summary>
+/// The searchable text of one player, broken into lowercase trigrams.  A substring search only has to look up the
+/// term's own trigrams in the multikey index, instead of scanning every player with a regex per field.
+/// </summary>
+[BsonIgnoreExtraElements]
+public class PlayerSearchEntry : PlatformCollectionDocument
+{
+	internal const string DB_KEY_ACCOUNT_ID = "aid";
+	internal const string DB_KEY_TOKENS = "t";
+	private const string INDEX_KEY_PAGE = "page";
+
+	[BsonElement(DB_KEY_ACCOUNT_ID), BsonRepresentation(BsonType.ObjectId)]
+	[SimpleIndex(Unique = true)]
+	[CompoundIndex(group: INDEX_KEY_PAGE, priority: 2)]
+	public string AccountId { get; set; }
+
+	// Candidates are paged by account ID, which this index returns in order for each trigram.
+	[BsonElement(DB_KEY_TOKENS)]
+	[SimpleIndex]
+	[CompoundIndex(group: INDEX_KEY_PAGE, priority: 1)]
+	public string[] Tokens { get; set; }
+}
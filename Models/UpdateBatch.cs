@@ -0,0 +1,141 @@
+using System.Collections.Generic;
+using System.Linq;
+
+namespace PlayerService.Models;
+
+/// <summary>
+/// Everything one /update writes: components, and items through either the deprecated "items" key or the newer
+/// create / update / delete keys.  When coalescing, later /updates from the same account are merged into it with
+/// TryMerge() and the result is written in one transaction.
+/// </summary>
+public class UpdateBatch
+{
+	public string AccountId { get; init; }
+	public ComponentStorage Storage { get; init; }
+	public List<Component> Components { get; init; } = new();
+
+	// Deprecated "items", split by MarkedForDeletion.
+	public List<Item> Saves { get; init; } = new();
+	public List<Item> Deletes { get; init; } = new();
+
+	public List<Item> Creations { get; init; } = new();
+	public List<Item> Updates { get; init; } = new();
+	public List<Item> Deletions { get; init; } = new();
+
+	public List<string> Origins { get; init; } = new();
+
+	/// <summary>
+	/// The number of /update requests written by this batch.
+	/// </summary>
+	public int Requests { get; private set; } = 1;
+
+	// Set by the commit.
+	public long ComponentMS { get; set; }
+	public long ItemMS { get; set; }
+	public int ItemsSkipped { get; set; }
+
+	public string Origin => string.Join(", ", Origins.Distinct());
+
+	private bool UsesDeprecatedItems => Saves.Any() || Deletes.Any();
+	private bool UsesItems => Creations.Any() || Updates.Any() || Deletions.Any();
+	private bool DeletesItems => Deletes.Any() || Deletions.Any();
+
+	/// <summary>
+	/// Returns a batch that can be merged into without changing this one, so that this one can still be written on its
+	/// own if the merged write fails.  Items aren't copied; the commit assigns their IDs, which each request's response
+	/// maps back for its own creations.
+	/// </summary>
+	public UpdateBatch Copy() => new()
+	{
+		AccountId = AccountId,
+		Storage = Storage,
+		Components = Components.Select(CopyOf).ToList(),
+		Saves = new List<Item>(Saves),
+		Deletes = new List<Item>(Deletes),
+		Creations = new List<Item>(Creations),
+		Updates = new List<Item>(Updates),
+		Deletions = new List<Item>(Deletions),
+		Origins = new List<string>(Origins),
+		Requests = Requests
+	};
+
+	/// <summary>
+	/// Merges a later /update from the same account into this batch, but only if writing the merged batch leaves the
+	/// same result as writing the two one after the other, including every version check.  Returns false, and changes
+	/// nothing, otherwise:
+	///
+	///   * Different storage modes, or one using the deprecated "items" key while the other uses the newer keys.
+	///   * This batch deletes items.  Deletes run after upserts in a transaction, so nothing may follow them.
+	///   * A component sent again as a patch; a patch can't be applied on top of data that hasn't been written.
+	///   * A component whose versions don't follow on, e.g. 5 then 7.  The later write would have conflicted.
+	///
+	/// A component sent again replaces the earlier one, keeps the latest version, and requires the version the earliest
+	/// one did.  Deprecated items are upserted by item ID, so only the latest of each is kept; items without one are all
+	/// kept.
+	/// </summary>
+	public bool TryMerge(UpdateBatch next)
+	{
+		if (next.AccountId != AccountId || next.Storage != Storage || DeletesItems)
+			return false;
+		if ((UsesDeprecatedItems && next.UsesItems) || (UsesItems && next.UsesDeprecatedItems))
+			return false;
+
+		Dictionary<string, Component> merged = new();
+		foreach (Component component in next.Components)
+		{
+			Component previous = merged.GetValueOrDefault(component.Name)
+				?? Components.LastOrDefault(existing => existing.Name == component.Name);
+			if (previous == null)
+			{
+				merged[component.Name] = CopyOf(component);
+				continue;
+			}
+			if (component.Patch != null)
+				return false;
+			if (previous.Version != 0 && component.Version != 0 && component.Version != previous.Version + 1)
+				return false;
+
+			Component output = CopyOf(component);
+			if (previous.Version != 0)
+			{
+				output.ExpectedVersion = previous.ExpectedVersion ?? previous.Version - 1;
+				if (component.Version == 0)
+					output.Version = previous.Version;
+			}
+			merged[component.Name] = output;
+		}
+
+		foreach (Component component in merged.Values)
+		{
+			int index = Components.FindLastIndex(existing => existing.Name == component.Name);
+			if (index < 0)
+				Components.Add(component);
+			else
+				Components[index] = component;
+		}
+
+		// Items without an item ID can't be matched to an earlier save, so they're all kept.
+		HashSet<string> saved = next.Saves
+			.Where(item => item.ItemId != null)
+			.Select(item => item.ItemId)
+			.ToHashSet();
+		Saves.RemoveAll(item => item.ItemId != null && saved.Contains(item.ItemId));
+		Saves.AddRange(next.Saves);
+		Deletes.AddRange(next.Deletes);
+		Creations.AddRange(next.Creations);
+		Updates.AddRange(next.Updates);
+		Deletions.AddRange(next.Deletions);
+		Origins.AddRange(next.Origins);
+		Requests += next.Requests;
+		return true;
+	}
+
+	private static Component CopyOf(Component component) => new(component.AccountId, component.Name)
+	{
+		Data = component.Data,
+		RawData = component.RawData,
+		Patch = component.Patch,
+		Version = component.Version,
+		ExpectedVersion = component.ExpectedVersion
+	};
+}
@@ -0,0 +1,187 @@
+using System;
+using System.Collections.Concurrent;
+using System.Collections.Generic;
+using System.Linq;
+using System.Security.Cryptography;
+using System.Text.Json;
+using PlayerService.Utilities;
+using Rumble.Platform.Common.Enums;
+using Rumble.Platform.Common.Models;
+using Rumble.Platform.Common.Services;
+using Rumble.Platform.Common.Utilities;
+using Rumble.Platform.Common.Utilities.JsonTools;
+
+namespace PlayerService.Services;
+
+/// <summary>
+/// Precompiles the game client's dynamic config for GET /config.  Keys are either plain ("purchaseTimeoutMs") or
+/// version overrides ("purchaseTimeoutMs:1.14.0"); a client gets the highest override at or below its own version.
+/// The override table is parsed once whenever the config changes, and each distinct client version resolves against
+/// it once; after that, /config is a dictionary lookup.
+///
+/// DynamicConfig is polled for changes, so a new value can take up to one interval to reach clients.
+/// </summary>
+public class ClientConfigService : PlatformTimerService
+{
+	private const string OVERRIDE = ":";
+	private const int MAX_MEMOIZED_VERSIONS = 1_000;
+
+	public class Resolved
+	{
+		public RumbleJson Body { get; init; }
+		public string ETag { get; init; }
+	}
+
+	private class Snapshot
+	{
+		public string Hash;
+		public RumbleJson Defaults;
+		public Dictionary<string, ConfigOverride[]> Overrides;
+		public List<string> ParsingErrors;
+		public readonly ConcurrentDictionary<string, Resolved> Memo = new();
+	}
+
+	private readonly object _lock = new();
+	private volatile Snapshot _snapshot;
+
+	public ClientConfigService() : base(5_000) { }
+
+	/// <summary>
+	/// Returns the /config response for a client version, and the ETag that identifies it.  The body is shared between
+	/// requests and must not be modified.
+	/// </summary>
+	public Resolved Resolve(Version clientVersion)
+	{
+		Snapshot snapshot = _snapshot ?? Rebuild();
+		string key = clientVersion.ToString();
+
+		if (snapshot.Memo.TryGetValue(key, out Resolved output))
+			return output;
+
+		// Client versions come from the query string; don't let arbitrary ones grow the memo forever.
+		if (snapshot.Memo.Count >= MAX_MEMOIZED_VERSIONS)
+			snapshot.Memo.Clear();
+		return snapshot.Memo.GetOrAdd(key, _ => Compile(snapshot, clientVersion));
+	}
+
+	private static Resolved Compile(Snapshot snapshot, Version clientVersion)
+	{
+		RumbleJson variables = new();
+		foreach (KeyValuePair<string, object> pair in snapshot.Defaults)
+			variables[pair.Key] = pair.Value;
+		foreach ((string key, ConfigOverride[] values) in snapshot.Overrides)
+		{
+			// Overrides are sorted newest first; the first one the client has reached wins.
+			ConfigOverride match = values.FirstOrDefault(o => clientVersion.CompareTo(o.Version) >= 0);
+			if (match != null)
+				variables[key] = match.Value;
+		}
+
+		RumbleJson body = new()
+		{
+			{ "success", true }, // TODO: Remove this after the client is no longer dependent on it; hardcoded on 2022.11.22
+			{ "clientVersion", clientVersion.ToString() },
+			{ "clientVars", variables.Sort() }
+		};
+		if (snapshot.ParsingErrors.Any())
+			body["parsingErrors"] = snapshot.ParsingErrors;
+
+		return new Resolved
+		{
+			Body = body,
+			ETag = $"\"{snapshot.Hash}-{clientVersion}\""
+		};
+	}
+
+	private Snapshot Rebuild()
+	{
+		RumbleJson config = DynamicConfig.Instance?.GetValuesFor(Audience.GameClient) ?? new RumbleJson();
+		string hash = Hash(config);
+
+		lock (_lock)
+		{
+			if (_snapshot?.Hash == hash)
+				return _snapshot;
+
+			RumbleJson defaults = new();
+			List<ConfigOverride> overrides = new();
+			List<string> parsingErrors = new();
+			foreach (KeyValuePair<string, object> pair in config)
+			{
+				int index = pair.Key.IndexOf(OVERRIDE, StringComparison.Ordinal);
+
+				string key = index switch
+				{
+					-1 => pair.Key,
+					>= 0 when pair.Key.StartsWith("default") => null,
+					_ => pair.Key[..index]
+				};
+				if (key == null)
+					continue;
+
+				string version = index > -1
+					? pair.Key[(index + 1)..]
+					: null;
+
+				if (string.IsNullOrWhiteSpace(version))
+				{
+					defaults[key] = pair.Value;
+					continue;
+				}
+
+				try
+				{
+					overrides.Add(new ConfigOverride
+					{
+						Key = key,
+						Version = new Version(version),
+						Value = pair.Value
+					});
+				}
+				catch (Exception e)
+				{
+					if (!PlatformEnvironment.IsProd)
+						parsingErrors.Add(index > -1
+							? $"'{pair.Key}' Couldn't parse version; expected format is 'key:version'"
+							: $"'{pair.Key}' Couldn't parse variable; {e?.Message}"
+						);
+				}
+			}
+
+			// OrderByDescending is stable, so equal versions keep their config order, as they did before precompiling.
+			_snapshot = new Snapshot
+			{
+				Hash = hash,
+				Defaults = defaults,
+				Overrides = overrides
+					.GroupBy(o => o.Key)
+					.ToDictionary(
+						group => group.Key,
+						group => group
+							.OrderByDescending(o => o.Version)
+							.ToArray()
+					),
+				ParsingErrors = parsingErrors
+			};
+			return _snapshot;
+		}
+	}
+
+	private static string Hash(RumbleJson config)
+	{
+		byte[] json = JsonSerializer.SerializeToUtf8Bytes(config.OrderBy(pair => pair.Key, StringComparer.Ordinal));
+		return Convert.ToHexString(SHA256.HashData(json))[..16].ToLower();
+	}
+
+	protected override void OnElapsed()
+	{
+		try
+		{
+			Rebuild();
+		}
+		catch (Exception e)
+		{
+			Log.Error(Owner.Will, "Unable to rebuild client config; /config will keep serving the previous values.", exception: e);
+		}
+	}
+}
@@ -0,0 +1,404 @@
+using System;
+using System.Collections.Concurrent;
+using System.Collections.Generic;
+using System.Linq;
+using System.Threading;
+using System.Threading.Tasks;
+using MongoDB.Bson;
+using MongoDB.Bson.Serialization;
+using PlayerService.Models;
+using Rumble.Platform.Common.Enums;
+using Rumble.Platform.Common.Services;
+using Rumble.Platform.Common.Utilities;
+using Rumble.Platform.Common.Utilities.JsonTools;
+using StackExchange.Redis;
+
+namespace PlayerService.Services;
+
+/// <summary>
+/// Caches components by account and component name.  The first tier is an in-process LRU bounded by the BSON size of
+/// the cached data; when componentCacheRedis is configured, Redis is a second tier shared by every pod, and also
+/// carries invalidations between pods.  Without Redis, each pod only sees its own writes, so a multi-pod deployment
+/// should configure it before enabling the cache.
+///
+/// Writers must call Refresh() or Invalidate() after their transaction commits.  Every invalidation stamps the key
+/// with a new epoch, and a read only fills the cache if nothing touched the key since that read started; this keeps a
+/// slow read from putting stale data back after a write.  Commits can also refresh out of order, so neither tier
+/// replaces a component with an older version than the newest one it has seen for that key.
+/// </summary>
+public class ComponentCacheService : PlatformTimerService
+{
+	public const string CONFIG_SIZE = "componentCacheMB";
+	public const string CONFIG_REDIS = "componentCacheRedis";
+	private const string CHANNEL = "player-service:component-cache";
+	private const string KEY_PREFIX = "player-service:c:";
+	private const string DB_KEY_DATA = "data";
+	private const string DB_KEY_VERSION = "v";
+
+	private static int SizeMB => Math.Max(0, DynamicConfig.Instance?.Optional<int>(CONFIG_SIZE) ?? 0);
+	private static string RedisConnection => DynamicConfig.Instance?.Optional<string>(CONFIG_REDIS);
+	private static readonly TimeSpan RedisExpiration = TimeSpan.FromMinutes(10);
+
+	// Writes the data unless the version key holds a newer version, or, for fills, unless the data is already there.
+	// The version key outlives invalidations, which only delete the data, so a late write can't slip in after one.
+	private const string REDIS_WRITE = @"
+local newest = tonumber(redis.call('GET', KEYS[2]) or '-1')
+if newest > tonumber(ARGV[2]) then return 0 end
+if ARGV[3] == '0' and redis.call('EXISTS', KEYS[1]) == 1 then return 0 end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[4])
+redis.call('SET', KEYS[2], ARGV[2], 'PX', ARGV[4])
+return 1";
+
+	public bool Enabled => SizeMB > 0;
+
+	private class Entry
+	{
+		public string Key;
+		public RumbleJson Data;
+		public int Version;
+		public long Bytes;
+	}
+
+	private readonly object _lock = new();
+	private readonly Dictionary<string, LinkedListNode<Entry>> _entries = new();
+	private readonly LinkedList<Entry> _recent = new();
+	private long _bytes;
+
+	// Epochs: a global clock, the last time each key was invalidated, and the oldest point still tracked.
+	private long _clock;
+	private long _trackedSince;
+	private readonly ConcurrentDictionary<string, long> _invalidated = new();
+	// The newest version refreshed for each key, pruned along with its stamp.
+	private readonly ConcurrentDictionary<string, int> _newest = new();
+
+	private readonly string _instance = Guid.NewGuid().ToString("N");
+	private readonly object _redisLock = new();
+	private ConnectionMultiplexer _redis;
+	private string _redisConnection;
+
+	private long _hits;
+	private long _redisHits;
+	private long _misses;
+	private long _staleFills;
+	private long _evictions;
+
+	// Invalidation stamps only matter while a read that started before them is still running; they're pruned once
+	// they're a full interval old, and reads older than that are never used to fill.
+	public ComponentCacheService() : base(30_000) { }
+
+	private static string KeyFor(string accountId, string name) => $"{accountId}:{name}";
+
+	// The hash tag keeps both keys in one slot, which the write script needs on a cluster.
+	private static RedisKey DataKey(string key) => $"{KEY_PREFIX}{{{key}}}";
+	private static RedisKey VersionKey(string key) => $"{KEY_PREFIX}{{{key}}}:v";
+
+	/// <summary>
+	/// Marks the start of a read.  Pass the result to Fill() with whatever the read returns.
+	/// </summary>
+	public long Begin() => Interlocked.Read(ref _clock);
+
+	/// <summary>
+	/// Returns cached components for the requested names and the names that still need to be read.
+	/// </summary>
+	public async Task<(List<Component> found, string[] missing)> LookupAsync(string accountId, IEnumerable<string> names)
+	{
+		string[] requested = names.ToArray();
+		if (!Enabled)
+			return (new List<Component>(), requested);
+
+		List<Component> found = new();
+		List<string> missing = new();
+		foreach (string name in requested)
+		{
+			Entry entry = Get(KeyFor(accountId, name));
+			if (entry != null)
+			{
+				Interlocked.Increment(ref _hits);
+				found.Add(new Component(accountId, name, entry.Data) { Version = entry.Version });
+			}
+			else
+				missing.Add(name);
+		}
+
+		IDatabase redis = Redis()?.GetDatabase();
+		if (redis == null || !missing.Any())
+		{
+			Interlocked.Add(ref _misses, missing.Count);
+			return (found, missing.ToArray());
+		}
+
+		long started = Begin();
+		RedisValue[] values;
+		try
+		{
+			values = await redis.StringGetAsync(missing.Select(name => DataKey(KeyFor(accountId, name))).ToArray());
+		}
+		catch (Exception e)
+		{
+			Log.Warn(Owner.Will, "Unable to read components from Redis.", exception: e);
+			Interlocked.Add(ref _misses, missing.Count);
+			return (found, missing.ToArray());
+		}
+
+		List<string> stillMissing = new();
+		for (int i = 0; i < missing.Count; i++)
+		{
+			if (!values[i].HasValue)
+			{
+				stillMissing.Add(missing[i]);
+				continue;
+			}
+			BsonDocument document = BsonSerializer.Deserialize<BsonDocument>((byte[])values[i]);
+			Component component = new(accountId, missing[i], BsonSerializer.Deserialize<RumbleJson>(document[DB_KEY_DATA].AsBsonDocument))
+			{
+				Version = document[DB_KEY_VERSION].ToInt32()
+			};
+			Interlocked.Increment(ref _redisHits);
+			Put(KeyFor(accountId, missing[i]), component, started, ((byte[])values[i]).Length);
+			found.Add(component);
+		}
+		Interlocked.Add(ref _misses, stillMissing.Count);
+
+		return (found, stillMissing.ToArray());
+	}
+
+	/// <summary>
+	/// Caches components read from Mongo, unless a write touched them after the read began.
+	/// </summary>
+	public void Fill(IEnumerable<Component> components, long started)
+	{
+		if (!Enabled)
+			return;
+		foreach (Component component in components)
+		{
+			byte[] bson = Serialize(component);
+			if (Put(KeyFor(component.AccountId, component.Name), component, started, bson.Length))
+				WriteRedis(KeyFor(component.AccountId, component.Name), bson, component.Version, publish: false, overwrite: false);
+		}
+	}
+
+	/// <summary>
+	/// Replaces a cached component with data that was just committed, unless a newer version has already been cached.
+	/// </summary>
+	public void Refresh(string accountId, string name, RumbleJson data, int version)
+	{
+		if (!Enabled)
+			return;
+		string key = KeyFor(accountId, name);
+		if (_newest.AddOrUpdate(key, version, (_, newest) => Math.Max(newest, version)) > version)
+		{
+			Interlocked.Increment(ref _staleFills);
+			return;
+		}
+		Stamp(key);
+
+		Component component = new(accountId, name, data) { Version = version };
+		byte[] bson = Serialize(component);
+		Put(key, component, Begin(), bson.Length);
+		WriteRedis(key, bson, version, publish: true, overwrite: true);
+	}
+
+	/// <summary>
+	/// Removes a component from every tier and every pod.  Call after any write that changes it.
+	/// </summary>
+	public void Invalidate(string accountId, params string[] names)
+	{
+		if (!Enabled)
+			return;
+		foreach (string name in names)
+		{
+			string key = KeyFor(accountId, name);
+			Evict(key);
+			WriteRedis(key, null, 0, publish: true, overwrite: true);
+		}
+	}
+
+	public RumbleJson Stats()
+	{
+		long hits = Interlocked.Read(ref _hits) + Interlocked.Read(ref _redisHits);
+		long misses = Interlocked.Read(ref _misses);
+		lock (_lock)
+			return new RumbleJson
+			{
+				{ "enabled", Enabled },
+				{ "redis", _redis != null },
+				{ "entries", _entries.Count },
+				{ "bytes", _bytes },
+				{ "maxBytes", SizeMB * 1_048_576L },
+				{ "hits", Interlocked.Read(ref _hits) },
+				{ "redisHits", Interlocked.Read(ref _redisHits) },
+				{ "misses", misses },
+				{ "hitRate", hits + misses == 0 ? 0 : (double)hits / (hits + misses) },
+				{ "staleFillsRejected", Interlocked.Read(ref _staleFills) },
+				{ "evictions", Interlocked.Read(ref _evictions) }
+			};
+	}
+
+	private Entry Get(string key)
+	{
+		lock (_lock)
+		{
+			if (!_entries.TryGetValue(key, out LinkedListNode<Entry> node))
+				return null;
+			_recent.Remove(node);
+			_recent.AddFirst(node);
+			return node.Value;
+		}
+	}
+
+	private bool Put(string key, Component component, long started, long bytes)
+	{
+		long maxBytes = SizeMB * 1_048_576L;
+		if (bytes > maxBytes / 10)
+			return false;
+
+		lock (_lock)
+		{
+			if (started < _trackedSince
+				|| _invalidated.TryGetValue(key, out long stamp) && stamp > started
+				|| _newest.TryGetValue(key, out int newest) && newest > component.Version)
+			{
+				Interlocked.Increment(ref _staleFills);
+				return false;
+			}
+
+			if (_entries.TryGetValue(key, out LinkedListNode<Entry> existing))
+				RemoveNode(existing);
+
+			LinkedListNode<Entry> node = _recent.AddFirst(new Entry
+			{
+				Key = key,
+				Data = component.Data,
+				Version = component.Version,
+				Bytes = bytes
+			});
+			_entries[key] = node;
+			_bytes += bytes;
+
+			while (_bytes > maxBytes && _recent.Last != null)
+			{
+				RemoveNode(_recent.Last);
+				Interlocked.Increment(ref _evictions);
+			}
+		}
+		return true;
+	}
+
+	private void Stamp(string key) => _invalidated[key] = Interlocked.Increment(ref _clock);
+
+	private void Evict(string key)
+	{
+		Stamp(key);
+		lock (_lock)
+			if (_entries.TryGetValue(key, out LinkedListNode<Entry> node))
+				RemoveNode(node);
+	}
+
+	private void RemoveNode(LinkedListNode<Entry> node)
+	{
+		_recent.Remove(node);
+		_entries.Remove(node.Value.Key);
+		_bytes -= node.Value.Bytes;
+	}
+
+	private static byte[] Serialize(Component component) => new BsonDocument
+	{
+		{ DB_KEY_DATA, (component.Data ?? new RumbleJson()).ToBsonDocument() },
+		{ DB_KEY_VERSION, component.Version }
+	}.ToBson();
+
+	/// <summary>
+	/// Writes or deletes the shared copy, and optionally tells the other pods to drop their own copy.  Fills from a
+	/// read don't overwrite, so a slow read on one pod can't replace data another pod just committed, and no write
+	/// replaces a newer version; the short expiration bounds anything that slips through.  A refresh Redis turns down
+	/// is older than what another pod committed, so it's dropped from this pod too.  Redis failures are logged, not
+	/// thrown; the cache is never allowed to fail a request.
+	/// </summary>
+	private void WriteRedis(string key, byte[] bson, int version, bool publish, bool overwrite)
+	{
+		ConnectionMultiplexer redis = Redis();
+		if (redis == null)
+			return;
+		try
+		{
+			IDatabase db = redis.GetDatabase();
+			if (bson == null)
+				db.KeyDelete(DataKey(key), CommandFlags.FireAndForget);
+			else
+				db.ScriptEvaluateAsync(REDIS_WRITE, new[] { DataKey(key), VersionKey(key) }, new RedisValue[]
+				{
+					bson,
+					version,
+					overwrite ? 1 : 0,
+					(long)RedisExpiration.TotalMilliseconds
+				}).ContinueWith(write =>
+				{
+					if (write.IsFaulted)
+						Log.Warn(Owner.Will, "Unable to write component cache to Redis.", exception: write.Exception);
+					else if (overwrite && (int)write.Result == 0)
+						Evict(key);
+				});
+			if (publish)
+				redis.GetSubscriber().Publish(new RedisChannel(CHANNEL, RedisChannel.PatternMode.Literal), $"{_instance}|{key}", CommandFlags.FireAndForget);
+		}
+		catch (Exception e)
+		{
+			Log.Warn(Owner.Will, "Unable to write component cache to Redis.", exception: e);
+		}
+	}
+
+	private ConnectionMultiplexer Redis()
+	{
+		string connection = RedisConnection;
+		if (string.IsNullOrWhiteSpace(connection))
+			return null;
+		if (_redisConnection == connection)
+			return _redis;
+
+		lock (_redisLock)
+		{
+			if (_redisConnection == connection)
+				return _redis;
+			try
+			{
+				ConnectionMultiplexer redis = ConnectionMultiplexer.Connect(connection);
+				redis.GetSubscriber().Subscribe(new RedisChannel(CHANNEL, RedisChannel.PatternMode.Literal), (_, message) =>
+				{
+					string[] parts = message.ToString().Split('|', 2);
+					if (parts.Length == 2 && parts[0] != _instance)
+						Evict(parts[1]);
+				});
+				_redis?.Dispose();
+				_redis = redis;
+				_redisConnection = connection;
+			}
+			catch (Exception e)
+			{
+				Log.Error(Owner.Will, "Unable to connect to Redis for the component cache; using the in-process cache only.", exception: e);
+				_redis?.Dispose();
+				_redis = null;
+				_redisConnection = connection;
+			}
+			return _redis;
+		}
+	}
+
+	protected override void OnElapsed()
+	{
+		long cutoff = Interlocked.Read(ref _trackedSince);
+		Interlocked.Exchange(ref _trackedSince, Interlocked.Read(ref _clock));
+		foreach (KeyValuePair<string, long> pair in _invalidated.Where(pair => pair.Value <= cutoff))
+		{
+			_invalidated.TryRemove(pair.Key, out _);
+			_newest.TryRemove(pair.Key, out _);
+		}
+
+		if (!Enabled)
+			lock (_lock)
+			{
+				_entries.Clear();
+				_recent.Clear();
+				_bytes = 0;
+			}
+	}
+}
@@ -12,6 +12,12 @@ namespace PlayerService.Services.ComponentServices;
 public class AccountService : ComponentService
 {
 	public const string DB_KEY_SCREENNAME = "accountName";
+
+#pragma warning disable
+	private readonly RecordService _recordService;
+	private readonly ComponentCacheService _componentCache;
+#pragma warning restore
+
 	public AccountService() : base(Component.ACCOUNT) { }
 
 	// NOTE: This is a kluge; the game server may overwrite this component if their session is active.
@@ -20,6 +26,15 @@ public class AccountService : ComponentService
 	{
 		try
 		{
+			ComponentStorage storage = RecordService.ConfiguredStorage;
+			if (storage != ComponentStorage.Collections)
+				_recordService.SetField(accountId, Component.ACCOUNT, DB_KEY_SCREENNAME, screenname, incrementVersion: fromAdmin);
+			if (storage == ComponentStorage.Record)
+			{
+				_componentCache.Invalidate(accountId, Component.ACCOUNT);
+				return 1;
+			}
+
 			Component component = _collection
 				.Find(Builders<Component>.Filter.Eq(component => component.AccountId, accountId))
 				.FirstOrDefault();
@@ -27,6 +42,7 @@ public class AccountService : ComponentService
 			if (fromAdmin)
 				component.Version++;
 			Update(component);
+			_componentCache.Invalidate(accountId, Component.ACCOUNT);
 			
 			return 1;
 		}
@@ -53,6 +69,7 @@ public class AccountService : ComponentService
 		account.Data["accountName"] = dummyText;
 		
 		Update(account);
+		_componentCache.Invalidate(token.AccountId, Component.ACCOUNT);
 
 		return 1;
 	}
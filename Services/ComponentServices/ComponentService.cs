@@ -1,11 +1,13 @@
 using System;
 using System.Collections.Generic;
 using System.Linq;
-using System.Threading;
 using System.Threading.Tasks;
+using MongoDB.Bson;
+using MongoDB.Bson.Serialization;
 using MongoDB.Driver;
 using PlayerService.Exceptions;
 using PlayerService.Models;
+using PlayerService.Utilities;
 using Rumble.Platform.Common.Enums;
 using Rumble.Platform.Common.Exceptions;
 using Rumble.Platform.Common.Services;
@@ -18,120 +20,186 @@ namespace PlayerService.Services.ComponentServices;
 public abstract class ComponentService : PlatformMongoService<Component>
 {
 #pragma warning disable
-	private readonly ApiService _apiService;
+	private readonly StorageStatsService _storageStats;
+	private readonly RecordService _recordService;
 #pragma warning restore
+	private const string DB_KEY_SOURCE = "_component";
 	private new string Name { get; set; } // TODO: done to silence warning, but needs to be renamed.
 	protected ComponentService(string name) : base("c_" + name) => Name = name;
 
 	public Component Lookup(string accountId)
 	{
+		_storageStats?.Read(StorageStatsService.COLLECTIONS);
 		Component output = FindOne(component => component.AccountId == accountId) ?? Create(new Component(accountId));
 		output.Name = Name;
 		return output;
 	}
 
-	public Task<Component> LookupAsync(string accountId)
+	/// <summary>
+	/// Returns the account's component, or an empty one built in memory if it doesn't exist yet.  Nothing is written
+	/// for a missing component; the first /update creates it.
+	/// </summary>
+	public async Task<Component> LookupAsync(string accountId)
 	{
-		Component output = _collection
-			.FindAsync(component => component.AccountId == accountId).Result.FirstOrDefault()
-			?? Create(new Component(accountId));
+		using RequestTimings.Scope timing = RequestTimings.Measure($"c_{Name}.lookup");
+		_storageStats?.Read(StorageStatsService.COLLECTIONS);
+		Component output = await _collection
+			.Find(Builders<Component>.Filter.Eq(component => component.AccountId, accountId))
+			.FirstOrDefaultAsync()
+			?? new Component(accountId);
 		output.Name = Name;
-		return Task.FromResult(output);
+		return output;
 	}
 
-	public void Delete(Player player) => _collection.DeleteMany(new FilterDefinitionBuilder<Component>().Eq(Component.DB_KEY_ACCOUNT_ID, player.AccountId));
-
-	public List<Component> Find(IEnumerable<string> accountIds) => _collection
-		.Find(Builders<Component>.Filter.In(component => component.AccountId, accountIds))
-		.ToList();
-
-	public async Task<bool> UpdateAsync(string accountId, RumbleJson data, IClientSessionHandle session, int? version, string origin = null, int retries = 5)
+	/// <summary>
+	/// Reads one account's components from several collections in a single round trip, using $unionWith to chain
+	/// the collections together.  Missing components are built in memory, as in LookupAsync().  An account ID that isn't
+	/// an ObjectId can't own anything, so it gets empty components without a query.
+	/// </summary>
+	public static async Task<List<Component>> LookupAsync(string accountId, IEnumerable<ComponentService> services)
 	{
-		try
+		ComponentService[] requested = services.Distinct().ToArray();
+		if (!requested.Any())
+			return new List<Component>();
+
+		using RequestTimings.Scope timing = RequestTimings.Measure("components.lookup");
+		List<BsonDocument> results = new();
+		if (ObjectId.TryParse(accountId, out ObjectId aid))
 		{
-			// TODO: This is a kluge to get 1.13 out.  This should be resolved properly later.
-			// This is super janky.  However, Mongo's driver appears to have asynchronous conflicts when using
-			// the same session.  Without this Sleep(), there's about a 30-50% chance of the command failing, with a message
-			// similar to "The active transaction number is -1."
-			// Adding the random sleep makes this almost impossible to reproduce locally, but can still happen.
-			// Increasing the duration makes it less likely, but every duration increase also means a longer response time
-			// to the client.  Retries are both more reliable and faster.
-			Thread.Sleep(new Random().Next(0, (int)Math.Pow(2, 6 - retries)));
-			
-			UpdateDefinitionBuilder<Component> builder = Builders<Component>.Update;
-			UpdateDefinition<Component> update = builder.Set(component => component.Data, data);
-			if (VersionNumberProvided(accountId, version, origin))
-				update = builder.Combine(update, builder.Set(component => component.Version, version));
-
-			await _collection
-				.FindOneAndUpdateAsync<Component>(
-					session: session,
-					filter: component => component.AccountId == accountId,
-					update: update,
-					options: new FindOneAndUpdateOptions<Component>()
-					{
-						IsUpsert = true,
-						ReturnDocument = ReturnDocument.After
-					}
-				);
-			return true;
+			BsonDocument match = new("$match", new BsonDocument(Component.DB_KEY_ACCOUNT_ID, aid));
+			BsonDocument Tag(ComponentService service) => new("$addFields", new BsonDocument(DB_KEY_SOURCE, service.Name));
+
+			List<BsonDocument> pipeline = new() { match, Tag(requested.First()) };
+			foreach (ComponentService service in requested.Skip(1))
+				pipeline.Add(new BsonDocument("$unionWith", new BsonDocument
+				{
+					{ "coll", service._collection.CollectionNamespace.CollectionName },
+					{ "pipeline", new BsonArray { match, Tag(service) } }
+				}));
+
+			results = await (await requested.First()._collection.AggregateAsync<BsonDocument>(pipeline)).ToListAsync();
+			requested.First()._storageStats?.Read(StorageStatsService.COLLECTIONS);
 		}
-		catch (MongoCommandException e)
+
+		// aid isn't unique, so keep the first document per component, as FindOne() would.
+		Dictionary<string, Component> found = new();
+		foreach (BsonDocument document in results)
 		{
-			Log.Local(Owner.Will, e.Message);
-			if (retries > 0)
-				return await UpdateAsync(accountId, data, session, version, retries: --retries);
-			Log.Error(Owner.Will, $"Could not update component {Name}.", data: new
-			{
-				Detail = $"Session state invalid, even after retrying with exponential backoff."
-			}, exception: e);
-			_apiService.Alert(
-				title: "Player Component Update Failure",
-				message: "There may be concurrency conflicts with too many components being updated at once.",
-				countRequired: 15,
-				timeframe: 600,
-				owner: Owner.Will,
-				impact: ImpactType.ServicePartiallyUsable,
-				confluenceLink: "https://rumblegames.atlassian.net/wiki/spaces/TH/pages/3549429770/player-service+Player+Component+Update+Failure"
-			);
-			return false;
+			string name = document[DB_KEY_SOURCE].AsString;
+			if (found.ContainsKey(name))
+				continue;
+			document.Remove(DB_KEY_SOURCE);
+			found[name] = BsonSerializer.Deserialize<Component>(document);
 		}
+
+		return requested
+			.Select(service =>
+			{
+				Component output = found.GetValueOrDefault(service.Name) ?? new Component(accountId);
+				output.Name = service.Name;
+				return output;
+			})
+			.ToList();
 	}
 
-	public bool VersionNumberProvided(string accountId, int? version, string origin)
+	public List<Component> Find(IEnumerable<string> accountIds)
 	{
-		// Log.Local(Owner.Will, $"{Name} | {version}");
-		// Getting the current version for any update might be useful, but until it's requested,
-		// we'll return early to avoid one Mongo hit.
-		if (version is null or 0)
-			return false;
+		_storageStats?.Read(StorageStatsService.COLLECTIONS);
+		return _collection
+			.Find(Builders<Component>.Filter.In(component => component.AccountId, accountIds))
+			.ToList();
+	}
 
-		try
-		{
-			int current = _collection
-				.Find(filter: component => component.AccountId == accountId)
-				.Project(Builders<Component>.Projection.Expression(component => component.Version))
-				.First();
-		
-			if (current != version - 1 && !PlatformEnvironment.SwarmMode)
-				throw new ComponentVersionException(Name, currentVersion: current, updateVersion: (int)version, origin);
-
-			return true;
-		}
-		catch (InvalidOperationException) // thrown when a component isn't found
+	/// <summary>
+	/// Deletes the player's component from its collection and from their record, which reads prefer in dual and record
+	/// modes.
+	/// </summary>
+	public void Delete(Player player)
+	{
+		_collection.DeleteMany(new FilterDefinitionBuilder<Component>().Eq(Component.DB_KEY_ACCOUNT_ID, player.AccountId));
+		_recordService?.Unset(player.AccountId, Name);
+	}
+
+	/// <summary>
+	/// Returns account IDs in ascending order, starting after the provided one.  Used to walk the collection in
+	/// batches, e.g. when migrating to single-document storage.
+	/// </summary>
+	public List<string> PageAccountIds(string after, int limit) => _collection
+		.Find(string.IsNullOrWhiteSpace(after)
+			? Builders<Component>.Filter.Empty
+			: Builders<Component>.Filter.Gt(component => component.AccountId, after)
+		)
+		.SortBy(component => component.AccountId)
+		.Limit(limit)
+		.Project(component => component.AccountId)
+		.ToList();
+
+	public Task<IClientSessionHandle> StartSessionAsync() => _collection.Database.Client.StartSessionAsync();
+
+	/// <summary>
+	/// Reads the component's data inside the caller's transaction, so writes made earlier in it are visible.  Returns
+	/// null if the component doesn't exist.
+	/// </summary>
+	public async Task<RumbleJson> FindDataAsync(string accountId, IClientSessionHandle session)
+	{
+		Component output = await _collection
+			.Find(session, Builders<Component>.Filter.Eq(component => component.AccountId, accountId))
+			.FirstOrDefaultAsync();
+		_storageStats?.Read(StorageStatsService.COLLECTIONS);
+		return output?.Data;
+	}
+
+	/// <summary>
+	/// Writes a component inside the caller's transaction.  With a patch, only the patched paths are written and data
+	/// is ignored; with rawData, that document is written as-is instead of serializing data.  Mongo errors are left to
+	/// propagate so that WithTransactionAsync() can retry transient failures.
+	/// </summary>
+	public async Task UpdateAsync(string accountId, RumbleJson data, IClientSessionHandle session, int? version, string origin = null, PatchOperation[] patch = null, BsonDocument rawData = null, int? expectedVersion = null)
+	{
+		using RequestTimings.Scope timing = RequestTimings.Measure($"c_{Name}");
+		FilterDefinitionBuilder<Component> filter = Builders<Component>.Filter;
+		UpdateDefinitionBuilder<Component> builder = Builders<Component>.Update;
+		UpdateDefinition<Component> update = patch != null
+			? PatchOperation.ToUpdate<Component>(Component.DB_KEY_DATA, patch)
+			: rawData != null
+				? new BsonDocumentUpdateDefinition<Component>(new BsonDocument("$set", new BsonDocument(Component.DB_KEY_DATA, rawData)))
+				: builder.Set(component => component.Data, data);
+		FilterDefinition<Component> byAccount = filter.Eq(component => component.AccountId, accountId);
+
+		// No version means no check; write unconditionally.
+		if (version is null or 0)
 		{
-			_collection.UpdateOne(
-				filter: component => component.AccountId == accountId,
-				update: Builders<Component>.Update
-					.Set(component => component.AccountId, accountId)
-					.Set(component => component.Version, 0),
-				options: new UpdateOptions
-				{
-					IsUpsert = true
-				}
-			);
-			return true;
+			await _collection.UpdateOneAsync(session, byAccount, update, new UpdateOptions { IsUpsert = true });
+			_storageStats?.Write(StorageStatsService.COLLECTIONS);
+			return;
 		}
-		
+
+		update = builder.Combine(update, builder.Set(component => component.Version, version));
+
+		// The version check is part of the write: only the document at version - 1, or the provided expected version,
+		// matches.  Components created before versioning have no "v" field, which is the same as version 0.
+		int expected = expectedVersion ?? (int)version - 1;
+		FilterDefinition<Component> previous = expected == 0
+			? filter.Or(filter.Eq(Component.DB_KEY_VERSION, 0), filter.Exists(Component.DB_KEY_VERSION, exists: false))
+			: filter.Eq(Component.DB_KEY_VERSION, expected);
+
+		UpdateResult result = await _collection.UpdateOneAsync(session, filter.And(byAccount, previous), update);
+		_storageStats?.Write(StorageStatsService.COLLECTIONS);
+		if (result.MatchedCount > 0)
+			return;
+
+		// Nothing matched; the component is either missing or at a different version.  This costs one extra read,
+		// but only on the unhappy path.
+		BsonDocument current = await _collection
+			.Find(session, byAccount)
+			.Project(Builders<Component>.Projection.Include(Component.DB_KEY_VERSION))
+			.FirstOrDefaultAsync();
+		_storageStats?.Read(StorageStatsService.COLLECTIONS);
+
+		if (current != null && !PlatformEnvironment.SwarmMode)
+			throw new ComponentVersionException(Name, currentVersion: current.GetValue(Component.DB_KEY_VERSION, 0).ToInt32(), updateVersion: (int)version, origin);
+
+		await _collection.UpdateOneAsync(session, byAccount, update, new UpdateOptions { IsUpsert = true });
+		_storageStats?.Write(StorageStatsService.COLLECTIONS);
 	}
 }
\ No newline at end of file
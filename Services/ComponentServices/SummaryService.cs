@@ -1,8 +1,135 @@
+using System.Collections.Generic;
+using System.Linq;
+using System.Threading.Tasks;
+using MongoDB.Driver;
 using PlayerService.Models;
+using Rumble.Platform.Common.Models;
+using Rumble.Platform.Common.Utilities.JsonTools;
 
 namespace PlayerService.Services.ComponentServices;
 
+/// <summary>
+/// Keeps a compact, server-maintained copy of what /lookup returns for each player, so guild, chat, and leaderboard
+/// screens can resolve hundreds of accounts with one indexed query instead of reading full players and account
+/// components.  The data holds exactly the /lookup fields except the account ID.
+///
+/// A summary is created in full by the storage migration, from the players and c_account collections; until then,
+/// lookups build the account's result the same way without writing it.
+/// After that, account component writes and screenname changes keep it current; they only update summaries that
+/// already exist, so a partial summary is never served.  Writes made here drop the summary from the component cache;
+/// writes made in a caller's transaction leave that to the caller, once the transaction has committed.
+/// </summary>
 public class SummaryService : ComponentService
 {
+	public const string KEY_AVATAR = "accountAvatar";
+	public const string KEY_LEVEL = "accountLevel";
+	public const string KEY_CHAT_TITLE = "chatTitle";
+	public const string KEY_HERO_SCORE = "totalHeroScore";
+
+	// The account component's fields that SyncAccountAsync() copies.
+	public static readonly string[] ACCOUNT_KEYS = { KEY_AVATAR, KEY_LEVEL, KEY_CHAT_TITLE, KEY_HERO_SCORE };
+
+#pragma warning disable
+	private readonly ComponentCacheService _componentCache;
+#pragma warning restore
+
 	public SummaryService() : base(Component.SUMMARY) { }
-}
\ No newline at end of file
+
+	public static string FormatDiscriminator(int? discriminator) => discriminator.ToString().PadLeft(4, '0');
+
+	/// <summary>
+	/// Returns /lookup results for every account that has a summary.  Accounts without one are returned in missing.
+	/// </summary>
+	public List<RumbleJson> Lookup(string[] accountIds, out string[] missing)
+	{
+		List<Component> summaries = _collection
+			.Find(Builders<Component>.Filter.In(component => component.AccountId, accountIds))
+			.Project<Component>(Builders<Component>.Projection
+				.Include(Component.DB_KEY_ACCOUNT_ID)
+				.Include(Component.DB_KEY_DATA)
+			)
+			.ToList();
+
+		List<RumbleJson> output = new();
+		HashSet<string> found = new();
+		foreach (Component summary in summaries.Where(summary => found.Add(summary.AccountId)))
+		{
+			RumbleJson result = new() { { TokenInfo.FRIENDLY_KEY_ACCOUNT_ID, summary.AccountId } };
+			foreach (KeyValuePair<string, object> pair in summary.Data)
+				result[pair.Key] = pair.Value;
+			output.Add(result);
+		}
+
+		missing = accountIds
+			.Where(id => !found.Contains(id))
+			.Distinct()
+			.ToArray();
+		return output;
+	}
+
+	/// <summary>
+	/// Creates summaries from freshly built /lookup results, during the storage migration.  Existing summaries are left
+	/// alone, since they may already hold a newer write than the data these results were built from.
+	/// </summary>
+	public void Create(IEnumerable<RumbleJson> results)
+	{
+		WriteModel<Component>[] inserts = results
+			.Select(result =>
+			{
+				RumbleJson data = new();
+				foreach (KeyValuePair<string, object> pair in result.Where(pair => pair.Key != TokenInfo.FRIENDLY_KEY_ACCOUNT_ID))
+					data[pair.Key] = pair.Value;
+				return new UpdateOneModel<Component>(
+					filter: Builders<Component>.Filter.Eq(component => component.AccountId, result.Require<string>(TokenInfo.FRIENDLY_KEY_ACCOUNT_ID)),
+					update: Builders<Component>.Update.SetOnInsert(component => component.Data, data)
+				) { IsUpsert = true };
+			})
+			.ToArray<WriteModel<Component>>();
+
+		if (!inserts.Any())
+			return;
+		_collection.BulkWrite(inserts, new BulkWriteOptions { IsOrdered = false });
+		foreach (RumbleJson result in results)
+			_componentCache.Invalidate(result.Require<string>(TokenInfo.FRIENDLY_KEY_ACCOUNT_ID), Component.SUMMARY);
+	}
+
+	/// <summary>
+	/// Copies the lookup fields from an account component that's being written in the caller's transaction.  The caller
+	/// invalidates the cached summary after it commits.
+	/// </summary>
+	public Task SyncAccountAsync(string accountId, RumbleJson account, IClientSessionHandle session) => _collection.UpdateOneAsync(
+		session,
+		filter: Builders<Component>.Filter.Eq(component => component.AccountId, accountId),
+		update: Builders<Component>.Update
+			.Set($"{Component.DB_KEY_DATA}.{KEY_AVATAR}", account?.Optional<string>(KEY_AVATAR))
+			.Set($"{Component.DB_KEY_DATA}.{KEY_LEVEL}", account?.Optional<int?>(KEY_LEVEL) ?? -1)
+			.Set($"{Component.DB_KEY_DATA}.{KEY_CHAT_TITLE}", account?.Optional<string>(KEY_CHAT_TITLE))
+			.Set($"{Component.DB_KEY_DATA}.{KEY_HERO_SCORE}", account?.Optional<long>(KEY_HERO_SCORE) ?? 0)
+	);
+
+	/// <summary>
+	/// Updates the screenname, and the discriminator when one is provided.
+	/// </summary>
+	public void SyncScreenname(string accountId, string screenname, int? discriminator = null)
+	{
+		UpdateDefinition<Component> update = Builders<Component>.Update.Set($"{Component.DB_KEY_DATA}.{Player.FRIENDLY_KEY_SCREENNAME}", screenname);
+		if (discriminator != null)
+			update = update.Set($"{Component.DB_KEY_DATA}.{Player.FRIENDLY_KEY_DISCRIMINATOR}", FormatDiscriminator(discriminator));
+
+		_collection.UpdateOne(Builders<Component>.Filter.Eq(component => component.AccountId, accountId), update);
+		_componentCache.Invalidate(accountId, Component.SUMMARY);
+	}
+
+	/// <summary>
+	/// Drops the summary; the next lookup rebuilds it from the scrubbed player record.
+	/// </summary>
+	public override long ProcessGdprRequest(TokenInfo token, string dummyText)
+	{
+		if (string.IsNullOrWhiteSpace(token.AccountId))
+			return 0;
+
+		long output = _collection.DeleteMany(Builders<Component>.Filter.Eq(component => component.AccountId, token.AccountId)).DeletedCount;
+		_componentCache.Invalidate(token.AccountId, Component.SUMMARY);
+		return output;
+	}
+}
@@ -15,11 +15,19 @@ namespace PlayerService.Services.ComponentServices;
 
 public class WalletService : ComponentService
 {
+#pragma warning disable
+	private readonly RecordService _recordService;
+	private readonly ComponentCacheService _componentCache;
+#pragma warning restore
+
 	public WalletService() : base(Component.WALLET) { }
 
 	public bool SetCurrency(string accountId, string name, long amount, int version)
 	{
-		Component wallet = Lookup(accountId);
+		ComponentStorage storage = RecordService.ConfiguredStorage;
+		Component wallet = storage == ComponentStorage.Record
+			? _recordService.Lookup(accountId, Component.WALLET)
+			: Lookup(accountId);
 		List<RumbleJson> currencies = wallet.Data.Require<List<RumbleJson>>("currencies");
 		RumbleJson currency = currencies.FirstOrDefault(currency => currency.Require<string>("currencyId") == name);
 		if (currency != null)
@@ -40,10 +48,18 @@ public class WalletService : ComponentService
 		wallet.Data["currencies"] = currencies;
 		wallet.Version = version;
 
-		long affected = _collection.UpdateOne(
-			filter: component => component.Version == version - 1 && component.AccountId == accountId,
-			update: Builders<Component>.Update.Set(component => component.Data, wallet.Data)
-		).ModifiedCount;
+		long affected = storage == ComponentStorage.Record
+			? _recordService.SetData(accountId, Component.WALLET, wallet.Data, expectedVersion: version - 1)
+			: _collection.UpdateOne(
+				filter: component => component.Version == version - 1 && component.AccountId == accountId,
+				update: Builders<Component>.Update.Set(component => component.Data, wallet.Data)
+			).ModifiedCount;
+
+		// In dual mode, the collections are authoritative; the record just follows them.
+		if (storage == ComponentStorage.Dual && affected == 1)
+			_recordService.SetData(accountId, Component.WALLET, wallet.Data);
+		if (affected > 0)
+			_componentCache.Invalidate(accountId, Component.WALLET);
 
 		return affected switch
 		{
@@ -0,0 +1,222 @@
+using System.Collections.Generic;
+using System.Linq;
+using MongoDB.Bson;
+using MongoDB.Driver;
+using PlayerService.Models;
+using Rumble.Platform.Common.Services;
+
+namespace PlayerService.Services;
+
+/// <summary>
+/// Hands out discriminators from a pool per screenname (see DiscriminatorPool).  A claim is a single atomic update, no
+/// matter how crowded the name is, and a rename gives the old number back.
+///
+/// Pools are created by the first claim on a screenname, in the same upsert that claims from them.  They're seeded
+/// from the discriminators the name's players already hold, so numbers assigned before pools existed are never handed
+/// out again.
+/// </summary>
+public class DiscriminatorService : PlatformMongoService<DiscriminatorPool>
+{
+	public const int MAX_DISCRIMINATOR = 9_999;
+	private const string PLAYERS = "players";
+
+	public DiscriminatorService() : base("discriminators") { }
+
+	private static readonly BsonDocument HasFree = new("$gt", new BsonArray
+	{
+		new BsonDocument("$size", "$" + DiscriminatorPool.DB_KEY_FREE),
+		0
+	});
+
+	// Pops the first free number if there is one, otherwise advances Next, and records the number it took in Claimed.
+	// Nothing changes if the pool is full, or if an earlier stage in the same update already claimed a number; Claimed
+	// is 0 in the first case and kept in the second.  Every field is computed from the document as it was before the
+	// stage.
+	private static BsonDocument ClaimNext(bool afterDesired)
+	{
+		BsonDocument claimedEarlier = afterDesired
+			? new BsonDocument("$gt", new BsonArray { "$" + DiscriminatorPool.DB_KEY_CLAIMED, 0 })
+			: new BsonDocument("$literal", false);
+		BsonDocument claims = new("$and", new BsonArray
+		{
+			new BsonDocument("$not", new BsonArray { claimedEarlier }),
+			new BsonDocument("$or", new BsonArray
+			{
+				HasFree,
+				new BsonDocument("$lte", new BsonArray { "$" + DiscriminatorPool.DB_KEY_NEXT, MAX_DISCRIMINATOR })
+			})
+		});
+		BsonDocument Unless(string field, BsonValue value) => new("$cond", new BsonArray { claims, value, "$" + field });
+
+		return new BsonDocument("$set", new BsonDocument
+		{
+			{ DiscriminatorPool.DB_KEY_CLAIMED, new BsonDocument("$cond", new BsonArray
+			{
+				claims,
+				new BsonDocument("$cond", new BsonArray
+				{
+					HasFree,
+					new BsonDocument("$arrayElemAt", new BsonArray { "$" + DiscriminatorPool.DB_KEY_FREE, 0 }),
+					"$" + DiscriminatorPool.DB_KEY_NEXT
+				}),
+				new BsonDocument("$cond", new BsonArray { claimedEarlier, "$" + DiscriminatorPool.DB_KEY_CLAIMED, 0 })
+			}) },
+			{ DiscriminatorPool.DB_KEY_NEXT, Unless(DiscriminatorPool.DB_KEY_NEXT, new BsonDocument("$cond", new BsonArray
+			{
+				HasFree,
+				"$" + DiscriminatorPool.DB_KEY_NEXT,
+				new BsonDocument("$add", new BsonArray { "$" + DiscriminatorPool.DB_KEY_NEXT, 1 })
+			})) },
+			{ DiscriminatorPool.DB_KEY_FREE, Unless(DiscriminatorPool.DB_KEY_FREE, new BsonDocument("$cond", new BsonArray
+			{
+				HasFree,
+				new BsonDocument("$slice", new BsonArray { "$" + DiscriminatorPool.DB_KEY_FREE, 1, MAX_DISCRIMINATOR }),
+				"$" + DiscriminatorPool.DB_KEY_FREE
+			})) }
+		});
+	}
+
+	// Takes the number if it's free: either off the free list, or by moving Next past it and freeing everything it
+	// skipped.  Claimed is the number, or 0 if it was already taken, in which case nothing else changes.
+	private static BsonDocument ClaimDesired(int desired)
+	{
+		BsonDocument available = new("$or", new BsonArray
+		{
+			new BsonDocument("$in", new BsonArray { desired, "$" + DiscriminatorPool.DB_KEY_FREE }),
+			new BsonDocument("$lte", new BsonArray { "$" + DiscriminatorPool.DB_KEY_NEXT, desired })
+		});
+
+		return new BsonDocument("$set", new BsonDocument
+		{
+			{ DiscriminatorPool.DB_KEY_CLAIMED, new BsonDocument("$cond", new BsonArray { available, desired, 0 }) },
+			{ DiscriminatorPool.DB_KEY_FREE, new BsonDocument("$cond", new BsonArray
+			{
+				available,
+				new BsonDocument("$cond", new BsonArray
+				{
+					new BsonDocument("$in", new BsonArray { desired, "$" + DiscriminatorPool.DB_KEY_FREE }),
+					new BsonDocument("$filter", new BsonDocument
+					{
+						{ "input", "$" + DiscriminatorPool.DB_KEY_FREE },
+						{ "cond", new BsonDocument("$ne", new BsonArray { "$$this", desired }) }
+					}),
+					new BsonDocument("$concatArrays", new BsonArray
+					{
+						"$" + DiscriminatorPool.DB_KEY_FREE,
+						new BsonDocument("$range", new BsonArray { "$" + DiscriminatorPool.DB_KEY_NEXT, desired })
+					})
+				}),
+				"$" + DiscriminatorPool.DB_KEY_FREE
+			}) },
+			{ DiscriminatorPool.DB_KEY_NEXT, new BsonDocument("$cond", new BsonArray
+			{
+				available,
+				new BsonDocument("$max", new BsonArray { "$" + DiscriminatorPool.DB_KEY_NEXT, desired + 1 }),
+				"$" + DiscriminatorPool.DB_KEY_NEXT
+			}) }
+		});
+	}
+
+	private static FilterDefinition<DiscriminatorPool> For(string screenname) => Builders<DiscriminatorPool>.Filter
+		.Eq(pool => pool.Screenname, screenname);
+
+	private static UpdateDefinition<DiscriminatorPool> Stages(params BsonDocument[] stages) => Builders<DiscriminatorPool>.Update
+		.Pipeline(PipelineDefinition<DiscriminatorPool, DiscriminatorPool>.Create(stages));
+
+	/// <summary>
+	/// Claims the longest-released discriminator for the screenname, or the next unused one.  Returns null if all of
+	/// them are taken.
+	/// </summary>
+	public int? Claim(string screenname) => Claimed(ClaimFrom(screenname, For(screenname) & (
+		Builders<DiscriminatorPool>.Filter.SizeGt(pool => pool.Free, 0)
+		| Builders<DiscriminatorPool>.Filter.Lte(pool => pool.Next, MAX_DISCRIMINATOR)
+	), ClaimNext(afterDesired: false)));
+
+	/// <summary>
+	/// Claims a specific discriminator for the screenname if it's free, and otherwise the same one Claim(screenname)
+	/// would, in the same update.  Returns null if all of them are taken.
+	/// </summary>
+	public int? Claim(string screenname, int desired) => desired is < 1 or > MAX_DISCRIMINATOR
+		? Claim(screenname)
+		: Claimed(ClaimFrom(screenname, For(screenname), ClaimDesired(desired), ClaimNext(afterDesired: true)));
+
+	private static int? Claimed(DiscriminatorPool pool) => pool?.Claimed is > 0 and <= MAX_DISCRIMINATOR
+		? pool.Claimed
+		: null;
+
+	/// <summary>
+	/// Applies a claim to the screenname's pool and returns the pool after it.  A pool that exists takes a single
+	/// update, whether or not the claim succeeds.  Only when nothing matches are the players read, to create the pool
+	/// in an upsert.  That upsert fails with a duplicate key if the pool does exist: either another claim created it
+	/// first, or it matched nothing because it's full.  Either way, the claim is retried once against it.
+	/// </summary>
+	private DiscriminatorPool ClaimFrom(string screenname, FilterDefinition<DiscriminatorPool> filter, params BsonDocument[] claim)
+	{
+		FindOneAndUpdateOptions<DiscriminatorPool> options = new()
+		{
+			ReturnDocument = ReturnDocument.After
+		};
+
+		DiscriminatorPool pool = _collection.FindOneAndUpdate(filter, Stages(claim), options);
+		if (pool != null)
+			return pool;
+
+		try
+		{
+			options.IsUpsert = true;
+			return _collection.FindOneAndUpdate(filter, Stages(claim.Prepend(Seed(screenname)).ToArray()), options);
+		}
+		catch (MongoCommandException e) when (e.Code == 11000)
+		{
+			options.IsUpsert = false;
+			return _collection.FindOneAndUpdate(filter, Stages(claim), options);
+		}
+	}
+
+	/// <summary>
+	/// Returns a discriminator to the screenname's pool after its player moves to a different name.
+	/// </summary>
+	public void Release(string screenname, int? discriminator)
+	{
+		if (string.IsNullOrWhiteSpace(screenname) || discriminator is null or < 1 or > MAX_DISCRIMINATOR)
+			return;
+
+		_collection.UpdateOne(
+			filter: For(screenname) & Builders<DiscriminatorPool>.Filter.Gt(pool => pool.Next, (int)discriminator),
+			update: Builders<DiscriminatorPool>.Update.AddToSet(pool => pool.Free, (int)discriminator)
+		);
+	}
+
+	/// <summary>
+	/// Returns a stage that fills in Next and Free from the discriminators the screenname's players already hold, for
+	/// a pool the same update is creating.  An existing pool keeps its own.  Child accounts share their parent's
+	/// screenname, but the discriminator shown is the parent's, so only parents' numbers are taken.
+	/// </summary>
+	private BsonDocument Seed(string screenname)
+	{
+		HashSet<int> held = _collection.Database
+			.GetCollection<Player>(PLAYERS)
+			.Distinct(player => player.Discriminator, Builders<Player>.Filter.And(
+				Builders<Player>.Filter.Eq(player => player.Screenname, screenname),
+				Builders<Player>.Filter.Eq(player => player.ParentId, null)
+			))
+			.ToList()
+			.Where(discriminator => discriminator is > 0 and <= MAX_DISCRIMINATOR)
+			.Select(discriminator => (int)discriminator)
+			.ToHashSet();
+
+		int next = held.Any()
+			? held.Max() + 1
+			: 1;
+		BsonArray free = new(Enumerable
+			.Range(1, next - 1)
+			.Where(number => !held.Contains(number))
+		);
+
+		return new BsonDocument("$set", new BsonDocument
+		{
+			{ DiscriminatorPool.DB_KEY_NEXT, new BsonDocument("$ifNull", new BsonArray { "$" + DiscriminatorPool.DB_KEY_NEXT, next }) },
+			{ DiscriminatorPool.DB_KEY_FREE, new BsonDocument("$ifNull", new BsonArray { "$" + DiscriminatorPool.DB_KEY_FREE, free }) }
+		});
+	}
+}
@@ -0,0 +1,86 @@
+using System.Collections.Generic;
+using System.Linq;
+using System.Threading.Tasks;
+using MongoDB.Driver;
+using PlayerService.Models;
+using Rumble.Platform.Common.Services;
+
+namespace PlayerService.Services;
+
+/// <summary>
+/// Hands out item modification numbers and records deletions for incremental /items syncs.  Numbers are reserved
+/// inside the caller's transaction, so two writes to the same account conflict on the counter and commit in the order
+/// their numbers were taken.
+/// </summary>
+public class ItemSequenceService : PlatformMongoService<ItemSequence>
+{
+	public const int TOMBSTONE_LIMIT = 2_000;
+
+	public ItemSequenceService() : base("itemSequences") { }
+
+	/// <summary>
+	/// Reserves count consecutive numbers and returns the first.
+	/// </summary>
+	public async Task<long> ReserveAsync(string accountId, int count, IClientSessionHandle session)
+	{
+		ItemSequence sequence = await _collection.FindOneAndUpdateAsync(
+			session,
+			filter: Builders<ItemSequence>.Filter.Eq(sequence => sequence.AccountId, accountId),
+			update: Builders<ItemSequence>.Update.Inc(sequence => sequence.Sequence, count),
+			options: new FindOneAndUpdateOptions<ItemSequence>
+			{
+				IsUpsert = true,
+				ReturnDocument = ReturnDocument.After,
+				Projection = Builders<ItemSequence>.Projection.Include(sequence => sequence.Sequence)
+			}
+		);
+		return sequence.Sequence - count + 1;
+	}
+
+	/// <summary>
+	/// Records deleted items so incremental syncs can tell clients to drop them.  Only the newest TOMBSTONE_LIMIT are
+	/// kept.
+	/// </summary>
+	public async Task BuryAsync(string accountId, IEnumerable<Item> deleted, IClientSessionHandle session)
+	{
+		Item[] items = deleted.ToArray();
+		if (!items.Any())
+			return;
+
+		long next = await ReserveAsync(accountId, items.Length, session);
+		await _collection.UpdateOneAsync(
+			session,
+			filter: Builders<ItemSequence>.Filter.Eq(sequence => sequence.AccountId, accountId),
+			update: Builders<ItemSequence>.Update.PushEach(
+				sequence => sequence.Tombstones,
+				items.Select(item => new ItemTombstone
+				{
+					ItemId = item.ItemId,
+					Type = item.Type,
+					Modified = next++
+				}),
+				slice: -TOMBSTONE_LIMIT
+			)
+		);
+	}
+
+	/// <summary>
+	/// Returns the account's counter and tombstones, or an empty sequence if nothing has been written yet.
+	/// </summary>
+	public async Task<ItemSequence> FindAsync(string accountId) => await _collection
+		.Find(Builders<ItemSequence>.Filter.Eq(sequence => sequence.AccountId, accountId))
+		.FirstOrDefaultAsync()
+		?? new ItemSequence
+		{
+			AccountId = accountId,
+			Tombstones = new List<ItemTombstone>()
+		};
+
+	/// <summary>
+	/// The oldest cursor that still sees every deletion.  Once tombstones have been trimmed, anything before the oldest
+	/// one left may have lost a deletion.
+	/// </summary>
+	public static long Floor(ItemSequence sequence) => sequence.Tombstones?.Count >= TOMBSTONE_LIMIT
+		? sequence.Tombstones.Min(tombstone => tombstone.Modified) - 1
+		: 0;
+}
@@ -1,11 +1,13 @@
 using System;
 using System.Collections.Generic;
 using System.Linq;
-using System.Threading;
+using System.Security.Cryptography;
+using System.Text.Json;
 using System.Threading.Tasks;
 using MongoDB.Bson;
 using MongoDB.Driver;
 using PlayerService.Models;
+using PlayerService.Utilities;
 using Rumble.Platform.Common.Enums;
 using Rumble.Platform.Common.Services;
 using Rumble.Platform.Common.Utilities;
@@ -15,9 +17,157 @@ namespace PlayerService.Services;
 
 public class ItemService : PlatformMongoService<Item>
 {
+#pragma warning disable
+	private readonly ItemSequenceService _sequences;
+#pragma warning restore
+
 	public ItemService() : base("items") { }
 
-	public List<Item> GetItemsFor(string accountId, string[] ids = null, string[] types = null)
+	public const int DEFAULT_PAGE_SIZE = 500;
+	public const int MAX_PAGE_SIZE = 1_000;
+	public const int STREAM_BATCH_SIZE = 500;
+	public const string COUNTER_SKIPPED = "items.skipped";
+	private const char FULL_SYNC_SEPARATOR = ':';
+
+	public List<Item> GetItemsFor(string accountId, string[] ids = null, string[] types = null) => _collection
+		.Find(filter: Filter(accountId, ids, types))
+		.ToList();
+
+	/// <summary>
+	/// Opens a cursor over the account's items, for responses that stream them instead of holding them all.
+	/// </summary>
+	public Task<IAsyncCursor<Item>> FindItemsAsync(string accountId, string[] ids = null, string[] types = null) => _collection
+		.FindAsync(Filter(accountId, ids, types), new FindOptions<Item> { BatchSize = STREAM_BATCH_SIZE });
+
+	/// <summary>
+	/// Returns items written and deleted after a cursor from a previous sync, oldest first, a page at a time.  An empty
+	/// cursor, or one that can no longer be honored, starts a full sync instead: everything the account has, paged the
+	/// same way, with FullSync set on the first page.
+	/// </summary>
+	public async Task<ItemChanges> GetChangesFor(string accountId, string since, int limit, string[] ids = null, string[] types = null)
+	{
+		using RequestTimings.Scope timing = RequestTimings.Measure("items.changes");
+		RequestTimings.Count(RequestTimings.COUNTER_MONGO, 2);
+
+		// Read the counter before the items.  Writes that commit after this have higher numbers than it, so nothing
+		// can slip between this cursor and the next one.
+		ItemSequence sequence = await _sequences.FindAsync(accountId);
+		long current = sequence.Sequence;
+		long floor = ItemSequenceService.Floor(sequence);
+		limit = Math.Clamp(limit, 1, MAX_PAGE_SIZE);
+
+		// A full sync in progress keeps the sequence it started from, so the incremental syncs after it pick up
+		// whatever was written while it was paging.  If that's since fallen behind the tombstones, start over.
+		if (TryParseFullSync(since, out long started, out long afterModified, out string afterId))
+			return started >= floor && started <= current
+				? await FullSyncAsync(accountId, started, afterModified, afterId, limit, ids, types)
+				: await FullSyncAsync(accountId, current, 0, null, limit, ids, types);
+
+		// Items written before sequencing have no number, so a client without a cursor (or with 0) needs everything.
+		if (!long.TryParse(since, out long cursor) || cursor <= 0 || cursor < floor || cursor > current)
+			return await FullSyncAsync(accountId, current, 0, null, limit, ids, types);
+
+		List<Item> items = await _collection
+			.Find(Builders<Item>.Filter.And(
+				Filter(accountId, ids, types),
+				Builders<Item>.Filter.Gt(item => item.Modified, cursor),
+				Builders<Item>.Filter.Lte(item => item.Modified, current)
+			))
+			.SortBy(item => item.Modified)
+			.Limit(limit + 1)
+			.ToListAsync();
+
+		bool more = items.Count > limit;
+		if (more)
+		{
+			items.RemoveAt(limit);
+			current = items.Last().Modified;
+		}
+
+		return new ItemChanges
+		{
+			Items = items,
+			Deleted = (sequence.Tombstones ?? new List<ItemTombstone>())
+				.Where(tombstone => tombstone.Modified > cursor && tombstone.Modified <= current)
+				.Where(tombstone => Matches(tombstone, ids, types))
+				.ToList(),
+			Cursor = current.ToString(),
+			More = more
+		};
+	}
+
+	/// <summary>
+	/// Returns one page of everything the account had as of the sequence the full sync started from.  Items written
+	/// before sequencing come first, in ID order, then the rest in the order they were written.  Until the last page,
+	/// the cursor is "{started}:{modified}:{id}" for the last item returned; the last page returns the starting
+	/// sequence, which continues as an incremental sync.
+	/// </summary>
+	private async Task<ItemChanges> FullSyncAsync(string accountId, long started, long afterModified, string afterId, int limit, string[] ids, string[] types)
+	{
+		List<Item> items = new();
+		if (afterModified <= 0)
+		{
+			FilterDefinition<Item> unsequenced = Builders<Item>.Filter.And(
+				Filter(accountId, ids, types),
+				Builders<Item>.Filter.Or(
+					Builders<Item>.Filter.Exists(item => item.Modified, false),
+					Builders<Item>.Filter.Eq(item => item.Modified, 0)
+				)
+			);
+			if (afterId != null)
+				unsequenced = Builders<Item>.Filter.And(unsequenced, Builders<Item>.Filter.Gt(item => item.Id, afterId));
+			items = await _collection
+				.Find(unsequenced)
+				.SortBy(item => item.Id)
+				.Limit(limit + 1)
+				.ToListAsync();
+		}
+
+		if (items.Count <= limit)
+		{
+			RequestTimings.Count(RequestTimings.COUNTER_MONGO);
+			items.AddRange(await _collection
+				.Find(Builders<Item>.Filter.And(
+					Filter(accountId, ids, types),
+					Builders<Item>.Filter.Gt(item => item.Modified, Math.Max(afterModified, 0)),
+					Builders<Item>.Filter.Lte(item => item.Modified, started)
+				))
+				.SortBy(item => item.Modified)
+				.Limit(limit + 1 - items.Count)
+				.ToListAsync());
+		}
+
+		bool more = items.Count > limit;
+		if (more)
+			items.RemoveAt(limit);
+		Item last = items.LastOrDefault();
+
+		return new ItemChanges
+		{
+			Items = items,
+			Deleted = new List<ItemTombstone>(),
+			Cursor = more
+				? string.Join(FULL_SYNC_SEPARATOR, started, last.Modified, last.Id)
+				: started.ToString(),
+			More = more,
+			FullSync = afterModified <= 0 && afterId == null
+		};
+	}
+
+	private static bool TryParseFullSync(string since, out long started, out long afterModified, out string afterId)
+	{
+		string[] parts = since?.Split(FULL_SYNC_SEPARATOR) ?? Array.Empty<string>();
+		started = 0;
+		afterModified = 0;
+		afterId = parts.Length == 3 && ObjectId.TryParse(parts[2], out _)
+			? parts[2]
+			: null;
+		return afterId != null
+			&& long.TryParse(parts[0], out started)
+			&& long.TryParse(parts[1], out afterModified);
+	}
+
+	private static FilterDefinition<Item> Filter(string accountId, string[] ids, string[] types)
 	{
 		ids ??= Array.Empty<string>();
 		types ??= Array.Empty<string>();
@@ -41,15 +191,47 @@ public class ItemService : PlatformMongoService<Item>
 		else if (byType != null)
 			and = Builders<Item>.Filter.And(aid, byType);
 
-		return _collection
-			.Find(filter: and ?? aid)
-			.ToList();
+		return and ?? aid;
+	}
+
+	// Mirrors Filter() for tombstones: no filters matches everything, otherwise either the id or the type must match.
+	private static bool Matches(ItemTombstone tombstone, string[] ids, string[] types)
+	{
+		bool byId = ids?.Any() ?? false;
+		bool byType = types?.Any() ?? false;
+		if (!byId && !byType)
+			return true;
+		return (byId && ids.Contains(tombstone.ItemId)) || (byType && types.Contains(tombstone.Type));
+	}
+
+	/// <summary>
+	/// Stamps items with consecutive modification numbers and content hashes ahead of a write.
+	/// </summary>
+	private async Task Stamp(string accountId, Item[] items, IClientSessionHandle session)
+	{
+		using RequestTimings.Scope timing = RequestTimings.Measure("items.sequence");
+		RequestTimings.Count(RequestTimings.COUNTER_MONGO);
+		long next = await _sequences.ReserveAsync(accountId, items.Length, session);
+		foreach (Item item in items)
+		{
+			item.Modified = next++;
+			item.Hash ??= Hash(item.Data);
+		}
+	}
+
+	// Top-level keys are ordered, as in ClientConfigService.  Nested objects keep the client's order; if that ever
+	// changes, the item is just written again.
+	private static string Hash(RumbleJson data)
+	{
+		byte[] json = JsonSerializer.SerializeToUtf8Bytes((data ?? new RumbleJson()).OrderBy(pair => pair.Key, StringComparer.Ordinal));
+		return Convert.ToHexString(SHA256.HashData(json))[..16].ToLower();
 	}
 
 	public void UpdateItem(Item item)
 	{
 		if (item.Id != null)
 		{
+			item.Hash = Hash(item.Data);
 			Update(item);
 			return;
 		}
@@ -58,7 +240,8 @@ public class ItemService : PlatformMongoService<Item>
 		UpdateDefinition<Item> update = Builders<Item>.Update
 			.Set(i => i.Data, item.Data)
 			.Set(i => i.Type, item.Type)
-			.Set(i => i.AccountId, item.AccountId);
+			.Set(i => i.AccountId, item.AccountId)
+			.Set(i => i.Hash, Hash(item.Data));
 
 		Item updated = null;
 		if (session != null)
@@ -75,131 +258,140 @@ public class ItemService : PlatformMongoService<Item>
 			);
 	}
 
-	public async Task<bool> BulkDeleteAsync(Item[] items, IClientSessionHandle session, int retries = 5)
+	/// <summary>
+	/// Starts a session for a transactional write pipeline.  Use with WithTransactionAsync(), which retries on
+	/// transient transaction errors and unknown commit results; writes inside it must be awaited one at a time, since
+	/// a session doesn't support concurrent operations.
+	/// </summary>
+	public Task<IClientSessionHandle> StartSessionAsync() => _collection.Database.Client.StartSessionAsync();
+
+	/// <summary>
+	/// Deletes the account's items by database ID, leaving tombstones behind for incremental syncs.
+	/// </summary>
+	public async Task BulkDeleteAsync(string accountId, Item[] items, IClientSessionHandle session)
 	{
-		try
-		{
-			// See comment in ComponentService.UpdateAsync() for below sleep explanation.
-			Thread.Sleep(new Random().Next(0, (int)Math.Pow(2, 6 - retries)));
-			await _collection.DeleteManyAsync(session, Builders<Item>.Filter.In(item => item.Id, items.Select(item => item.Id)));
-			return true;
-		}
-		catch (MongoCommandException e)
-		{
-			if (retries > 0)
-				return await BulkDeleteAsync(items, session, --retries);
-			Log.Error(Owner.Will, $"Could not delete items.", data: new
-			{
-				Detail = $"Session state invalid, even after retrying {retries} times with exponential backoff."
-			}, exception: e);
-			return false;
-		}
+		using RequestTimings.Scope timing = RequestTimings.Measure("items.delete");
+		RequestTimings.Count(RequestTimings.COUNTER_MONGO, 3);
+		FilterDefinition<Item> filter = Builders<Item>.Filter.And(
+			Builders<Item>.Filter.Eq(item => item.AccountId, accountId),
+			Builders<Item>.Filter.In(item => item.Id, items.Select(item => item.Id))
+		);
+		List<Item> deleted = await _collection
+			.Find(session, filter)
+			.Project<Item>(Builders<Item>.Projection
+				.Include(item => item.ItemId)
+				.Include(item => item.Type)
+			)
+			.ToListAsync();
+
+		await _collection.DeleteManyAsync(session, filter);
+		await _sequences.BuryAsync(accountId, deleted, session);
 	}
 
-	public async Task<bool> InsertAsync(IEnumerable<Item> items, IClientSessionHandle session, int retries = 5)
+	/// <summary>
+	/// Inserts the items as given.  Callers pick which items are new before their transaction starts: an aborted attempt
+	/// has already assigned IDs, and a retry has to insert the same items again, under the same IDs.
+	/// </summary>
+	public async Task InsertAsync(string accountId, Item[] toInsert, IClientSessionHandle session)
 	{
-		if (!items.Any())
-			return true;
-		try
-		{
-			Thread.Sleep(new Random().Next(0, (int)Math.Pow(2, 6 - retries)));
-			await _collection.InsertManyAsync(
-				session: session,
-				documents: items.Where(item => item.Id == null)
-			);
-			return true;
-		}
-		catch (MongoCommandException e)
-		{
-			if (retries > 0)
-				return await BulkUpdateAsync(items, session, --retries);
-			Log.Error(Owner.Will, $"Could not insert items.", data: new
-			{
-				Detail = $"Session state invalid, even after retrying {retries} times with exponential backoff."
-			}, exception: e);
-			return false;
-		}
+		if (!toInsert.Any())
+			return;
+		await Stamp(accountId, toInsert, session);
+		using RequestTimings.Scope timing = RequestTimings.Measure("items.insert");
+		RequestTimings.Count(RequestTimings.COUNTER_MONGO);
+		await _collection.InsertManyAsync(session, toInsert);
 	}
 	
-	public async Task<bool> BulkUpdateAsync2(IEnumerable<Item> items, IClientSessionHandle session, int retries = 5)
+	public async Task BulkUpdateAsync2(string accountId, IEnumerable<Item> items, IClientSessionHandle session)
 	{
-		if (!items.Any())
-			return true;
+		Item[] toUpdate = items.ToArray();
+		if (!toUpdate.Any())
+			return;
+		await Stamp(accountId, toUpdate, session);
+		using RequestTimings.Scope timing = RequestTimings.Measure("items.update");
+		RequestTimings.Count(RequestTimings.COUNTER_MONGO);
 		List<WriteModel<Item>> bulk = new List<WriteModel<Item>>();
 
-		bulk.AddRange(items.Select(item => new UpdateOneModel<Item>(
+		bulk.AddRange(toUpdate.Select(item => new UpdateOneModel<Item>(
 			filter: Builders<Item>.Filter.Eq(dbItem => dbItem.Id, item.Id), 
 			update: Builders<Item>.Update
 				.Set(dbItem => dbItem.AccountId, item.AccountId)
 				.Set(dbItem => dbItem.ItemId, item.ItemId)
 				.Set(dbItem => dbItem.Type, item.Type)
 				.Set(dbItem => dbItem.Data, item.Data)
+				.Set(dbItem => dbItem.Modified, item.Modified)
+				.Set(dbItem => dbItem.Hash, item.Hash)
 		)
 		{
 			IsUpsert = true
 		}));
 
-		try
-		{
-			// See comment in ComponentService.UpdateAsync() for below sleep explanation.
-			Thread.Sleep(new Random().Next(0, (int)Math.Pow(2, 6 - retries)));
-			await _collection.BulkWriteAsync(session, bulk);
-			return true;
-		}
-		catch (MongoCommandException e)
-		{
-			if (retries > 0)
-				return await BulkUpdateAsync(items, session, --retries);
-			Log.Error(Owner.Will, $"Could not update items.", data: new
-			{
-				Detail = $"Session state invalid, even after retrying {retries} times with exponential backoff."
-			}, exception: e);
-			return false;
-		}
+		await _collection.BulkWriteAsync(session, bulk);
 	}
 	
 	
-	public async Task<bool> BulkUpdateAsync(IEnumerable<Item> items, IClientSessionHandle session, int retries = 5)
+	/// <summary>
+	/// Upserts items by item ID for the deprecated "items" key.  Clients send every item on every save, so items whose
+	/// type and content match what's stored are skipped: they keep their modification number, aren't sent to incremental
+	/// syncs again, and don't cost a write.  The comparison happens inside each update, against the stored hash, so
+	/// nothing is read first; a skipped item is one the update matched but didn't modify.  Returns the number of items
+	/// skipped.
+	/// </summary>
+	public async Task<int> BulkUpdateAsync(string accountId, IEnumerable<Item> items, IClientSessionHandle session)
 	{
-		if (!items.Any())
-			return true;
-		List<WriteModel<Item>> bulk = new List<WriteModel<Item>>();
+		Item[] toUpdate = items.ToArray();
+		if (!toUpdate.Any())
+			return 0;
+		foreach (Item item in toUpdate)
+			item.Hash = Hash(item.Data);
+		// Numbers are reserved for every item, since which ones changed is only known after the write.  Skipped items
+		// leave gaps, which syncs don't mind.
+		await Stamp(accountId, toUpdate, session);
+		using RequestTimings.Scope timing = RequestTimings.Measure("items.update");
+		RequestTimings.Count(RequestTimings.COUNTER_MONGO);
 
-		// var filter = Builders<Item>.Filter.And(
-		// 	Builders<Item>.Filter.Eq(item => item.AccountId, item.AccountId),
-		// 	Builders<Item>.Filter.Eq(item => item.ItemId, item.ItemId));
-		bulk.AddRange(items.Select(item => new UpdateOneModel<Item>(
+		BulkWriteResult<Item> result = await _collection.BulkWriteAsync(session, toUpdate.Select(item => new UpdateOneModel<Item>(
 			Builders<Item>.Filter.And(
 				Builders<Item>.Filter.Eq(dbItem => dbItem.AccountId, item.AccountId),
-				Builders<Item>.Filter.Eq(dbItem => dbItem.ItemId, item.ItemId)), 
-			update: Builders<Item>.Update
-				.Set(dbItem => dbItem.AccountId, item.AccountId)
-				.Set(dbItem => dbItem.ItemId, item.ItemId)
-				.Set(dbItem => dbItem.Type, item.Type)
-				.Set(dbItem => dbItem.Data, item.Data)
+				Builders<Item>.Filter.Eq(dbItem => dbItem.ItemId, item.ItemId)),
+			update: UnlessUnchanged(item)
 		)
 		{
 			IsUpsert = true,
 		}));
 
-		try
-		{
-			// See comment in ComponentService.UpdateAsync() for below sleep explanation.
-			Thread.Sleep(new Random().Next(0, (int)Math.Pow(2, 6 - retries)));
-			await _collection.BulkWriteAsync(session, bulk);
-			return true;
-		}
-		catch (MongoCommandException e)
+		int skipped = (int)(result.MatchedCount - result.ModifiedCount);
+		RequestTimings.Count(COUNTER_SKIPPED, skipped);
+		return skipped;
+	}
+
+	/// <summary>
+	/// Replaces the stored item's type, data, modification number and hash, unless its hash and type already match,
+	/// in which case the document is left exactly as it was.  On an upsert, the account and item IDs come from the
+	/// filter.  The new fields are literals, so nothing in the data is read as an expression.
+	/// </summary>
+	private static UpdateDefinition<Item> UnlessUnchanged(Item item) => Builders<Item>.Update.Pipeline(
+		PipelineDefinition<Item, Item>.Create(new BsonDocument("$replaceWith", new BsonDocument("$cond", new BsonArray
 		{
-			if (retries > 0)
-				return await BulkUpdateAsync(items, session, --retries);
-			Log.Error(Owner.Will, $"Could not update items.", data: new
+			new BsonDocument("$and", new BsonArray
 			{
-				Detail = $"Session state invalid, even after retrying {retries} times with exponential backoff."
-			}, exception: e);
-			return false;
-		}
-	}
+				new BsonDocument("$eq", new BsonArray { "$" + Item.DB_KEY_HASH, item.Hash }),
+				new BsonDocument("$eq", new BsonArray { "$" + Item.DB_KEY_TYPE, new BsonDocument("$literal", BsonValue.Create(item.Type)) })
+			}),
+			"$$ROOT",
+			new BsonDocument("$mergeObjects", new BsonArray
+			{
+				"$$ROOT",
+				new BsonDocument("$literal", new BsonDocument
+				{
+					{ Item.DB_KEY_TYPE, BsonValue.Create(item.Type) },
+					{ Item.DB_KEY_DATA, (BsonValue)item.Data?.ToBsonDocument() ?? BsonNull.Value },
+					{ Item.DB_KEY_MODIFIED, item.Modified },
+					{ Item.DB_KEY_HASH, item.Hash }
+				})
+			})
+		})))
+	);
 
 	public void Delete(Player player) => _collection
 		.DeleteMany(new FilterDefinitionBuilder<Item>().Eq(Item.DB_KEY_ACCOUNT_ID, player.AccountId));
@@ -2,21 +2,43 @@ using System;
 using System.Linq;
 using PlayerService.Exceptions.Login;
 using PlayerService.Models.Login;
+using PlayerService.Utilities;
+using Rumble.Platform.Common.Enums;
 using Rumble.Platform.Common.Minq;
 using Rumble.Platform.Common.Models;
 using Rumble.Platform.Common.Services;
 using Rumble.Platform.Common.Utilities;
+using StackExchange.Redis;
 
 namespace PlayerService.Services;
 
+/// <summary>
+/// Locks an email / IP address pair out of Rumble logins after too many bad passwords.  Recent failures are counted in
+/// memory, and a pair this pod has already locked out costs no database work.  Below the threshold, the shared count
+/// is checked too, so every pod enforces the same attempts: Redis when lockoutRedis is configured, and the Mongo record
+/// otherwise, or when Redis can't be reached.  With Redis, Mongo only records the failure that triggers a lockout.
+/// </summary>
 public class LockoutService : MinqService<IpAccessLog>
 {
+    public const string CONFIG_REDIS = "lockoutRedis";
+    private const string KEY_PREFIX = "player-service:lockout:";
+    private const int MAX_TRACKED = 200_000;
+
     public static int Threshold => DynamicConfig.Instance?.Optional<int>("ipLockoutThreshold") ?? 5;
     public static int Cooldown => Math.Max(1, DynamicConfig.Instance?.Optional<int>("ipLockoutMinutes") ?? 5);
     public static int AttemptsToKeep => Math.Min(100, Threshold * 5);
+    private static string RedisConnection => DynamicConfig.Instance?.Optional<string>(CONFIG_REDIS);
+
+    private readonly SlidingWindowCounter _failures = new(MAX_TRACKED);
+    private readonly object _redisLock = new();
+    private ConnectionMultiplexer _redis;
+    private string _redisConnection;
 
     public LockoutService() : base("lockouts") { }
 
+    private static string KeyFor(string email, string ip) => $"{email?.ToLower()}|{ip}";
+    private static long Cutoff => Timestamp.Now - Cooldown * 60;
+
     /// <summary>
     /// Guarantees that the provided email / IP address are okay to continue with login.  Will throw an exception if not.
     /// </summary>
@@ -31,34 +53,138 @@ public class LockoutService : MinqService<IpAccessLog>
         if (string.IsNullOrWhiteSpace(ip) || Threshold <= 0)
             return true;
 
-        long[] attempts = mongo
+        string key = KeyFor(email, ip);
+        long[] attempts = _failures.Recent(key, Cutoff);
+
+        // Another pod may have seen failures this one hasn't.
+        if (attempts.Length < Threshold)
+        {
+            long[] shared = SharedAttempts(email, ip, key);
+            if (shared.Length > attempts.Length)
+            {
+                _failures.Merge(key, shared, Cutoff, Threshold);
+                attempts = shared;
+            }
+        }
+
+        if (attempts.Length >= Threshold)
+            throw new LockoutException(email, ip, waitTime: attempts.Take(Threshold).Last());
+
+        return true;
+    }
+
+    public void RegisterError(string email, string ip)
+    {
+        if (string.IsNullOrWhiteSpace(ip) || Threshold <= 0)
+            return;
+
+        string key = KeyFor(email, ip);
+        long now = Timestamp.Now;
+        long[] attempts = _failures.Add(key, now, Cutoff, Threshold);
+        bool shared = false;
+
+        if (Redis() is { } redis)
+            try
+            {
+                // Timestamps are in seconds, so the member needs to be unique for attempts in the same second to count.
+                IDatabase db = redis.GetDatabase();
+                string redisKey = KEY_PREFIX + key;
+                ITransaction batch = db.CreateTransaction();
+                _ = batch.SortedSetAddAsync(redisKey, $"{now}:{Guid.NewGuid():N}", now);
+                _ = batch.SortedSetRemoveRangeByScoreAsync(redisKey, double.NegativeInfinity, Cutoff);
+                _ = batch.KeyExpireAsync(redisKey, TimeSpan.FromMinutes(Cooldown));
+                batch.Execute(CommandFlags.FireAndForget);
+                shared = true;
+            }
+            catch (Exception e)
+            {
+                Log.Warn(Owner.Will, "Unable to share a lockout attempt through Redis; recording it in Mongo.", exception: e);
+            }
+
+        // Without Redis, the Mongo record is the shared count.  With it, only the failure that triggers a lockout is kept.
+        if (!shared || attempts.Length == Threshold)
+            mongo
+                .Where(query => query
+                    .EqualTo(log => log.Email, email)
+                    .EqualTo(log => log.IpAddress, ip)
+                )
+                .Upsert(query => query.AddItems(log => log.Timestamps, limitToKeep: AttemptsToKeep, now));
+    }
+
+    /// <summary>
+    /// Returns the pair's recent failures from every pod, newest first: from Redis when it's configured and reachable,
+    /// and from the Mongo record otherwise.
+    /// </summary>
+    private long[] SharedAttempts(string email, string ip, string key)
+    {
+        if (Redis() is { } redis)
+            try
+            {
+                return redis
+                    .GetDatabase()
+                    .SortedSetRangeByScoreWithScores(KEY_PREFIX + key, start: Cutoff, exclude: Exclude.Start, order: Order.Descending, take: Threshold)
+                    .Select(entry => (long)entry.Score)
+                    .ToArray();
+            }
+            catch (Exception e)
+            {
+                Log.Warn(Owner.Will, "Unable to read shared lockout attempts from Redis; using the Mongo record.", exception: e);
+            }
+
+        long cutoff = Cutoff;
+        return mongo
             .Where(query => query
                 .EqualTo(log => log.Email, email)
                 .EqualTo(log => log.IpAddress, ip)
             )
             .Project(log => log.Timestamps)
             ?.FirstOrDefault()
-            ?.Where(val => val > Timestamp.Now - Cooldown * 60)
+            ?.Where(timestamp => timestamp > cutoff)
+            .OrderByDescending(timestamp => timestamp)
+            .Take(Threshold)
             .ToArray()
             ?? Array.Empty<long>();
+    }
 
-        if (attempts.Length >= Threshold)
-            throw new LockoutException(email, ip, waitTime: attempts.OrderByDescending(_ => _).Take(Threshold).Last());
+    private ConnectionMultiplexer Redis()
+    {
+        string connection = RedisConnection;
+        if (string.IsNullOrWhiteSpace(connection))
+            return null;
+        if (_redisConnection == connection)
+            return _redis;
 
-        return true;
+        lock (_redisLock)
+        {
+            if (_redisConnection == connection)
+                return _redis;
+            try
+            {
+                ConnectionMultiplexer redis = ConnectionMultiplexer.Connect(connection);
+                _redis?.Dispose();
+                _redis = redis;
+            }
+            catch (Exception e)
+            {
+                Log.Error(Owner.Will, "Unable to connect to Redis for lockouts; each pod will count its own attempts.", exception: e);
+                _redis?.Dispose();
+                _redis = null;
+            }
+            _redisConnection = connection;
+            return _redis;
+        }
     }
 
-    public IpAccessLog RegisterError(string email, string ip) => mongo
-        .Where(query => query
-            .EqualTo(log => log.Email, email)
-            .EqualTo(log => log.IpAddress, ip)
-        )
-        .Upsert(query => query.AddItems(log => log.Timestamps, limitToKeep: AttemptsToKeep, Timestamp.Now));
-
-    public override long ProcessGdprRequest(TokenInfo token, string dummyText) => mongo
-        .Where(query => query.EqualTo(log => log.Email, token.Email))
-        .Update(query => query
-            .Set(log => log.Email, dummyText)
-            .Set(log => log.IpAddress, "0.0.0.0")
-        );
-}
\ No newline at end of file
+    public override long ProcessGdprRequest(TokenInfo token, string dummyText)
+    {
+        string prefix = $"{token.Email?.ToLower()}|";
+        _failures.Remove(key => key.StartsWith(prefix));
+
+        return mongo
+            .Where(query => query.EqualTo(log => log.Email, token.Email))
+            .Update(query => query
+                .Set(log => log.Email, dummyText)
+                .Set(log => log.IpAddress, "0.0.0.0")
+            );
+    }
+}
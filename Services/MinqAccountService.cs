@@ -8,6 +8,7 @@ using PlayerService.Exceptions.Login;
 using PlayerService.Models;
 using PlayerService.Models.Login;
 using PlayerService.Services.ComponentServices;
+using PlayerService.Utilities;
 using Rumble.Platform.Common.Enums;
 using Rumble.Platform.Common.Exceptions;
 using Rumble.Platform.Common.Exceptions.Mongo;
@@ -39,7 +40,6 @@ public class PlayerAccountService : MinqTimerService<Player>
     
     private readonly DynamicConfig _config;
     private readonly ApiService _api;
-    private readonly Random _rando;
 
     public string CollectionName => mongo.CollectionName;
     
@@ -47,19 +47,28 @@ public class PlayerAccountService : MinqTimerService<Player>
     {
         _api = api;
         _config = config;
-        _rando = new Random();
     }
     
     public Player Find(string accountId) => mongo.FirstOrDefault(query => query.EqualTo(player => player.Id, accountId));
+    /// <summary>
+    /// Checks that an account exists without loading the player document.
+    /// </summary>
+    public bool Exists(string accountId) => mongo
+        .Where(query => query.EqualTo(player => player.Id, accountId))
+        .Limit(1)
+        .Project(player => player.Id)
+        .FirstOrDefault() != null;
+    
     public Player FromToken(TokenInfo token) => Find(token.AccountId)
         ?? throw new RecordNotFoundException(mongo.CollectionName, "Account not found.");
 
     public bool InstallIdExists(DeviceInfo device) => !string.IsNullOrWhiteSpace(device?.InstallId)
         && mongo.Count(query => query.EqualTo(player => player.Device.InstallId, device.InstallId)) > 0;
 
-    public int SyncScreenname(string screenname, string accountId, bool fromAdmin = false)
+    public int SyncScreenname(string screenname, string accountId, bool fromAdmin = false, int? discriminator = null)
     {
         Require<AccountService>().SetScreenname(accountId, screenname, fromAdmin);
+        Require<SummaryService>().SyncScreenname(accountId, screenname, discriminator);
         return (int)mongo
             .Where(query => query.EqualTo(player => player.Id, accountId))
             .Or(query => query.EqualTo(player => player.ParentId, accountId))
@@ -68,6 +77,8 @@ public class PlayerAccountService : MinqTimerService<Player>
 
     public Player FromDevice(DeviceInfo device, GeoIPData geoIpData)
     {
+        using RequestTimings.Scope timing = RequestTimings.Measure("players.device");
+        RequestTimings.Count(RequestTimings.COUNTER_MONGO, 2);
         Player stored = mongo
             .FirstOrDefault(query => query.EqualTo(player => player.Device.InstallId, device.InstallId));
         
@@ -117,53 +128,32 @@ public class PlayerAccountService : MinqTimerService<Player>
     /// Discriminators of 0 are not guaranteed to be unique.
     /// </summary>
     /// <param name="account">The account to assign a discriminator to.</param>
-    /// <param name="desired">The desired discriminator, if any.  If null, a random number will be assigned.</param>
+    /// <param name="desired">The desired discriminator, if any.  If it's taken, or null, the next available one is assigned.</param>
     /// <returns></returns>
     private int AssignDiscriminator(Player account, int? desired = null)
     {
-        int attempts = 0;
+        DiscriminatorService discriminators = Require<DiscriminatorService>();
         string sn = account.Screenname;
-        while (attempts++ < 50)
-        {
-            desired ??= _rando.Next(1, 9_999);
-            bool exists = mongo
-                .Where(query => query
-                    .EqualTo(player => player.Screenname, sn)
-                    .EqualTo(player => player.Discriminator, desired)
-                    .NotEqualTo(player => player.ParentId, account.Id)
-                )
-                .Count() > 0;
-
-            if (exists)
-            {
-                desired = null;
-                continue;
-            }
 
-            mongo
-                .ExactId(account.Id)
-                .Limit(1)
-                .Update(query => query.Set(player => player.Discriminator, desired));
-            
-            account.Discriminator = desired;
-            return (int)desired;
-        }
+        int? claimed = desired != null
+            ? discriminators.Claim(sn, (int)desired)
+            : discriminators.Claim(sn);
 
-        desired = 0;
+        if (claimed == null)
+            Log.Error(Owner.Will, "Unable to generate a discriminator for an account.", data: new
+            {
+                Help = "Every discriminator is taken for this screenname.  It will be 0 for this account, and may not be unique.",
+                AccountId = account.Id,
+                Screenname = sn
+            });
         
         mongo
             .ExactId(account.Id)
             .Limit(1)
-            .Update(query => query.Set(player => player.Discriminator, desired));
+            .Update(query => query.Set(player => player.Discriminator, claimed ?? 0));
         
-        Log.Error(Owner.Will, "Unable to generate a discriminator for an account.", data: new
-        {
-            Attempts = attempts,
-            Help = "A discriminator was not available after multiple attempts.  It will be 0 for this account, and may not be unique.",
-            AccountId = account.Id
-        });
-        account.Discriminator = desired;
-        return (int)desired;
+        account.Discriminator = claimed ?? 0;
+        return (int)account.Discriminator;
     }
 
 
@@ -172,6 +162,8 @@ public class PlayerAccountService : MinqTimerService<Player>
         if (sso == null || !sso.HasAtLeastOneAccount())
             return Array.Empty<Player>();
 
+        using RequestTimings.Scope timing = RequestTimings.Measure("players.sso");
+        RequestTimings.Count(RequestTimings.COUNTER_MONGO);
         Player[] output = mongo
             .Where(query =>
             {
@@ -683,7 +675,33 @@ public class PlayerAccountService : MinqTimerService<Player>
         if (output.Any())
             return output.ToArray();
         
+        PlayerSearchService index = Require<PlayerSearchService>();
+        bool indexed = index.Ready;
         foreach (string term in terms)
+        {
+            // Terms shorter than a trigram, and searches before the index is backfilled, still use the scan.
+            List<string> candidates = indexed
+                ? index.Candidates(term)
+                : null;
+            if (candidates != null)
+            {
+                // Candidates are paged rather than capped, so a match is never dropped for sorting after a cutoff.
+                List<Player> matches = new();
+                while (candidates.Any() && matches.Count < 100)
+                {
+                    matches.AddRange(mongo
+                        .Where(query => query.ContainedIn(player => player.Id, candidates))
+                        .ToArray()
+                        .Where(player => PlayerSearchService.Matches(player, term))
+                    );
+                    candidates = candidates.Count < PlayerSearchService.CANDIDATE_PAGE
+                        ? new List<string>()
+                        : index.Candidates(term, after: candidates.Last());
+                }
+                output.AddRange(matches.Take(100));
+                continue;
+            }
+
             output.AddRange(mongo
                 .Where(query => query.ContainsSubstring(player => player.Id, term))
                 .Or(query => query.ContainsSubstring(player => player.Device.InstallId, term))
@@ -700,6 +718,7 @@ public class PlayerAccountService : MinqTimerService<Player>
                 .Limit(100)
                 .ToArray()
             );
+        }
         
         foreach (Player parent in output.Where(player => string.IsNullOrWhiteSpace(player.ParentId)))
             parent.Children = output
@@ -940,36 +959,76 @@ public class PlayerAccountService : MinqTimerService<Player>
 
     public string GenerateToken(string accountId) => GenerateToken(Find(accountId));
 
-    public string GenerateToken(Player player) => player.Token ??= _api
-        .GenerateToken(
-            accountId: player.AccountId,
-            screenname: player.Screenname,
-            email: player.Email, 
-            discriminator: player.Discriminator ?? 0,
-            audiences: TOKEN_AUDIENCE
-        );
+    /// <summary>
+    /// Returns a token for the player, reusing a recent one from TokenCacheService when nothing in it has changed.
+    /// token-service bans are checked when a token is minted, so a newly banned account can keep a cached token for at
+    /// most tokenCacheMaxAgeSeconds; token-service still rejects it on validation.
+    /// </summary>
+    public string GenerateToken(Player player) => player.Token ??= Require<TokenCacheService>().Get(
+        playerId: player.Id,
+        fingerprint: TokenCacheService.Fingerprint(player.AccountId, player.Screenname, player.Email, player.Discriminator ?? 0, TOKEN_AUDIENCE),
+        generate: () =>
+        {
+            using RequestTimings.Scope timing = RequestTimings.Measure("token-service");
+            return _api.GenerateToken(
+                accountId: player.AccountId,
+                screenname: player.Screenname,
+                email: player.Email, 
+                discriminator: player.Discriminator ?? 0,
+                audiences: TOKEN_AUDIENCE
+            );
+        }
+    );
 
-    public override long ProcessGdprRequest(TokenInfo token, string dummyText) => mongo
-        .Where(query => query.EqualTo(player => player.Id, token.AccountId))
-        .Or(query => query.EqualTo(player => player.ParentId, token.AccountId))
-        .Update(query => query
-            .Set(player => player.AppleAccount, null)
-            .Set(player => player.GoogleAccount, null)
-            .Set(player => player.RumbleAccount, null)
-            .Set(player => player.PlariumAccount, null)
-            .Set(player => player.LocationData, null)
-            .Set(player => player.Screenname, dummyText)
-            .Set(player => player.Device.Language, dummyText)
-            .Set(player => player.Device.OperatingSystem, dummyText)
-            .Set(player => player.Device.InstallId, dummyText)
-            .Set(player => player.ParentId, null)
-        );
+    public override long ProcessGdprRequest(TokenInfo token, string dummyText)
+    {
+        Require<TokenCacheService>().Invalidate(token.AccountId);
+        return mongo
+            .Where(query => query.EqualTo(player => player.Id, token.AccountId))
+            .Or(query => query.EqualTo(player => player.ParentId, token.AccountId))
+            .Update(query => query
+                .Set(player => player.AppleAccount, null)
+                .Set(player => player.GoogleAccount, null)
+                .Set(player => player.RumbleAccount, null)
+                .Set(player => player.PlariumAccount, null)
+                .Set(player => player.LocationData, null)
+                .Set(player => player.Screenname, dummyText)
+                .Set(player => player.Device.Language, dummyText)
+                .Set(player => player.Device.OperatingSystem, dummyText)
+                .Set(player => player.Device.InstallId, dummyText)
+                .Set(player => player.ParentId, null)
+            );
+    }
 
     public Player ChangeScreenname(string accountId, string newName)
+    {
+        Player player = Rename(accountId, newName, fromAdmin: false, out _);
+        GenerateToken(player);
+
+        return player;
+    }
+
+    /// <summary>
+    /// Renames the account the same way ChangeScreenname() does, but always syncs the name to its components and
+    /// children, even if it's unchanged.  Returns the number of player records updated.
+    /// </summary>
+    public int ChangeScreennameFromAdmin(string accountId, string newName)
+    {
+        Rename(accountId, newName, fromAdmin: true, out int affected);
+        return affected;
+    }
+
+    /// <summary>
+    /// Moves the player to the new screenname: it keeps its discriminator if that number is free in the new name's
+    /// pool and claims another one otherwise, then gives the old number back to the old name's pool.
+    /// </summary>
+    private Player Rename(string accountId, string newName, bool fromAdmin, out int affected)
     {
         Player player = Find(accountId) ?? throw new PlatformException("Account not found");
+        affected = 0;
         if (player.Screenname != newName)
         {
+            string oldName = player.Screenname;
             int oldDiscriminator = player.Discriminator ?? 0;
 
             player = mongo
@@ -978,12 +1037,13 @@ public class PlayerAccountService : MinqTimerService<Player>
                     .Set(db => db.Screenname, newName)
                     .Set(db => db.Discriminator, 0)
                 );
-            SyncScreenname(newName, player.Id);
             AssignDiscriminator(player, oldDiscriminator);
+            Require<DiscriminatorService>().Release(oldName, oldDiscriminator);
         }
-        
-        GenerateToken(player);
+        else if (!fromAdmin)
+            return player;
 
+        affected = SyncScreenname(newName, player.Id, fromAdmin, player.Discriminator);
         return player;
     }
 
@@ -1003,6 +1063,26 @@ public class PlayerAccountService : MinqTimerService<Player>
             })
             .ToArray();
     }
+    /// <summary>
+    /// Builds /lookup results from the players and c_account collections, for accounts that don't have a summary.
+    /// </summary>
+    public RumbleJson[] CreateLookupResults(string[] accountIds)
+    {
+        if (!accountIds.Any())
+            return Array.Empty<RumbleJson>();
+
+        Dictionary<string, LookupData> data = new();
+        foreach (Component component in Require<AccountService>().Find(accountIds))
+            data[component.AccountId] = new LookupData
+            {
+                AccountLevel = component.Data.Optional<int?>(SummaryService.KEY_LEVEL) ?? -1,
+                Avatar = component.Data.Optional<string>(SummaryService.KEY_AVATAR),
+                ChatTitle = component.Data.Optional<string>(SummaryService.KEY_CHAT_TITLE),
+                TotalHeroScore = component.Data.Optional<long>(SummaryService.KEY_HERO_SCORE)
+            };
+        return CreateLookupResults(accountIds, data);
+    }
+
     public RumbleJson[] CreateLookupResults(string[] accountIds, Dictionary<string, LookupData> data)
     {
         // TODO: Fix this kluge; PLATF-6498
@@ -1018,7 +1098,7 @@ public class PlayerAccountService : MinqTimerService<Player>
                 {
                     { TokenInfo.FRIENDLY_KEY_ACCOUNT_ID, player.Id },
                     { Player.FRIENDLY_KEY_SCREENNAME, player.Screenname },
-                    { Player.FRIENDLY_KEY_DISCRIMINATOR, player.Discriminator.ToString().PadLeft(4, '0') },
+                    { Player.FRIENDLY_KEY_DISCRIMINATOR, SummaryService.FormatDiscriminator(player.Discriminator) },
                     { "accountAvatar", results.Avatar },
                     { "accountLevel", results.AccountLevel },
                     { "chatTitle", results.ChatTitle },
@@ -0,0 +1,47 @@
+using System;
+using System.Threading;
+using System.Threading.Tasks;
+using Rumble.Platform.Common.Enums;
+using Rumble.Platform.Common.Services;
+using Rumble.Platform.Common.Utilities;
+
+namespace PlayerService.Services;
+
+/// <summary>
+/// Keeps one player search watcher running across every pod.  Each tick takes or renews a lease; the pod holding it
+/// restarts the watcher if it stopped, e.g. after a failover, and a pod that loses it stops its own.
+/// </summary>
+public class PlayerSearchIndexer : PlatformTimerService
+{
+	// Four ticks, so a pod that stops renewing hands the watcher over within a minute.
+	private const long LEASE_MS = 60_000;
+
+#pragma warning disable
+	private readonly PlayerSearchService _search;
+#pragma warning restore
+
+	private readonly string _owner = Guid.NewGuid().ToString("N");
+	private CancellationTokenSource _cancel;
+	private Task _watch;
+
+	public PlayerSearchIndexer() : base(15_000) { }
+
+	protected override void OnElapsed()
+	{
+		if (!_search.TryLease(_owner, LEASE_MS))
+		{
+			_cancel?.Cancel();
+			return;
+		}
+
+		if (_watch is { IsCompleted: false })
+			return;
+		if (_watch?.Exception != null)
+			Log.Warn(Owner.Will, "The player search watcher stopped; restarting it.", exception: _watch.Exception.GetBaseException());
+
+		_cancel?.Dispose();
+		_cancel = new CancellationTokenSource();
+		CancellationToken token = _cancel.Token;
+		_watch = Task.Run(() => _search.WatchAsync(token));
+	}
+}
@@ -0,0 +1,383 @@
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Threading;
+using System.Threading.Tasks;
+using MongoDB.Bson;
+using MongoDB.Bson.Serialization;
+using MongoDB.Driver;
+using PlayerService.Models;
+using PlayerService.Models.Login;
+using Rumble.Platform.Common.Enums;
+using Rumble.Platform.Common.Services;
+using Rumble.Platform.Common.Utilities;
+
+namespace PlayerService.Services;
+
+/// <summary>
+/// A trigram index over the player fields /admin/search looks at, kept in player_search.  A term of three or more
+/// characters is found by looking up all of its trigrams, which narrows millions of players down to a few candidates
+/// that are then checked for the actual substring.
+///
+/// Entries follow the players collection through a change stream (see PlayerSearchIndexer), so every write is picked
+/// up no matter which code path made it.  Existing players are added with PATCH /admin/search/reindex; until that has
+/// walked the whole collection once, searches keep using the old scan.  If the watcher's resume token has left the
+/// oplog, the changes it missed can't be replayed, and the watcher rebuilds the index instead.
+/// </summary>
+public class PlayerSearchService : PlatformMongoService<PlayerSearchEntry>
+{
+	public const int GRAM_LENGTH = 3;
+	public const int CANDIDATE_PAGE = 1_000;
+	private const int REBUILD_BATCH = 1_000;
+	private const string PLAYERS = "players";
+	private const string STATE = "player_search_state";
+	private const string STATE_ID = "watch";
+	private const string LEASE_ID = "lease";
+	private const string DB_KEY_RESUME = "resume";
+	private const string DB_KEY_READY = "ready";
+	private const string DB_KEY_REBUILD = "rebuild";
+	private const string DB_KEY_OWNER = "owner";
+	private const string DB_KEY_EXPIRES = "exp";
+	// ChangeStreamHistoryLost and ChangeStreamFatalError: the resume token is no longer in the oplog.
+	private static readonly int[] HISTORY_LOST = { 286, 280 };
+
+	private bool _ready;
+	private long _readyCheckedMs;
+
+	public PlayerSearchService() : base("player_search") { }
+
+	private IMongoCollection<Player> Players => _collection.Database.GetCollection<Player>(PLAYERS);
+	private IMongoCollection<BsonDocument> State => _collection.Database.GetCollection<BsonDocument>(STATE);
+
+	/// <summary>
+	/// The fields /admin/search matches against.  Keep this in sync with Player.WeighSearchTerm().
+	/// </summary>
+	public static IEnumerable<string> Values(Player player) => new[]
+	{
+		player.Id,
+		player.Device?.InstallId,
+		player.ParentId,
+		player.RumbleAccount?.Email,
+		player.GoogleAccount?.Id,
+		player.GoogleAccount?.Email,
+		player.GoogleAccount?.Name,
+		player.AppleAccount?.Id,
+		player.AppleAccount?.Email,
+		player.PlariumAccount?.Id,
+		player.PlariumAccount?.Email,
+		player.Screenname
+	}.Where(value => !string.IsNullOrWhiteSpace(value));
+
+	private static string ElementOf<T>(string member) => BsonClassMap.LookupClassMap(typeof(T)).GetMemberMap(member).ElementName;
+
+	private static string PathOf<T>(string parent, string member) => $"{ElementOf<Player>(parent)}.{ElementOf<T>(member)}";
+
+	/// <summary>
+	/// The dotted BSON paths of Values(), other than the ID.  An update that touches none of them leaves the entry as
+	/// it was, and never reaches the watcher.
+	/// </summary>
+	private static readonly Lazy<string[]> IndexedPaths = new(() => new[]
+	{
+		PathOf<DeviceInfo>(nameof(Player.Device), nameof(DeviceInfo.InstallId)),
+		ElementOf<Player>(nameof(Player.ParentId)),
+		PathOf<RumbleAccount>(nameof(Player.RumbleAccount), nameof(RumbleAccount.Email)),
+		PathOf<GoogleAccount>(nameof(Player.GoogleAccount), nameof(GoogleAccount.Id)),
+		PathOf<GoogleAccount>(nameof(Player.GoogleAccount), nameof(GoogleAccount.Email)),
+		PathOf<GoogleAccount>(nameof(Player.GoogleAccount), nameof(GoogleAccount.Name)),
+		PathOf<AppleAccount>(nameof(Player.AppleAccount), nameof(AppleAccount.Id)),
+		PathOf<AppleAccount>(nameof(Player.AppleAccount), nameof(AppleAccount.Email)),
+		PathOf<PlariumAccount>(nameof(Player.PlariumAccount), nameof(PlariumAccount.Id)),
+		PathOf<PlariumAccount>(nameof(Player.PlariumAccount), nameof(PlariumAccount.Email)),
+		ElementOf<Player>(nameof(Player.Screenname))
+	});
+
+	public static IEnumerable<string> Grams(string value)
+	{
+		string normalized = value.ToLowerInvariant();
+		for (int i = 0; i + GRAM_LENGTH <= normalized.Length; i++)
+			yield return normalized.Substring(i, GRAM_LENGTH);
+	}
+
+	public static string[] Tokenize(Player player) => Values(player)
+		.SelectMany(Grams)
+		.Distinct()
+		.ToArray();
+
+	public static bool Matches(Player player, string term) => Values(player)
+		.Any(value => value.Contains(term, StringComparison.OrdinalIgnoreCase));
+
+	/// <summary>
+	/// True once every existing player has been indexed, and false again while the index is rebuilt.  Cached for a
+	/// minute.
+	/// </summary>
+	public bool Ready
+	{
+		get
+		{
+			if (TimestampMs.Now - _readyCheckedMs < 60_000)
+				return _ready;
+			_readyCheckedMs = TimestampMs.Now;
+			_ready = State
+				.Find(Builders<BsonDocument>.Filter.Eq("_id", STATE_ID))
+				.FirstOrDefault()
+				?.GetValue(DB_KEY_READY, false)
+				.ToBoolean() ?? false;
+			return _ready;
+		}
+	}
+
+	/// <summary>
+	/// Returns a page of IDs of players whose fields contain every trigram of the term, in ID order and starting after
+	/// the provided ID, or null if the term is too short to use the index.  A page shorter than CANDIDATE_PAGE is the
+	/// last one.  Candidates still need to be checked with Matches().
+	/// </summary>
+	public List<string> Candidates(string term, string after = null)
+	{
+		string[] grams = Grams(term).Distinct().ToArray();
+		if (!grams.Any())
+			return null;
+
+		FilterDefinition<PlayerSearchEntry> filter = Builders<PlayerSearchEntry>.Filter.All(entry => entry.Tokens, grams);
+		if (!string.IsNullOrWhiteSpace(after))
+			filter = Builders<PlayerSearchEntry>.Filter.And(filter, Builders<PlayerSearchEntry>.Filter.Gt(entry => entry.AccountId, after));
+
+		return _collection
+			.Find(filter)
+			.SortBy(entry => entry.AccountId)
+			.Limit(CANDIDATE_PAGE)
+			.Project(entry => entry.AccountId)
+			.ToList();
+	}
+
+	public void Index(IEnumerable<Player> players)
+	{
+		WriteModel<PlayerSearchEntry>[] writes = players
+			.Select(player => new UpdateOneModel<PlayerSearchEntry>(
+				filter: Builders<PlayerSearchEntry>.Filter.Eq(entry => entry.AccountId, player.Id),
+				update: Builders<PlayerSearchEntry>.Update.Set(entry => entry.Tokens, Tokenize(player))
+			) { IsUpsert = true })
+			.ToArray<WriteModel<PlayerSearchEntry>>();
+
+		if (writes.Any())
+			_collection.BulkWrite(writes, new BulkWriteOptions { IsOrdered = false });
+	}
+
+	public void Remove(string accountId) => _collection
+		.DeleteOne(Builders<PlayerSearchEntry>.Filter.Eq(entry => entry.AccountId, accountId));
+
+	/// <summary>
+	/// Indexes a batch of existing players in ID order, starting after the provided ID.  Returns the last ID indexed,
+	/// or null once the whole collection has been walked, at which point searches switch to the index.
+	/// </summary>
+	public string Reindex(string after, int limit)
+	{
+		List<Player> players = Players
+			.Find(string.IsNullOrWhiteSpace(after)
+				? Builders<Player>.Filter.Empty
+				: Builders<Player>.Filter.Gt(player => player.Id, after)
+			)
+			.SortBy(player => player.Id)
+			.Limit(limit)
+			.ToList();
+		Index(players);
+
+		if (players.Count == limit)
+			return players.Last().Id;
+
+		State.UpdateOne(
+			filter: Builders<BsonDocument>.Filter.Eq("_id", STATE_ID),
+			update: Builders<BsonDocument>.Update
+				.Set(DB_KEY_READY, true)
+				.Unset(DB_KEY_REBUILD),
+			options: new UpdateOptions { IsUpsert = true }
+		);
+		_ready = true;
+		return null;
+	}
+
+	/// <summary>
+	/// Takes or renews the lease that lets one pod run the watcher.  Returns false while another pod holds it.
+	/// </summary>
+	public bool TryLease(string owner, long durationMs)
+	{
+		long now = TimestampMs.Now;
+		try
+		{
+			State.UpdateOne(
+				filter: Builders<BsonDocument>.Filter.And(
+					Builders<BsonDocument>.Filter.Eq("_id", LEASE_ID),
+					Builders<BsonDocument>.Filter.Or(
+						Builders<BsonDocument>.Filter.Eq(DB_KEY_OWNER, owner),
+						Builders<BsonDocument>.Filter.Lt(DB_KEY_EXPIRES, now)
+					)
+				),
+				update: Builders<BsonDocument>.Update
+					.Set(DB_KEY_OWNER, owner)
+					.Set(DB_KEY_EXPIRES, now + durationMs),
+				options: new UpdateOptions { IsUpsert = true }
+			);
+			return true;
+		}
+		catch (MongoWriteException e) when (e.WriteError?.Category == ServerErrorCategory.DuplicateKey)
+		{
+			return false;
+		}
+	}
+
+	/// <summary>
+	/// Follows the players collection and keeps entries current until cancelled or the stream fails.  The resume token
+	/// is saved after every batch, so a restarted watcher picks up where the last one stopped.  Only the pod holding the
+	/// lease runs it (see TryLease()).  When the token can't be resumed, or a rebuild was interrupted, the index is
+	/// rebuilt from a new stream.
+	/// </summary>
+	public async Task WatchAsync(CancellationToken token)
+	{
+		BsonDocument state = await State
+			.Find(Builders<BsonDocument>.Filter.Eq("_id", STATE_ID))
+			.FirstOrDefaultAsync(token);
+		BsonDocument resume = state?.GetValue(DB_KEY_RESUME, BsonNull.Value) as BsonDocument;
+
+		if (state?.GetValue(DB_KEY_REBUILD, false).ToBoolean() ?? false)
+		{
+			await FollowAsync(null, rebuild: true, token);
+			return;
+		}
+
+		try
+		{
+			await FollowAsync(resume, rebuild: false, token);
+		}
+		catch (MongoCommandException e) when (resume != null && HISTORY_LOST.Contains(e.Code))
+		{
+			Log.Warn(Owner.Will, "The player search resume token is no longer in the oplog; rebuilding the index.", exception: e);
+			await FollowAsync(null, rebuild: true, token);
+		}
+	}
+
+	private async Task FollowAsync(BsonDocument resume, bool rebuild, CancellationToken token)
+	{
+		ChangeStreamOptions options = new()
+		{
+			ResumeAfter = resume
+		};
+
+		using IChangeStreamCursor<ChangeStreamDocument<Player>> cursor = await Players.WatchAsync(Pipeline(), options, token);
+
+		// The stream is opened first, so that writes made while the rebuild walks the collection are replayed after it.
+		if (rebuild)
+			await RebuildAsync(token);
+
+		while (await cursor.MoveNextAsync(token))
+		{
+			List<Player> changed = new();
+			List<string> updated = new();
+			HashSet<string> removed = new();
+			foreach (ChangeStreamDocument<Player> change in cursor.Current)
+			{
+				string id = change.DocumentKey["_id"].ToString();
+				if (change.OperationType == ChangeStreamOperationType.Delete)
+				{
+					Remove(id);
+					removed.Add(id);
+				}
+				else if (change.FullDocument != null)
+					changed.Add(change.FullDocument);
+				else
+					updated.Add(id);
+			}
+
+			// Updates carry only the fields they changed; the players are read once per batch, as they are now.
+			if (updated.Any())
+				changed.AddRange(await Players
+					.Find(Builders<Player>.Filter.In(player => player.Id, updated.Distinct()))
+					.ToListAsync(token)
+				);
+			Index(changed.Where(player => !removed.Contains(player.Id)));
+
+			BsonDocument next = cursor.GetResumeToken();
+			if (next != null)
+				await State.UpdateOneAsync(
+					filter: Builders<BsonDocument>.Filter.Eq("_id", STATE_ID),
+					update: Builders<BsonDocument>.Update.Set(DB_KEY_RESUME, next),
+					options: new UpdateOptions { IsUpsert = true },
+					cancellationToken: token
+				);
+		}
+	}
+
+	/// <summary>
+	/// Inserts, replaces, and deletes, and only the updates that touch a field in IndexedPaths.  A changed path touches
+	/// an indexed one if either is the other or contains it, e.g. setting all of "google" or just "google.email".
+	/// </summary>
+	private static PipelineDefinition<ChangeStreamDocument<Player>, ChangeStreamDocument<Player>> Pipeline()
+	{
+		BsonArray touches = new();
+		foreach (string path in IndexedPaths.Value)
+		{
+			touches.Add(new BsonDocument("$eq", new BsonArray { "$$path", path }));
+			touches.Add(new BsonDocument("$eq", new BsonArray { new BsonDocument("$indexOfCP", new BsonArray { "$$path", $"{path}." }), 0 }));
+			touches.Add(new BsonDocument("$eq", new BsonArray
+			{
+				new BsonDocument("$indexOfCP", new BsonArray { path, new BsonDocument("$concat", new BsonArray { "$$path", "." }) }),
+				0
+			}));
+		}
+
+		BsonDocument changedPaths = new("$concatArrays", new BsonArray
+		{
+			new BsonDocument("$map", new BsonDocument
+			{
+				{ "input", new BsonDocument("$objectToArray", "$updateDescription.updatedFields") },
+				{ "in", "$$this.k" }
+			}),
+			"$updateDescription.removedFields"
+		});
+
+		BsonDocument filter = new("$or", new BsonArray
+		{
+			new BsonDocument("operationType", new BsonDocument("$in", new BsonArray { "insert", "replace", "delete" })),
+			new BsonDocument
+			{
+				{ "operationType", "update" },
+				{ "$expr", new BsonDocument("$anyElementTrue", new BsonArray
+				{
+					new BsonDocument("$map", new BsonDocument
+					{
+						{ "input", changedPaths },
+						{ "as", "path" },
+						{ "in", new BsonDocument("$or", touches) }
+					})
+				}) }
+			}
+		});
+
+		return new EmptyPipelineDefinition<ChangeStreamDocument<Player>>()
+			.Match(new BsonDocumentFilterDefinition<ChangeStreamDocument<Player>>(filter));
+	}
+
+	/// <summary>
+	/// Starts the index over: searches fall back to the scan, every entry is dropped, and every player is indexed
+	/// again.  The rebuild flag stays set until Reindex() finishes, so a watcher that's interrupted starts it again.
+	/// </summary>
+	private async Task RebuildAsync(CancellationToken token)
+	{
+		await State.UpdateOneAsync(
+			filter: Builders<BsonDocument>.Filter.Eq("_id", STATE_ID),
+			update: Builders<BsonDocument>.Update
+				.Set(DB_KEY_READY, false)
+				.Set(DB_KEY_REBUILD, true)
+				.Unset(DB_KEY_RESUME),
+			options: new UpdateOptions { IsUpsert = true },
+			cancellationToken: token
+		);
+		_ready = false;
+		await _collection.DeleteManyAsync(Builders<PlayerSearchEntry>.Filter.Empty, token);
+
+		string after = null;
+		do
+		{
+			token.ThrowIfCancellationRequested();
+			after = Reindex(after, REBUILD_BATCH);
+		} while (after != null);
+	}
+}
@@ -0,0 +1,353 @@
+using System.Collections.Generic;
+using System.Linq;
+using System.Threading.Tasks;
+using MongoDB.Bson;
+using MongoDB.Bson.Serialization;
+using MongoDB.Driver;
+using PlayerService.Exceptions;
+using PlayerService.Models;
+using PlayerService.Services.ComponentServices;
+using Rumble.Platform.Common.Models;
+using Rumble.Platform.Common.Services;
+using Rumble.Platform.Common.Utilities;
+using Rumble.Platform.Common.Utilities.JsonTools;
+
+namespace PlayerService.Services;
+
+/// <summary>
+/// Single-document component storage.  Mirrors the ComponentService API, but every component of an account lives
+/// in one PlayerRecord, so a /read is one projected query and an /update is one write regardless of how many
+/// components it touches.  Which layout is live is controlled by the componentStorage dynamic config value.
+/// </summary>
+public class RecordService : PlatformMongoService<PlayerRecord>
+{
+	public const string CONFIG_KEY = "componentStorage";
+
+#pragma warning disable
+	private readonly StorageStatsService _storageStats;
+	private readonly ComponentCacheService _componentCache;
+#pragma warning restore
+
+	public RecordService() : base("records") { }
+
+	public static ComponentStorage ConfiguredStorage => Parse(DynamicConfig.Instance?.Optional<string>(CONFIG_KEY));
+
+	/// <summary>
+	/// Returns the storage mode for a request.  Outside of prod, a request can ask for a specific mode so that both
+	/// layouts can be load tested side by side.
+	/// </summary>
+	public static ComponentStorage Resolve(string requested) => !PlatformEnvironment.IsProd && !string.IsNullOrWhiteSpace(requested)
+		? Parse(requested)
+		: ConfiguredStorage;
+
+	private static ComponentStorage Parse(string value) => value?.Trim().ToLower() switch
+	{
+		"record" or "records" => ComponentStorage.Record,
+		"dual" => ComponentStorage.Dual,
+		_ => ComponentStorage.Collections
+	};
+
+	private static FilterDefinition<PlayerRecord> ByAccount(string accountId) => Builders<PlayerRecord>.Filter
+		.Eq(record => record.AccountId, accountId);
+
+	/// <summary>
+	/// Components stored before versioning have no "v" field, which is the same as version 0.
+	/// </summary>
+	private static FilterDefinition<PlayerRecord> VersionIs(string name, int version)
+	{
+		FilterDefinitionBuilder<PlayerRecord> filter = Builders<PlayerRecord>.Filter;
+		string path = PlayerRecord.VersionPath(name);
+		
+		return version == 0
+			? filter.Or(filter.Eq(path, 0), filter.Exists(path, exists: false))
+			: filter.Eq(path, version);
+	}
+
+	public Component Lookup(string accountId, string name)
+	{
+		BsonDocument document = _collection
+			.Find(ByAccount(accountId))
+			.Project(Builders<PlayerRecord>.Projection.Include(PlayerRecord.ComponentPath(name)))
+			.FirstOrDefault();
+		_storageStats.Read(StorageStatsService.RECORDS);
+
+		RecordComponent stored = null;
+		if (document != null)
+			BsonSerializer.Deserialize<PlayerRecord>(document).Components?.TryGetValue(name, out stored);
+
+		return stored == null
+			? new Component(accountId, name) { Version = 0 }
+			: new Component(accountId, name, stored.Data) { Version = stored.Version };
+	}
+
+	/// <summary>
+	/// Reads one component's data inside the caller's transaction, so writes made earlier in it are visible.  Returns
+	/// null if the record or component doesn't exist.
+	/// </summary>
+	public async Task<RumbleJson> FindDataAsync(string accountId, string name, IClientSessionHandle session)
+	{
+		BsonDocument document = await _collection
+			.Find(session, ByAccount(accountId))
+			.Project(Builders<PlayerRecord>.Projection.Include(PlayerRecord.ComponentPath(name)))
+			.FirstOrDefaultAsync();
+		_storageStats.Read(StorageStatsService.RECORDS);
+
+		RecordComponent stored = null;
+		if (document != null)
+			BsonSerializer.Deserialize<PlayerRecord>(document).Components?.TryGetValue(name, out stored);
+		return stored?.Data;
+	}
+
+	/// <summary>
+	/// Replaces a component's data outside of /update.  When an expected version is provided, nothing is written
+	/// unless the stored version matches.  Returns the number of records modified.
+	/// </summary>
+	public long SetData(string accountId, string name, RumbleJson data, int? expectedVersion = null)
+	{
+		FilterDefinition<PlayerRecord> filter = expectedVersion == null
+			? ByAccount(accountId)
+			: Builders<PlayerRecord>.Filter.And(ByAccount(accountId), VersionIs(name, (int)expectedVersion));
+
+		long output = _collection
+			.UpdateOne(filter, Builders<PlayerRecord>.Update.Set(PlayerRecord.DataPath(name), data))
+			.ModifiedCount;
+		_storageStats.Write(StorageStatsService.RECORDS);
+		return output;
+	}
+
+	/// <summary>
+	/// Sets a single field inside a component's data, optionally bumping its version.  Returns the number of records
+	/// modified.
+	/// </summary>
+	public long SetField<T>(string accountId, string name, string field, T value, bool incrementVersion = false)
+	{
+		UpdateDefinition<PlayerRecord> update = Builders<PlayerRecord>.Update.Set($"{PlayerRecord.DataPath(name)}.{field}", value);
+		if (incrementVersion)
+			update = update.Inc(PlayerRecord.VersionPath(name), 1);
+
+		long output = _collection
+			.UpdateOne(ByAccount(accountId), update)
+			.ModifiedCount;
+		_storageStats.Write(StorageStatsService.RECORDS);
+		return output;
+	}
+
+	/// <summary>
+	/// Removes components from the account's record, so reads stop preferring a copy that's been deleted from the
+	/// collections.  The record keeps any other components.  Returns the number of records modified.
+	/// </summary>
+	public long Unset(string accountId, params string[] names)
+	{
+		if (!names.Any())
+			return 0;
+
+		long output = _collection
+			.UpdateOne(ByAccount(accountId), Builders<PlayerRecord>.Update.Combine(names
+				.Distinct()
+				.Select(name => Builders<PlayerRecord>.Update.Unset(PlayerRecord.ComponentPath(name)))
+			))
+			.ModifiedCount;
+		_storageStats.Write(StorageStatsService.RECORDS);
+		_componentCache.Invalidate(accountId, names);
+		return output;
+	}
+
+	/// <summary>
+	/// Reads the requested components with one projected query.  Components the record doesn't have are either
+	/// returned empty at version 0 or, when includeMissing is false, left out so the caller can fall back to the
+	/// collections.
+	/// </summary>
+	public async Task<List<Component>> LookupAsync(string accountId, IEnumerable<string> names, bool includeMissing = true)
+	{
+		string[] requested = names.Distinct().ToArray();
+		if (!requested.Any())
+			return new List<Component>();
+
+		ProjectionDefinition<PlayerRecord> projection = Builders<PlayerRecord>.Projection.Include(PlayerRecord.DB_KEY_ACCOUNT_ID);
+		foreach (string name in requested)
+			projection = projection.Include(PlayerRecord.ComponentPath(name));
+
+		BsonDocument document = await _collection
+			.Find(ByAccount(accountId))
+			.Project(projection)
+			.FirstOrDefaultAsync();
+		_storageStats.Read(StorageStatsService.RECORDS);
+
+		Dictionary<string, RecordComponent> stored = document == null
+			? new Dictionary<string, RecordComponent>()
+			: BsonSerializer.Deserialize<PlayerRecord>(document).Components ?? new Dictionary<string, RecordComponent>();
+
+		List<Component> output = new();
+		foreach (string name in requested)
+			if (stored.TryGetValue(name, out RecordComponent component))
+				output.Add(new Component(accountId, name, component.Data) { Version = component.Version });
+			else if (includeMissing)
+				output.Add(new Component(accountId, name) { Version = 0 });
+		return output;
+	}
+
+	/// <summary>
+	/// Reads components from whichever layout the storage mode calls for.  Anything the record doesn't have comes from
+	/// the collections in one round trip; in dual mode, that's anything not yet migrated.
+	/// </summary>
+	public async Task<List<Component>> LookupAsync(string accountId, string[] names, ComponentStorage storage, Dictionary<string, ComponentService> services)
+	{
+		List<Component> output = storage == ComponentStorage.Collections
+			? new List<Component>()
+			: await LookupAsync(accountId, names, includeMissing: storage == ComponentStorage.Record);
+
+		output.AddRange(await ComponentService.LookupAsync(accountId, names
+			.Where(name => output.All(component => component.Name != name))
+			.Select(name => services[name])
+		));
+		return output;
+	}
+
+	/// <summary>
+	/// Writes every component in one update.  Version checks work the same way as ComponentService.UpdateAsync(): a
+	/// component sent with version N only matches a stored version of N - 1, and a version of 0 skips the check.  All
+	/// of the preconditions are part of one filter, so the happy path is a single round trip.
+	/// </summary>
+	public async Task UpdateAsync(string accountId, IEnumerable<Component> components, IClientSessionHandle session, string origin = null, bool checkVersions = true)
+	{
+		// The same path can't be set twice in one update; the last write for a component wins, as it would when
+		// the components are written one at a time.
+		Component[] updates = components
+			.GroupBy(component => component.Name)
+			.Select(group => group.Last())
+			.ToArray();
+		if (!updates.Any())
+			return;
+
+		FilterDefinitionBuilder<PlayerRecord> filter = Builders<PlayerRecord>.Filter;
+		UpdateDefinitionBuilder<PlayerRecord> builder = Builders<PlayerRecord>.Update;
+		List<UpdateDefinition<PlayerRecord>> sets = new();
+		List<FilterDefinition<PlayerRecord>> preconditions = new();
+
+		foreach (Component component in updates)
+		{
+			// In dual mode the record copy may not have been migrated yet, and a patch on a missing copy would leave a
+			// partial one that reads prefer.  Dropping the copy sends reads to the collection until it's migrated again.
+			if (component.Patch != null && !checkVersions)
+			{
+				sets.Add(builder.Unset(PlayerRecord.ComponentPath(component.Name)));
+				continue;
+			}
+			if (component.Patch != null)
+				sets.Add(PatchOperation.ToUpdate<PlayerRecord>(PlayerRecord.DataPath(component.Name), component.Patch));
+			else if (component.RawData != null)
+				sets.Add(new BsonDocumentUpdateDefinition<PlayerRecord>(new BsonDocument("$set", new BsonDocument(PlayerRecord.DataPath(component.Name), component.RawData))));
+			else
+				sets.Add(builder.Set(PlayerRecord.DataPath(component.Name), component.Data));
+			if (component.Version == 0)
+				continue;
+
+			string path = PlayerRecord.VersionPath(component.Name);
+			sets.Add(builder.Set(path, component.Version));
+			if (!checkVersions)
+				continue;
+
+			preconditions.Add(VersionIs(component.Name, component.ExpectedVersion ?? component.Version - 1));
+		}
+
+		UpdateDefinition<PlayerRecord> update = builder.Combine(sets);
+		FilterDefinition<PlayerRecord> byAccount = ByAccount(accountId);
+
+		if (preconditions.Any())
+		{
+			UpdateResult result = await _collection.UpdateOneAsync(session, filter.And(preconditions.Prepend(byAccount)), update);
+			_storageStats.Write(StorageStatsService.RECORDS);
+			if (result.MatchedCount > 0)
+				return;
+
+			// Nothing matched; find out which component is out of date.  Only versions are projected.
+			ProjectionDefinition<PlayerRecord> projection = Builders<PlayerRecord>.Projection.Include(PlayerRecord.DB_KEY_ACCOUNT_ID);
+			foreach (Component component in updates)
+				projection = projection.Include(PlayerRecord.VersionPath(component.Name));
+
+			BsonDocument current = await _collection
+				.Find(session, byAccount)
+				.Project(projection)
+				.FirstOrDefaultAsync();
+			_storageStats.Read(StorageStatsService.RECORDS);
+
+			if (current != null && !PlatformEnvironment.SwarmMode)
+				foreach (Component component in updates.Where(component => component.Version != 0))
+				{
+					int? stored = VersionOf(current, component.Name);
+					if (stored != null && stored != (component.ExpectedVersion ?? component.Version - 1))
+						throw new ComponentVersionException(component.Name, currentVersion: (int)stored, updateVersion: component.Version, origin);
+				}
+		}
+
+		// Either no version was provided, or the record / component doesn't exist yet.  Upserting on aid is safe here
+		// because aid has a unique index.
+		await _collection.UpdateOneAsync(session, byAccount, update, new UpdateOptions { IsUpsert = true });
+		_storageStats.Write(StorageStatsService.RECORDS);
+	}
+
+	private static int? VersionOf(BsonDocument record, string name) =>
+		record.TryGetValue(PlayerRecord.DB_KEY_COMPONENTS, out BsonValue components)
+		&& components.IsBsonDocument
+		&& components.AsBsonDocument.TryGetValue(name, out BsonValue component)
+		&& component.IsBsonDocument
+			? component.AsBsonDocument.GetValue(PlayerRecord.DB_KEY_VERSION, 0).ToInt32()
+			: null;
+
+	/// <summary>
+	/// Copies components from the c_{name} collections into records.  Existing record components are overwritten,
+	/// which is safe while dual writes keep the collections authoritative.
+	/// </summary>
+	public long Migrate(string[] accountIds, Dictionary<string, ComponentService> services)
+	{
+		if (!accountIds.Any())
+			return 0;
+
+		UpdateDefinitionBuilder<PlayerRecord> builder = Builders<PlayerRecord>.Update;
+		Dictionary<string, Dictionary<string, Component>> byAccount = accountIds
+			.Distinct()
+			.ToDictionary(id => id, _ => new Dictionary<string, Component>());
+
+		foreach ((string name, ComponentService service) in services)
+			foreach (Component component in service.Find(accountIds))
+				if (byAccount.TryGetValue(component.AccountId, out Dictionary<string, Component> found))
+					found[name] = component;
+
+		WriteModel<PlayerRecord>[] writes = byAccount
+			.Where(pair => pair.Value.Any())
+			.Select(pair => new UpdateOneModel<PlayerRecord>(
+				filter: ByAccount(pair.Key),
+				update: builder.Combine(pair.Value.SelectMany(entry => new[]
+				{
+					builder.Set(PlayerRecord.DataPath(entry.Key), entry.Value.Data),
+					builder.Set(PlayerRecord.VersionPath(entry.Key), entry.Value.Version)
+				}))
+			)
+			{
+				IsUpsert = true
+			})
+			.ToArray<WriteModel<PlayerRecord>>();
+
+		if (!writes.Any())
+			return 0;
+
+		BulkWriteResult<PlayerRecord> result = _collection.BulkWrite(writes);
+		_storageStats.Write(StorageStatsService.RECORDS);
+		return result.ModifiedCount + result.Upserts.Count;
+	}
+
+	public override long ProcessGdprRequest(TokenInfo token, string dummyText)
+	{
+		if (string.IsNullOrWhiteSpace(token.AccountId))
+			return 0;
+
+		long output = _collection.UpdateOne(
+			filter: ByAccount(token.AccountId),
+			update: Builders<PlayerRecord>.Update
+				.Set($"{PlayerRecord.DataPath(Component.ACCOUNT)}.deviceInfo", (string)null)
+				.Set($"{PlayerRecord.DataPath(Component.ACCOUNT)}.{AccountService.DB_KEY_SCREENNAME}", dummyText)
+		).ModifiedCount;
+		_componentCache.Invalidate(token.AccountId, Component.ACCOUNT);
+		return output;
+	}
+}
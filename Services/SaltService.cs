@@ -1,5 +1,7 @@
 using System;
+using System.Collections.Concurrent;
 using System.Collections.Generic;
+using System.Linq;
 using System.Text.Json.Serialization;
 using MongoDB.Bson.Serialization.Attributes;
 using MongoDB.Driver;
@@ -13,42 +15,80 @@ using Rumble.Platform.Common.Utilities.JsonTools;
 
 namespace PlayerService.Services;
 
+/// <summary>
+/// Salts never change once created, so recent lookups are kept in memory and a new salt is only generated when the
+/// username doesn't have one yet.  Usernames are lowercased before they're stored, cached, or looked up.  Salts stored
+/// before that keep their original case, so a lookup also matches the username as it was sent, and prefers the
+/// lowercased salt when both exist.
+/// </summary>
 public class SaltService : PlatformMongoService<Salt>
 {
+    private const int MAX_CACHED = 50_000;
+
+    private readonly ConcurrentDictionary<string, Salt> _cache = new();
+
     public SaltService() : base("salt") { }
 
+    private static string Normalize(string username) => username?.ToLowerInvariant();
+
     public Salt Fetch(string username)
     {
-        Salt upsert = new Salt
-        {
-            Username = username,
-            Value = BCrypt.Net.BCrypt.GenerateSalt(workFactor: 6)
-        };
-        
-        return _collection
-            .Find(filter: Builders<Salt>.Filter.Eq(salt => salt.Username, upsert.Username))
-            .FirstOrDefault() 
-            ?? _collection
-                .FindOneAndUpdate(
-                    filter: Builders<Salt>.Filter.Eq(salt => salt.Username, upsert.Username),
+        string sent = username;
+        username = Normalize(username);
+        if (_cache.TryGetValue(username, out Salt cached))
+            return cached;
+
+        FilterDefinition<Salt> filter = Builders<Salt>.Filter.Eq(salt => salt.Username, username);
+        Salt output = _collection
+            .Find(Builders<Salt>.Filter.In(salt => salt.Username, new[] { username, sent }.Distinct()))
+            .ToList()
+            .OrderBy(salt => salt.Username == username ? 0 : 1)
+            .FirstOrDefault();
+
+        if (output == null)
+            try
+            {
+                // SetOnInsert keeps whichever salt was written first if two requests race to create one.
+                output = _collection.FindOneAndUpdate(
+                    filter: filter,
                     update: Builders<Salt>.Update
-                        .Set(salt => salt.Username, upsert.Username)
-                        .Set(salt => salt.Value, upsert.Value),
+                        .SetOnInsert(salt => salt.Username, username)
+                        .SetOnInsert(salt => salt.Value, BCrypt.Net.BCrypt.GenerateSalt(workFactor: 6)),
                     options: new FindOneAndUpdateOptions<Salt>
                     {
                         IsUpsert = true,
                         ReturnDocument = ReturnDocument.After
                     }
-                )
-            ?? throw new RecordNotFoundException(CollectionName, "No salt found for provided username.", data: new RumbleJson
+                );
+            }
+            catch (MongoCommandException e) when (e.Code == 11000)
+            {
+                output = _collection.Find(filter).FirstOrDefault();
+            }
+
+        if (output == null)
+            throw new RecordNotFoundException(CollectionName, "No salt found for provided username.", data: new RumbleJson
             {
                 { "username", username }
             });
+
+        // Usernames come from unauthenticated requests; don't let them grow the cache forever.
+        if (_cache.Count >= MAX_CACHED)
+            _cache.Clear();
+        _cache[username] = output;
+        return output;
     }
 
-    public override long ProcessGdprRequest(TokenInfo token, string dummyText) => _collection
-        .UpdateMany(
-            filter: Builders<Salt>.Filter.Eq(salt => salt.Username, token?.Email),
-            update: Builders<Salt>.Update.Set(salt => salt.Username, dummyText)
-        ).ModifiedCount;
-}
\ No newline at end of file
+    public override long ProcessGdprRequest(TokenInfo token, string dummyText)
+    {
+        string username = Normalize(token?.Email);
+        if (username != null)
+            _cache.TryRemove(username, out _);
+
+        return _collection
+            .UpdateMany(
+                filter: Builders<Salt>.Filter.In(salt => salt.Username, new[] { username, token?.Email }.Distinct()),
+                update: Builders<Salt>.Update.Set(salt => salt.Username, dummyText)
+            ).ModifiedCount;
+    }
+}
@@ -0,0 +1,63 @@
+using System.Collections.Concurrent;
+using System.Linq;
+using PlayerService.Models;
+using PlayerService.Utilities;
+using Rumble.Platform.Common.Services;
+using Rumble.Platform.Common.Utilities.JsonTools;
+
+namespace PlayerService.Services;
+
+/// <summary>
+/// Counts Mongo operations by storage layout and /update transactions by storage mode, so the collection and record
+/// layouts can be compared under the same load.  Counters are per instance; load tests comparing layouts should
+/// target a single pod.
+/// </summary>
+public class StorageStatsService : PlatformService
+{
+	public const string COLLECTIONS = "collections";
+	public const string RECORDS = "records";
+
+	private readonly ConcurrentDictionary<string, long> _counters = new();
+
+	public void Read(string layout, long count = 1)
+	{
+		Add($"ops.{layout}.reads", count);
+		RequestTimings.Count(RequestTimings.COUNTER_MONGO, (int)count);
+	}
+
+	public void Write(string layout, long count = 1)
+	{
+		Add($"ops.{layout}.writes", count);
+		RequestTimings.Count(RequestTimings.COUNTER_MONGO, (int)count);
+	}
+
+	public void Attempted(ComponentStorage storage) => Add($"transactions.{Key(storage)}.attempts");
+	public void Committed(ComponentStorage storage) => Add($"transactions.{Key(storage)}.committed");
+	public void Aborted(ComponentStorage storage) => Add($"transactions.{Key(storage)}.aborted");
+	public void Conflicted(ComponentStorage storage) => Add($"transactions.{Key(storage)}.versionConflicts");
+
+	/// <summary>
+	/// Records a coalesced /update batch about to be written, and how many requests it carries.
+	/// </summary>
+	public void Coalesced(int requests)
+	{
+		Add("coalescing.batches");
+		Add("coalescing.requests", requests);
+	}
+
+	public void CoalesceFellBack() => Add("coalescing.fallbacks");
+
+	public RumbleJson Snapshot()
+	{
+		RumbleJson output = new();
+		foreach ((string key, long value) in _counters.OrderBy(pair => pair.Key))
+			output[key] = value;
+		return output;
+	}
+
+	public void Reset() => _counters.Clear();
+
+	private void Add(string key, long count = 1) => _counters.AddOrUpdate(key, count, (_, value) => value + count);
+
+	private static string Key(ComponentStorage storage) => storage.ToString().ToLower();
+}
@@ -0,0 +1,136 @@
+using System;
+using System.Collections.Concurrent;
+using System.Linq;
+using System.Text;
+using System.Text.Json;
+using System.Threading;
+using Rumble.Platform.Common.Enums;
+using Rumble.Platform.Common.Services;
+using Rumble.Platform.Common.Utilities;
+
+namespace PlayerService.Services;
+
+/// <summary>
+/// Remembers the last token minted for each player so logins, refreshes, and account conflicts can skip the
+/// token-service round trip.  A token is reused only while everything it was minted from (account ID, screenname,
+/// email, discriminator, audiences) is unchanged, at least half of its lifetime remains, and it was minted within the
+/// last tokenCacheMaxAgeSeconds (5 minutes by default); after that the next caller gets a fresh one, so clients never
+/// receive a token that's about to expire.  token-service checks bans when it mints a token, so the age cap bounds how
+/// long a banned or invalidated account can keep receiving a cached one.
+///
+/// Set tokenCacheEnabled to false in dynamic config to always call token-service.
+/// </summary>
+public class TokenCacheService : PlatformTimerService
+{
+	public const string CONFIG_ENABLED = "tokenCacheEnabled";
+	public const string CONFIG_MAX_AGE = "tokenCacheMaxAgeSeconds";
+	private const long DEFAULT_MAX_AGE = 300;
+	private const int MAX_ENTRIES = 200_000;
+	private const double MIN_REMAINING = 0.5;
+
+	private static bool Enabled => DynamicConfig.Instance?.Optional<bool?>(CONFIG_ENABLED) ?? true;
+	private static long MaxAge => Math.Max(0, DynamicConfig.Instance?.Optional<long?>(CONFIG_MAX_AGE) ?? DEFAULT_MAX_AGE);
+
+	private class Entry
+	{
+		public string Fingerprint;
+		public string Token;
+		public long IssuedAt;
+		public long Expiration;
+
+		public bool Fresh(long maxAge)
+		{
+			long now = Timestamp.Now;
+			return now < IssuedAt + maxAge && now < Expiration - (Expiration - IssuedAt) * MIN_REMAINING;
+		}
+	}
+
+	private readonly ConcurrentDictionary<string, Entry> _entries = new();
+	private long _hits;
+	private long _misses;
+
+	public TokenCacheService() : base(60_000) { }
+
+	public static string Fingerprint(string accountId, string screenname, string email, int discriminator, Audience audiences)
+		=> string.Join('|', accountId, screenname, email, discriminator, (long)audiences);
+
+	/// <summary>
+	/// Returns a cached token for the player if its inputs match and it's fresh, otherwise mints one with the provided
+	/// function and caches it.
+	/// </summary>
+	public string Get(string playerId, string fingerprint, Func<string> generate)
+	{
+		if (!Enabled || string.IsNullOrWhiteSpace(playerId))
+			return generate();
+
+		if (_entries.TryGetValue(playerId, out Entry entry) && entry.Fingerprint == fingerprint && entry.Fresh(MaxAge))
+		{
+			Interlocked.Increment(ref _hits);
+			return entry.Token;
+		}
+
+		Interlocked.Increment(ref _misses);
+		string token = generate();
+		if (string.IsNullOrWhiteSpace(token) || !TryReadLifetime(token, out long issuedAt, out long expiration))
+			return token;
+
+		if (_entries.Count >= MAX_ENTRIES)
+			_entries.Clear();
+		_entries[playerId] = new Entry
+		{
+			Fingerprint = fingerprint,
+			Token = token,
+			IssuedAt = issuedAt,
+			Expiration = expiration
+		};
+		return token;
+	}
+
+	public void Invalidate(params string[] playerIds)
+	{
+		foreach (string id in playerIds.Where(id => !string.IsNullOrWhiteSpace(id)))
+			_entries.TryRemove(id, out _);
+	}
+
+	public object Stats() => new
+	{
+		Entries = _entries.Count,
+		Hits = Interlocked.Read(ref _hits),
+		Misses = Interlocked.Read(ref _misses)
+	};
+
+	/// <summary>
+	/// Reads iat and exp from the JWT payload.  The token came straight from token-service, so the signature isn't
+	/// checked here.  Tokens without both claims aren't cached.
+	/// </summary>
+	private static bool TryReadLifetime(string token, out long issuedAt, out long expiration)
+	{
+		issuedAt = expiration = 0;
+		string[] parts = token.Split('.');
+		if (parts.Length != 3)
+			return false;
+
+		try
+		{
+			string payload = parts[1].Replace('-', '+').Replace('_', '/');
+			payload = payload.PadRight(payload.Length + (4 - payload.Length % 4) % 4, '=');
+			using JsonDocument json = JsonDocument.Parse(Encoding.UTF8.GetString(Convert.FromBase64String(payload)));
+			if (!json.RootElement.TryGetProperty("iat", out JsonElement iat) || !json.RootElement.TryGetProperty("exp", out JsonElement exp))
+				return false;
+			issuedAt = iat.GetInt64();
+			expiration = exp.GetInt64();
+			return expiration > issuedAt;
+		}
+		catch
+		{
+			return false;
+		}
+	}
+
+	protected override void OnElapsed()
+	{
+		long maxAge = MaxAge;
+		foreach (string id in _entries.Where(pair => !pair.Value.Fresh(maxAge)).Select(pair => pair.Key).ToArray())
+			_entries.TryRemove(id, out _);
+	}
+}
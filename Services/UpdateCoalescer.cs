@@ -0,0 +1,158 @@
+using System;
+using System.Collections.Generic;
+using System.Diagnostics;
+using System.Threading.Tasks;
+using PlayerService.Exceptions;
+using PlayerService.Models;
+using PlayerService.Utilities;
+using Rumble.Platform.Common.Exceptions;
+using Rumble.Platform.Common.Services;
+using Rumble.Platform.Common.Utilities;
+
+namespace PlayerService.Services;
+
+/// <summary>
+/// Merges /update autosaves from the same account that arrive within a short window, so that they're written in one
+/// transaction instead of one each.  The first request for an account opens a batch and waits out the window (and any
+/// batch for the account that's still being written); later requests merge into it when UpdateBatch.TryMerge() allows,
+/// or open the next batch otherwise.  Every request gets its response only after the batch it's in has committed.
+///
+/// If a merged batch fails a version check, its requests are written again one at a time, in order, so each gets the
+/// result it would have had without coalescing.  Any other failure is returned to every request in the batch.
+///
+/// Batches are per pod; requests for the same account on different pods are still written separately, and their
+/// version checks work as usual.
+/// </summary>
+public class UpdateCoalescer : PlatformService
+{
+	public const string CONFIG_WINDOW = "updateCoalesceMs";
+	public const string CONFIG_MAX_REQUESTS = "updateCoalesceMaxRequests";
+	public const string COUNTER_REQUESTS = "coalesced";
+	private const int DEFAULT_WINDOW_MS = 250;
+	private const int DEFAULT_MAX_REQUESTS = 16;
+
+#pragma warning disable
+	private readonly StorageStatsService _storageStats;
+#pragma warning restore
+
+	private static int ConfiguredWindowMs => DynamicConfig.Instance?.Optional<int>(CONFIG_WINDOW) ?? 0;
+	private static int MaxRequests => Math.Max(1, DynamicConfig.Instance?.Optional<int?>(CONFIG_MAX_REQUESTS) ?? DEFAULT_MAX_REQUESTS);
+
+	/// <summary>
+	/// Whether /update coalesces by default; requests can still opt in or out with "coalesce".
+	/// </summary>
+	public bool Enabled => ConfiguredWindowMs > 0;
+
+	private static int WindowMs => ConfiguredWindowMs > 0
+		? ConfiguredWindowMs
+		: DEFAULT_WINDOW_MS;
+
+	private class Pending
+	{
+		public UpdateBatch Merged;
+		public readonly List<(UpdateBatch update, TaskCompletionSource<UpdateBatch> done)> Members = new();
+		public readonly TaskCompletionSource Finished = new(TaskCreationOptions.RunContinuationsAsynchronously);
+		public long CommitStarted;
+	}
+
+	private readonly object _lock = new();
+	// Account ID -> the batch still accepting requests.
+	private readonly Dictionary<string, Pending> _open = new();
+	// Account ID -> the last batch opened, which the next one waits for.
+	private readonly Dictionary<string, Pending> _last = new();
+
+	/// <summary>
+	/// Writes the update with commit(), merged with others from the same account where possible.  Returns the batch
+	/// that was committed, which is shared with the other requests in it; the caller's own batch is unchanged.
+	/// </summary>
+	public async Task<UpdateBatch> SubmitAsync(UpdateBatch update, Func<UpdateBatch, Task> commit)
+	{
+		long submitted = Stopwatch.GetTimestamp();
+		TaskCompletionSource<UpdateBatch> done = new(TaskCreationOptions.RunContinuationsAsynchronously);
+		Pending pending;
+		Pending previous = null;
+		bool leader = false;
+
+		lock (_lock)
+		{
+			if (_open.TryGetValue(update.AccountId, out pending) && pending.Members.Count < MaxRequests && pending.Merged.TryMerge(update))
+				pending.Members.Add((update, done));
+			else
+			{
+				pending = new Pending { Merged = update.Copy() };
+				pending.Members.Add((update, done));
+				previous = _last.GetValueOrDefault(update.AccountId);
+				_open[update.AccountId] = pending;
+				_last[update.AccountId] = pending;
+				leader = true;
+			}
+		}
+
+		// The first request writes the batch for everyone in it.
+		if (leader)
+			await LeadAsync(pending, previous, commit);
+
+		try
+		{
+			return await done.Task;
+		}
+		finally
+		{
+			RequestTimings.Add("coalesce.wait", Stopwatch.GetElapsedTime(submitted, pending.CommitStarted).TotalMilliseconds);
+			RequestTimings.Count(COUNTER_REQUESTS, pending.Members.Count);
+		}
+	}
+
+	private async Task LeadAsync(Pending pending, Pending previous, Func<UpdateBatch, Task> commit)
+	{
+		string accountId = pending.Merged.AccountId;
+		try
+		{
+			await Task.WhenAll(Task.Delay(WindowMs), previous?.Finished.Task ?? Task.CompletedTask);
+			lock (_lock)
+				if (_open.GetValueOrDefault(accountId) == pending)
+					_open.Remove(accountId);
+
+			pending.CommitStarted = Stopwatch.GetTimestamp();
+			_storageStats.Coalesced(pending.Members.Count);
+			try
+			{
+				await commit(pending.Merged);
+				foreach ((UpdateBatch _, TaskCompletionSource<UpdateBatch> done) in pending.Members)
+					done.SetResult(pending.Merged);
+			}
+			// A version conflict or a patch that doesn't fit the stored data may come from just one request, so the others
+			// get their own transactions.
+			catch (PlatformException e) when (e is ComponentVersionException or ComponentInvalidException && pending.Members.Count > 1)
+			{
+				_storageStats.CoalesceFellBack();
+				foreach ((UpdateBatch update, TaskCompletionSource<UpdateBatch> done) in pending.Members)
+					try
+					{
+						await commit(update);
+						done.SetResult(update);
+					}
+					catch (Exception e)
+					{
+						done.SetException(e);
+					}
+			}
+			catch (Exception e)
+			{
+				foreach ((UpdateBatch _, TaskCompletionSource<UpdateBatch> done) in pending.Members)
+					done.SetException(e);
+			}
+		}
+		finally
+		{
+			lock (_lock)
+			{
+				if (_open.GetValueOrDefault(accountId) == pending)
+					_open.Remove(accountId);
+				if (_last.GetValueOrDefault(accountId) == pending)
+					_last.Remove(accountId);
+			}
+			pending.Finished.TrySetResult();
+		}
+	}
+}
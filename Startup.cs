@@ -3,6 +3,7 @@ using Microsoft.AspNetCore.Authentication.Cookies;
 using Microsoft.Extensions.DependencyInjection;
 using PlayerService.Filters;
 using PlayerService.Services;
+using PlayerService.Utilities;
 using Rumble.Platform.Common.Enums;
 using Rumble.Platform.Common.Services;
 using Rumble.Platform.Common.Utilities;
@@ -27,6 +28,8 @@ public class Startup : PlatformStartup
 			options.ClientId = PlatformEnvironment.Require<string>("GOOGLE_CLIENT_ID");
 			options.ClientSecret = PlatformEnvironment.Require<string>("GOOGLE_APP_SECRET");
 		});
+
+		WireEncoding.Register(services);
 	}
 
 	protected override PlatformOptions ConfigureOptions(PlatformOptions options) => options
@@ -38,5 +41,6 @@ public class Startup : PlatformStartup
 		.SetLogglyThrottleThreshold(suppressAfter: 100, period: 1800)
 		.AddFilter<MaintenanceFilter>()
 		.AddFilter<PruneFilter>()
+		.AddFilter<TimingFilter>()
 		.OnReady(_ => { });
 }
\ No newline at end of file
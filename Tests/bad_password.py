@@ -0,0 +1,84 @@
+import random
+import uuid
+from collections import Counter
+
+from locust import HttpUser, events, tag, task, between
+
+import server_metrics # Unused name; importing it registers the Server-Timing listeners.
+
+LOGIN = "/player/v2/account/login"
+SALT = "/player/v2/account/salt"
+
+outcomes = Counter()
+
+@events.init_command_line_parser.add_listener
+def on_parser_init(parser):
+	parser.add_argument("--flood-ips", type = int, default = 1000, env_var = "LOCUST_FLOOD_IPS",
+		help = "Distinct client addresses BadPasswordUser spreads its attempts across, sent as X-Forwarded-For.")
+	parser.add_argument("--flood-emails", type = str, default = "", env_var = "LOCUST_FLOOD_EMAILS",
+		help = "Comma-separated confirmed Rumble emails to attack.  Without any, every attempt uses a random unknown email.")
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+	if not outcomes:
+		return
+	total = sum(outcomes.values())
+	print("Bad password flood")
+	for outcome, count in outcomes.most_common():
+		print("  %-18s %8d  %6.2f%%" % (outcome, count, 100 * count / total))
+
+def find_flag(body, key):
+	"""LoginDiagnosis flags may be nested under the error envelope; look for the key anywhere."""
+	if isinstance(body, dict):
+		return any(key == k and v is True or find_flag(v, key) for k, v in body.items())
+	if isinstance(body, list):
+		return any(find_flag(value, key) for value in body)
+	return False
+
+class BadPasswordUser(HttpUser):
+	"""
+	Credential stuffing: fetches a salt, then logs in with a wrong password hash, from --flood-ips addresses.  With
+	--flood-emails, attempts target real accounts, so an address that keeps guessing should start seeing lockouts;
+	otherwise emails are random and exercise the salt and diagnosis paths.  Every attempt is expected to fail, so only
+	unexpected successes and server errors are reported as failures; the breakdown of login outcomes is printed when
+	the test stops.
+	"""
+	weight = 1
+	wait_time = between(0, 0.1)
+
+	def on_start(self):
+		options = self.environment.parsed_options
+		self.ips = ["10.%d.%d.%d" % (n >> 16 & 255, n >> 8 & 255, n & 255) for n in random.sample(range(1, 1 << 24), max(1, options.flood_ips))]
+		self.emails = [email.strip() for email in options.flood_emails.split(",") if email.strip()]
+
+	@tag("badpassword")
+	@task(1)
+	def attempt(self):
+		email = random.choice(self.emails) if self.emails else "locust-%s@example.com" % uuid.uuid4().hex[:12]
+		headers = { "X-Forwarded-For": random.choice(self.ips) }
+
+		self.client.get(SALT, name = "/account/salt [flood]", params = { "username": email }, headers = headers)
+		with self.client.post(LOGIN, name = "/account/login [bad password]", headers = headers, json = {
+			"sso": {
+				"rumble": {
+					"email": email,
+					"username": email,
+					"hash": uuid.uuid4().hex
+				}
+			}
+		}, catch_response = True) as response:
+			if response.status_code >= 500:
+				response.failure("Server error")
+				outcomes["server error"] += 1
+				return
+			if response.ok:
+				response.failure("Login succeeded with a wrong password")
+				outcomes["success"] += 1
+				return
+			try:
+				body = response.json()
+			except Exception:
+				body = None
+			outcome = next((flag for flag in ["accountLocked", "passwordInvalid", "emailNotLinked"] if find_flag(body, flag)), "other")
+			outcomes[outcome] += 1
+			response.success()
@@ -0,0 +1,54 @@
+"""
+Measures how many /update and /nuke request bodies one core can produce, comparing the old approach (build the dict,
+then let requests JSON-encode it) with the cached templates in payloads.py.
+
+	python Tests/bench_payloads.py --seconds 3
+"""
+import argparse
+import json
+import time
+import uuid
+
+import payloads
+
+def measure(produce, seconds):
+	count = 0
+	size = 0
+	started = time.process_time()
+	deadline = started + seconds
+	while time.process_time() < deadline:
+		for _ in range(100):
+			size = len(produce())
+		count += 100
+	return count / (time.process_time() - started), size
+
+def main():
+	parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--seconds", type = float, default = 3, help = "CPU seconds to spend on each measurement.")
+	args = parser.parse_args()
+
+	aid = uuid.uuid4().hex[:24]
+	screenname = "Player19944066"
+	versions = { name: 2 for name, _ in payloads.COMPONENTS }
+
+	# requests' json= path: complexjson.dumps(body, allow_nan = False) followed by .encode("utf-8").
+	cases = [
+		("update", "dict + json=", lambda: json.dumps(payloads.update_body(aid, screenname, versions), allow_nan = False).encode("utf-8")),
+		("update", "template", lambda: payloads.render_update(aid, screenname, versions)),
+		("nuke", "dict + json=", lambda: json.dumps(payloads.nuke_body(aid, screenname, versions), allow_nan = False).encode("utf-8")),
+		("nuke", "template", lambda: payloads.render_nuke(aid, screenname, versions))
+	]
+
+	print("%-8s %-14s %14s %10s" % ("body", "method", "bodies/s/core", "bytes"))
+	baseline = {}
+	for body, method, produce in cases:
+		rate, size = measure(produce, args.seconds)
+		speedup = ""
+		if body in baseline:
+			speedup = "  (%.1fx)" % (rate / baseline[body])
+		else:
+			baseline[body] = rate
+		print("%-8s %-14s %14.0f %10d%s" % (body, method, rate, size, speedup))
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,148 @@
+"""
+Compares /admin/search's per-term substring scan with the trigram index in player_search, against a scratch database
+seeded with generated players.  Both queries are the ones the server sends; the index side also fetches the candidate
+players and checks them, as PlayerAccountService.Search() does.
+
+	python Tests/bench_search.py --mongo mongodb://localhost:27017 --players 2000000
+	python Tests/bench_search.py --mongo mongodb://localhost:27017 --skip-seed
+
+Needs pymongo (pip install pymongo).  Only point it at a throwaway database; seeding drops the collections it uses.
+"""
+import argparse
+import random
+import re
+import statistics
+import sys
+import time
+
+try:
+	from bson import ObjectId
+	from pymongo import MongoClient, UpdateOne
+except ImportError:
+	sys.exit("bench_search.py needs pymongo: pip install pymongo")
+
+GRAM_LENGTH = 3
+CANDIDATE_PAGE = 1000
+LIMIT = 100
+
+# Dotted BSON keys for the fields Search() matches, in the same order as PlayerSearchService.Values().
+FIELDS = [
+	"_id", "device.install", "parent", "rumble.email",
+	"google.id", "google.email", "google.name",
+	"apple.sub", "apple.email",
+	"plarium.plid", "plarium.email",
+	"sn"
+]
+
+# A fixed mix: full emails and names, partial screennames, IDs, and a term that matches nothing.
+TERMS = [
+	"player1234567", "anna.k", "@gmail.com", "wolfpack", "dragonrider",
+	"d41f", "install-00042", "no-such-player-xyz", "ben_", "plarium"
+]
+
+NAMES = ["anna.k", "ben_", "carla", "dmitri", "eli", "fatima", "gus", "hiro", "ines", "jonas", "wolfpack", "dragonrider"]
+DOMAINS = ["gmail.com", "yahoo.com", "icloud.com", "rumble.games"]
+
+def grams(value):
+	value = value.lower()
+	return { value[i:i + GRAM_LENGTH] for i in range(len(value) - GRAM_LENGTH + 1) }
+
+def values(player):
+	for field in FIELDS:
+		value = player
+		for key in field.split("."):
+			value = value.get(key) if isinstance(value, dict) else None
+		if value:
+			yield str(value)
+
+def tokenize(player):
+	tokens = set()
+	for value in values(player):
+		tokens |= grams(value)
+	return sorted(tokens)
+
+def generate(n, rng):
+	name = rng.choice(NAMES) + str(rng.randrange(10_000))
+	email = "%s@%s" % (name, rng.choice(DOMAINS))
+	player = {
+		"_id": ObjectId(),
+		"sn": "Player%07d" % n if rng.random() < 0.6 else name,
+		"device": { "install": "install-%08d" % n }
+	}
+	sso = rng.random()
+	if sso < 0.3:
+		player["google"] = { "id": str(rng.randrange(10 ** 20)), "email": email, "name": name }
+	elif sso < 0.45:
+		player["apple"] = { "sub": "%06d.%s" % (rng.randrange(10 ** 6), ObjectId()), "email": email }
+	elif sso < 0.5:
+		player["plarium"] = { "plid": str(rng.randrange(10 ** 9)), "email": email }
+	elif sso < 0.6:
+		player["rumble"] = { "email": email }
+	return player
+
+def seed(db, count, batch):
+	db.players.drop()
+	db.player_search.drop()
+	rng = random.Random(1)
+	started = time.time()
+	for offset in range(0, count, batch):
+		players = [generate(n, rng) for n in range(offset, min(count, offset + batch))]
+		db.players.insert_many(players, ordered = False)
+		db.player_search.bulk_write([
+			UpdateOne({ "aid": p["_id"] }, { "$set": { "t": tokenize(p) } }, upsert = True)
+			for p in players
+		], ordered = False)
+		print("\rseeded %d / %d (%.0fs)" % (min(count, offset + batch), count, time.time() - started), end = "", flush = True)
+	print()
+	db.player_search.create_index("aid", unique = True)
+	db.player_search.create_index("t")
+	db.player_search.create_index([("t", 1), ("aid", 1)])
+
+def scan(db, term):
+	pattern = re.compile(re.escape(term), re.IGNORECASE)
+	return list(db.players.find({ "$or": [{ field: pattern } for field in FIELDS if field != "_id"] }).limit(LIMIT))
+
+def indexed(db, term):
+	terms = sorted(grams(term))
+	found = []
+	query = { "t": { "$all": terms } }
+	while len(found) < LIMIT:
+		ids = [e["aid"] for e in db.player_search.find(query, { "aid": 1 }).sort("aid", 1).limit(CANDIDATE_PAGE)]
+		for player in db.players.find({ "_id": { "$in": ids } }):
+			if any(term.lower() in value.lower() for value in values(player)):
+				found.append(player)
+		if len(ids) < CANDIDATE_PAGE:
+			break
+		query = { "t": { "$all": terms }, "aid": { "$gt": ids[-1] } }
+	return found[:LIMIT]
+
+def measure(query, db, term, repeats):
+	times = []
+	for _ in range(repeats):
+		started = time.perf_counter()
+		results = query(db, term)
+		times.append((time.perf_counter() - started) * 1000)
+	return statistics.median(times), len(results)
+
+def main():
+	parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--mongo", default = "mongodb://localhost:27017", help = "Connection string for the scratch server.")
+	parser.add_argument("--database", default = "player_search_bench", help = "Scratch database; its players and player_search collections are replaced.")
+	parser.add_argument("--players", type = int, default = 2_000_000, help = "Players to seed.")
+	parser.add_argument("--batch", type = int, default = 10_000, help = "Players per insert while seeding.")
+	parser.add_argument("--repeats", type = int, default = 3, help = "Runs per term; the median is reported.")
+	parser.add_argument("--skip-seed", action = "store_true", help = "Reuse the data from a previous run.")
+	args = parser.parse_args()
+
+	db = MongoClient(args.mongo)[args.database]
+	if not args.skip_seed:
+		seed(db, args.players, args.batch)
+
+	print("%-20s %10s %8s %10s %8s %9s" % ("term", "scan ms", "found", "index ms", "found", "speedup"))
+	for term in TERMS:
+		scan_ms, scan_found = measure(scan, db, term, args.repeats)
+		index_ms, index_found = measure(indexed, db, term, args.repeats)
+		print("%-20s %10.1f %8d %10.1f %8d %8.1fx" % (term, scan_ms, scan_found, index_ms, index_found, scan_ms / max(index_ms, 0.001)))
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,62 @@
+"""
+Compares the two ways /update can read component data, using the same body the load tests send: parsing each escaped
+data string into RumbleJson and serializing that to BSON, or parsing it straight into BSON (rawComponentData).  The
+server runs both on the posted body and reports allocations and time per update; nothing is written.
+
+	python Tests/bench_update_parse.py --host http://localhost:5000 --admin-token <token> --iterations 2000
+
+Needs a nonprod server and an admin token.
+"""
+import argparse
+import json
+import sys
+import urllib.request
+import uuid
+
+import payloads
+
+ENDPOINT = "/player/v2/admin/benchmark/update"
+
+def run(host, token, body, iterations):
+	request = urllib.request.Request(
+		"%s%s?iterations=%d" % (host.rstrip("/"), ENDPOINT, iterations),
+		data = body,
+		method = "POST",
+		headers = { "Authorization": "Bearer " + token, "Content-Type": "application/json" }
+	)
+	with urllib.request.urlopen(request, timeout = 600) as response:
+		return json.loads(response.read())
+
+def main():
+	parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--host", default = "http://localhost:5000", help = "Base URL of a nonprod player-service.")
+	parser.add_argument("--admin-token", required = True, help = "Admin token for /admin routes.")
+	parser.add_argument("--iterations", type = int, default = 2000, help = "Times the server reads the body on each path, per round.")
+	parser.add_argument("--rounds", type = int, default = 3, help = "Requests to send; the last one is reported, after the JIT has warmed up.")
+	args = parser.parse_args()
+
+	versions = { name: 2 for name, _ in payloads.COMPONENTS }
+	body = payloads.render_update(uuid.uuid4().hex[:24], "Player19944066", versions)
+
+	result = None
+	for _ in range(max(args.rounds, 1)):
+		try:
+			result = run(args.host, args.admin_token, body, args.iterations)
+		except Exception as e:
+			sys.exit("Benchmark request failed: " + str(e))
+
+	print("update body: %d bytes, %d components, %d iterations" % (len(body), len(payloads.COMPONENTS), result["iterations"]))
+	print("%-12s %14s %12s %8s %10s" % ("path", "bytes/update", "us/update", "gen0", "bson bytes"))
+	baseline = result["rumbleJson"]
+	for name, key in [("rumblejson", "rumbleJson"), ("raw", "raw")]:
+		stats = result[key]
+		ratio = ""
+		if stats is not baseline:
+			ratio = "  (%.1fx fewer bytes, %.1fx faster)" % (
+				baseline["allocatedBytesPerUpdate"] / max(stats["allocatedBytesPerUpdate"], 1),
+				baseline["microsecondsPerUpdate"] / max(stats["microsecondsPerUpdate"], 0.001)
+			)
+		print("%-12s %14d %12.1f %8d %10d%s" % (name, stats["allocatedBytesPerUpdate"], stats["microsecondsPerUpdate"], stats["gen0Collections"], stats["bsonBytes"], ratio))
+
+if __name__ == "__main__":
+	main()
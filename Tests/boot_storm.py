@@ -0,0 +1,51 @@
+import random
+
+from locust import HttpUser, events, tag, task, between
+
+import server_metrics # Unused name; importing it registers the Server-Timing listeners.
+
+@events.init_command_line_parser.add_listener
+def on_parser_init(parser):
+	parser.add_argument("--client-versions", type = str, default = "1.14.0:55,1.13.2:25,1.13.0:10,1.12.4:6,1.10.0:3,0.0.0:1",
+		env_var = "LOCUST_CLIENT_VERSIONS", help = "Weighted client versions for BootStormUser, as version:weight pairs.")
+	parser.add_argument("--revalidate-ratio", type = float, default = 0.7, env_var = "LOCUST_REVALIDATE_RATIO",
+		help = "Fraction of BootStormUser boots that send the ETag from the previous boot.")
+
+def parse_versions(text):
+	pairs = [entry.strip().split(":") for entry in text.split(",") if entry.strip()]
+	return [version for version, _ in pairs], [float(weight) for _, weight in pairs]
+
+class BootStormUser(HttpUser):
+	"""
+	A wave of client boots hitting the unauthenticated /config endpoint.  Each boot picks a client version from
+	--client-versions; returning clients send the ETag they were given last time, so "/config [304]" shows how often
+	the server can skip the body entirely.
+	"""
+	weight = 1
+	wait_time = between(0, 0.2)
+
+	def on_start(self):
+		self.versions, self.weights = parse_versions(self.environment.parsed_options.client_versions)
+		self.etags = {}
+
+	@tag("boot")
+	@task(1)
+	def boot(self):
+		version = random.choices(self.versions, weights = self.weights)[0]
+		etag = self.etags.get(version)
+		headers = {}
+		if etag and random.random() < self.environment.parsed_options.revalidate_ratio:
+			headers["If-None-Match"] = etag
+		with self.client.get("/player/v2/config", name = "/config [304]" if headers else "/config [200]",
+			params = { "clientVersion": version }, headers = headers, catch_response = True) as response:
+			if response.status_code == 304:
+				response.success()
+				return
+			if not response.ok:
+				response.failure("Config failed (%d)" % response.status_code)
+				return
+			if headers:
+				# The config changed since the last boot; not a failure, but worth seeing in the stats.
+				events.request.fire(request_type = "GET", name = "/config [changed]", response_time = 0, response_length = 0,
+					exception = None, context = {})
+			self.etags[version] = response.headers.get("ETag")
@@ -0,0 +1,159 @@
+"""
+Bursts of /update autosaves from one account, the way the client saves after a battle and the menus that follow it:
+--burst-size saves sent --burst-gap-ms apart, without waiting for earlier ones to return.  Each save bumps every
+component's version by one, so a burst is a chain of versioned writes.
+
+Users alternate between coalescing on and off (--coalesce ab), or all use one setting.  When the test stops, each worker
+prints, per setting: requests, version conflicts and aborts, the transactions they took (from coalescedRequests in
+each response), and client p50 / p99 and coalesce wait.  With --admin-token, the server's coalescing counters for the
+run are printed as well.
+"""
+import itertools
+import time
+from collections import Counter, defaultdict
+
+import gevent
+from locust import HttpUser, events, tag, task, between
+
+import payloads
+from login import LoginSession
+from server_metrics import parse_header
+from storage_ab import fetch_stats
+
+SETTINGS = ["on", "off"]
+COUNTERS = ["coalescing.requests", "coalescing.batches", "coalescing.fallbacks"]
+
+@events.init_command_line_parser.add_listener
+def on_parser_init(parser):
+	parser.add_argument("--coalesce", type = str, default = "ab", choices = ["ab", "on", "off", "server"], env_var = "LOCUST_COALESCE",
+		help = "Whether BurstAutosaveUser asks /update to coalesce: alternate per user (ab), always, never, or leave it to the server's config.")
+	parser.add_argument("--burst-size", type = int, default = 5, env_var = "LOCUST_BURST_SIZE",
+		help = "Autosaves per burst.")
+	parser.add_argument("--burst-gap-ms", type = int, default = 100, env_var = "LOCUST_BURST_GAP_MS",
+		help = "Time between autosaves in a burst.")
+
+class BurstStats:
+	"""Results per coalescing setting, plus server counters from the start of the run."""
+	def __init__(self):
+		self.outcomes = defaultdict(Counter)
+		self.transactions = Counter()
+		self.times = defaultdict(list)
+		self.waits = defaultdict(list)
+		self.before = None
+
+	def add(self, setting, outcome, ms, response):
+		self.outcomes[setting][outcome] += 1
+		self.times[setting].append(ms)
+		if outcome != "ok":
+			return
+		durations, _ = parse_header(response.headers.get("Server-Timing"))
+		if "coalesce.wait" in durations:
+			self.waits[setting].append(durations["coalesce.wait"])
+		# A coalesced transaction is shared by every request in it.
+		try:
+			self.transactions[setting] += 1 / max(1, response.json().get("coalescedRequests") or 1)
+		except ValueError:
+			self.transactions[setting] += 1
+
+	def report(self, environment):
+		if not self.times:
+			return
+		print("Burst autosaves (%d saves, %d ms apart)" % (environment.parsed_options.burst_size, environment.parsed_options.burst_gap_ms))
+		print("  %-8s %8s %8s %8s %8s %12s %8s %8s %10s" % ("coalesce", "count", "ok", "stale", "aborted", "transactions", "p50", "p99", "wait p50"))
+		for setting in sorted(self.times):
+			outcomes = self.outcomes[setting]
+			times = sorted(self.times[setting])
+			waits = sorted(self.waits[setting])
+			print("  %-8s %8d %8d %8d %8d %12.0f %8d %8d %10s" % (setting, len(times), outcomes["ok"], outcomes["stale"], outcomes["aborted"],
+				self.transactions[setting], times[len(times) // 2], times[min(len(times) - 1, int(len(times) * 0.99))],
+				"%.0f" % waits[len(waits) // 2] if waits else "-"))
+
+		after = fetch_stats(environment)
+		if self.before is None or after is None:
+			return
+		requests, batches, fallbacks = (after.get(key, 0) - self.before.get(key, 0) for key in COUNTERS)
+		if requests:
+			print("  server: %d coalesced requests in %d transactions (%.1f per transaction), %d fell back to one at a time"
+				% (requests, batches, requests / max(batches, 1), fallbacks))
+
+stats = BurstStats()
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+	stats.__init__()
+	stats.before = fetch_stats(environment)
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+	stats.report(environment)
+
+settings = itertools.cycle(SETTINGS)
+
+class BurstAutosaveUser(HttpUser):
+	"""
+	Sends bursts of overlapping, versioned /update autosaves for its own account, then idles.  Compares coalescing on
+	and off by transactions per save and latency; a version conflict within a burst means saves were applied out of
+	order, and the user reads its versions back before the next burst.
+	"""
+	weight = 1
+	wait_time = between(1, 3)
+
+	def on_start(self):
+		self.session = LoginSession(self)
+		self.options = self.environment.parsed_options
+		self.setting = next(settings) if self.options.coalesce == "ab" else self.options.coalesce
+		self.versions = None
+
+	@property
+	def params(self):
+		return {} if self.setting == "server" else { "coalesce": "true" if self.setting == "on" else "false" }
+
+	def sync(self):
+		with self.client.get("/player/v2/read", name = "/read [burst sync]", catch_response = True) as response:
+			try:
+				self.versions = { component["name"]: component.get("version", 0) for component in response.json()["components"] }
+			except Exception as e:
+				response.failure("Read did not return components: " + str(e))
+				self.versions = None
+
+	def save(self, versions):
+		name = "/update [burst %s]" % self.setting
+		started = time.perf_counter()
+		with self.client.patch("/player/v2/update", name = name, params = self.params, headers = payloads.JSON_HEADERS,
+			data = payloads.render_update(self.session.accountId, self.session.screenname, versions), catch_response = True) as response:
+			if response.ok:
+				outcome = "ok"
+			elif response.status_code >= 500:
+				outcome = "aborted"
+			elif "version" in (response.text or "").lower():
+				outcome = "stale"
+			else:
+				outcome = "error"
+			if outcome != "ok":
+				response.failure("%s (%d)" % (outcome, response.status_code))
+			stats.add(self.setting, outcome, int((time.perf_counter() - started) * 1000), response)
+			return outcome == "ok"
+
+	@tag("autosave")
+	@task
+	def burst(self):
+		if not self.session.ensure_token():
+			return
+		if self.versions is None:
+			self.sync()
+			if self.versions is None:
+				return
+
+		size = max(1, self.options.burst_size)
+		saves = []
+		for i in range(1, size + 1):
+			versions = { name: self.versions.get(name, 0) + i for name, _ in payloads.COMPONENTS }
+			saves.append(gevent.spawn(self.save, versions))
+			if i < size:
+				gevent.sleep(self.options.burst_gap_ms / 1000)
+		gevent.joinall(saves)
+
+		if all(save.value for save in saves):
+			self.versions = { name: self.versions.get(name, 0) + size for name, _ in payloads.COMPONENTS }
+		else:
+			self.sync()
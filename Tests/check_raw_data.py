@@ -0,0 +1,133 @@
+"""
+Checks that /update writes the same BSON whether it reads component data through RumbleJson or straight into BSON
+(rawData), and that the raw path turns down '$' keys.  Logs in as a new device, writes the same data to the tutorial
+component both ways, sent as an escaped string the way clients send it and as an object, and compares the stored
+value types: Int32, Int64, and Double, nested documents and arrays included.  Then sends data with '$' keys, which the
+raw path has to reject with a 4xx instead of storing them or reading them as extended JSON.
+
+	python Tests/check_raw_data.py --host http://localhost:5000 --mongo mongodb://localhost:27017 --database player-service-107
+
+Needs pymongo (pip install pymongo) and a nonprod server, since it asks for the collections storage mode per request.
+"""
+import argparse
+import json
+import sys
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+try:
+	from bson import ObjectId
+	from bson.int64 import Int64
+	from pymongo import MongoClient
+except ImportError:
+	sys.exit("check_raw_data.py needs pymongo: pip install pymongo")
+
+LOGIN = "/player/v2/account/login"
+UPDATE = "/player/v2/update"
+COMPONENT = "tutorial"
+
+DATA = {
+	"small": 5,
+	"negative": -3,
+	"large": 5000000000,
+	"fraction": 1.5,
+	"whole": 2.0,
+	"exponent": 1e3,
+	"text": "5",
+	"flag": True,
+	"none": None,
+	"list": [1, 2.5, 3000000000, "x"],
+	"nested": { "n": 7, "deeper": { "f": 0.25 } }
+}
+OPERATORS = [
+	{ "count": { "$numberLong": "5" } },
+	{ "$set": { "a": 1 } },
+	{ "list": [{ "$oid": "5f0000000000000000000000" }] }
+]
+
+def call(host, method, path, body, token = None, params = None):
+	headers = { "Content-Type": "application/json" }
+	if token:
+		headers["Authorization"] = "Bearer " + token
+	url = host.rstrip("/") + path + ("?" + urllib.parse.urlencode(params) if params else "")
+	request = urllib.request.Request(url, data = json.dumps(body).encode("utf-8"), method = method, headers = headers)
+	try:
+		with urllib.request.urlopen(request, timeout = 30) as response:
+			return response.status, json.loads(response.read() or b"{}")
+	except urllib.error.HTTPError as e:
+		return e.code, None
+
+def signature(value):
+	"""The BSON type of every value, in the same shape as the data."""
+	if isinstance(value, dict):
+		return { key: signature(item) for key, item in value.items() }
+	if isinstance(value, list):
+		return [signature(item) for item in value]
+	if isinstance(value, Int64):
+		return "int64"
+	if isinstance(value, bool):
+		return "bool"
+	if isinstance(value, int):
+		return "int32"
+	if isinstance(value, float):
+		return "double"
+	return type(value).__name__
+
+def main():
+	parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--host", default = "http://localhost:5000", help = "Base URL of a nonprod player-service.")
+	parser.add_argument("--mongo", default = "mongodb://localhost:27017", help = "Connection string for the service's database server.")
+	parser.add_argument("--database", required = True, help = "The service's database.")
+	args = parser.parse_args()
+
+	_, login = call(args.host, "POST", LOGIN, { "deviceInfo": {
+		"installId": "raw-check-" + uuid.uuid4().hex,
+		"clientVersion": "1.14.0",
+		"dataVersion": "raw-check",
+		"language": "en-US",
+		"osVersion": "Android 14",
+		"type": "Pixel 8"
+	} })
+	player = login["player"]
+	stored = MongoClient(args.mongo)[args.database]["c_" + COMPONENT]
+
+	def write(data, raw):
+		return call(args.host, "PATCH", UPDATE, { "components": [{ "name": COMPONENT, "data": data, "version": 0 }] }, player["token"],
+			{ "rawData": "true" if raw else "false", "storage": "collections" })[0]
+
+	def read():
+		document = stored.find_one({ "aid": ObjectId(player["id"]) })
+		return signature((document or {}).get("data"))
+
+	failures = []
+	results = {}
+	for label, data, raw in [
+		("rumblejson", json.dumps(DATA), False),
+		("raw string", json.dumps(DATA), True),
+		("raw object", DATA, True)
+	]:
+		status = write(data, raw)
+		if status != 200:
+			failures.append("%s: /update returned %d" % (label, status))
+			continue
+		results[label] = read()
+
+	expected = results.get("rumblejson")
+	for label, types in results.items():
+		if types != expected:
+			failures.append("%s stored %s; rumblejson stored %s" % (label, json.dumps(types), json.dumps(expected)))
+
+	for data in OPERATORS:
+		for sent in [json.dumps(data), data]:
+			status = write(sent, raw = True)
+			if not 400 <= status < 500:
+				failures.append("raw data %s returned %d" % (json.dumps(sent), status))
+
+	if failures:
+		sys.exit("FAIL:\n  " + "\n  ".join(failures))
+	print("ok: raw data stored the same types as rumblejson, and %d '$' payloads were rejected" % (len(OPERATORS) * 2))
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,89 @@
+"""
+Checks that /update still writes its new items when the transaction is retried.  Logs in as a new device, arms a
+failCommand fail point that fails the next insert with TransientTransactionError, sends an /update with newItems, and
+then checks that the response reported a retry and that every item in its itemMap is in the database.
+
+	python Tests/check_update_retry.py --host http://localhost:5000 --mongo mongodb://localhost:27017 --database player-service-107
+
+Needs pymongo (pip install pymongo) and a local mongod started with --setParameter enableTestCommands=1.  Don't point
+it at a shared server; the fail point affects every client's next insert.
+"""
+import argparse
+import json
+import sys
+import urllib.request
+import uuid
+
+try:
+	from bson import ObjectId
+	from pymongo import MongoClient
+except ImportError:
+	sys.exit("check_update_retry.py needs pymongo: pip install pymongo")
+
+from server_metrics import parse_header
+
+LOGIN = "/player/v2/account/login"
+UPDATE = "/player/v2/update"
+ITEMS = 3
+
+def call(host, method, path, body, token = None):
+	headers = { "Content-Type": "application/json" }
+	if token:
+		headers["Authorization"] = "Bearer " + token
+	request = urllib.request.Request(host.rstrip("/") + path, data = json.dumps(body).encode("utf-8"), method = method, headers = headers)
+	with urllib.request.urlopen(request, timeout = 30) as response:
+		return json.loads(response.read()), response.headers.get("Server-Timing")
+
+def main():
+	parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--host", default = "http://localhost:5000", help = "Base URL of a local player-service.")
+	parser.add_argument("--mongo", default = "mongodb://localhost:27017", help = "Connection string for the service's database server.")
+	parser.add_argument("--database", required = True, help = "The service's database.")
+	args = parser.parse_args()
+
+	login, _ = call(args.host, "POST", LOGIN, { "deviceInfo": {
+		"installId": "retry-check-" + uuid.uuid4().hex,
+		"clientVersion": "1.14.0",
+		"dataVersion": "retry-check",
+		"language": "en-US",
+		"osVersion": "Android 14",
+		"type": "Pixel 8"
+	} })
+	player = login["player"]
+
+	client = MongoClient(args.mongo)
+	client.admin.command("configureFailPoint", "failCommand", mode = { "times": 1 }, data = {
+		"failCommands": ["insert"],
+		"errorCode": 112,
+		"errorLabels": ["TransientTransactionError"]
+	})
+	try:
+		item_ids = ["retry-check-%d" % i for i in range(ITEMS)]
+		body, timing = call(args.host, "PATCH", UPDATE, {
+			"components": [],
+			"newItems": [{ "iid": item_id, "type": "check", "data": { "n": i } } for i, item_id in enumerate(item_ids)]
+		}, player["token"])
+	finally:
+		client.admin.command("configureFailPoint", "failCommand", mode = "off")
+
+	_, counts = parse_header(timing)
+	mapped = [entry.get("id") for entry in body.get("itemMap", [])]
+	stored = client[args.database].items.count_documents({
+		"aid": ObjectId(player["id"]),
+		"_id": { "$in": [ObjectId(id) for id in mapped if id] }
+	})
+
+	failures = []
+	if counts.get("retries", 0) < 1:
+		failures.append("the fail point didn't cause a retry (retries = %d)" % counts.get("retries", 0))
+	if len(mapped) != ITEMS or not all(mapped):
+		failures.append("itemMap has %d of %d IDs" % (len([id for id in mapped if id]), ITEMS))
+	if stored != ITEMS:
+		failures.append("%d of %d new items were written" % (stored, ITEMS))
+
+	if failures:
+		sys.exit("FAIL: " + "; ".join(failures))
+	print("ok: %d new items written after %d retry" % (stored, counts["retries"]))
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,66 @@
+import random
+
+from locust import HttpUser, task, between, tag
+
+import payloads
+import server_metrics # Unused name; importing it registers the Server-Timing listeners.
+from login import LoginSession
+
+class VersionedUpdateUser(HttpUser):
+	"""
+	Autosaves with correctly incrementing component versions, so every /update takes the server's version-checked
+	write path.  Compare "/update [versioned]" with PlayerServiceUser's "/update", which sends version 0 and skips the
+	check entirely.
+	"""
+	weight = 1
+
+	def on_start(self):
+		self.session = LoginSession(self)
+		self.versions = {}
+
+	def sync_versions(self):
+		names = ",".join(name for name, _ in payloads.COMPONENTS)
+		with self.client.get("/player/v2/read", name = "/read [versions]", params = { "names": names }, catch_response = True) as response:
+			try:
+				self.versions = { component["name"]: component.get("version", 0) for component in response.json()["components"] }
+			except Exception as e:
+				response.failure("Read did not return components: " + str(e))
+				return False
+		return True
+
+	@tag("versioned")
+	@task(1)
+	def update(self):
+		if not self.session.ensure_token():
+			return
+		if not self.versions and not self.sync_versions():
+			return
+		versions = { name: version + 1 for name, version in self.versions.items() }
+		with self.client.patch("/player/v2/update", name = "/update [versioned]", headers = payloads.JSON_HEADERS,
+			data = payloads.render_update(self.session.accountId, self.session.screenname, versions),
+			catch_response = True) as response:
+			if response.ok:
+				self.versions = versions
+				return
+			response.failure("Versioned update rejected (%d)" % response.status_code)
+		self.versions = {}
+
+class ReadUser(HttpUser):
+	"""
+	/read with a different set of components each time, from a single component up to all of them.  Requests are
+	named by how many components were asked for, so the cost of each additional component is visible.
+	"""
+	weight = 1
+	wait_time = between(0.5, 2)
+
+	def on_start(self):
+		self.session = LoginSession(self)
+		self.names = [name for name, _ in payloads.COMPONENTS]
+
+	@tag("read")
+	@task(1)
+	def read(self):
+		if not self.session.ensure_token():
+			return
+		names = random.sample(self.names, random.randint(1, len(self.names)))
+		self.client.get("/player/v2/read", name = "/read [%d]" % len(names), params = { "names": ",".join(names) })
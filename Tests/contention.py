@@ -0,0 +1,104 @@
+import gevent
+import requests
+from locust import HttpUser, task, events, tag
+from locust.runners import MasterRunner
+
+import payloads
+from login import LoginSession
+import server_metrics # Unused name; importing it registers the Server-Timing listeners.
+
+NAME = "/update [contention]"
+GC = "/player/v2/admin/gc"
+SAMPLE_SECONDS = 1
+
+class PoolStats:
+	"""
+	Thread pool snapshots sampled from /admin/gc while the test runs, and totalMS from /update responses, summarized per
+	worker when the test stops.
+	"""
+	def __init__(self):
+		self.samples = 0
+		self.max_threads = 0
+		self.max_pending = 0
+		self.total_pending = 0
+		self.server_ms = []
+
+	def add(self, body):
+		if body.get("totalMS") is not None:
+			self.server_ms.append(body["totalMS"])
+
+	def sample(self, pool):
+		self.samples += 1
+		self.max_threads = max(self.max_threads, pool.get("threadCount", 0))
+		self.max_pending = max(self.max_pending, pool.get("pendingWorkItems", 0))
+		self.total_pending += pool.get("pendingWorkItems", 0)
+
+	def report(self, environment):
+		entry = environment.stats.get(NAME, "PATCH")
+		if not entry.num_requests:
+			return
+		print("%s: %d requests, %d failures" % (NAME, entry.num_requests, entry.num_failures))
+		print("  client p50 / p99:      %d / %d ms" % (entry.get_response_time_percentile(0.5), entry.get_response_time_percentile(0.99)))
+		if self.server_ms:
+			ordered = sorted(self.server_ms)
+			print("  server totalMS p99:    %d ms" % ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))])
+		if self.samples:
+			print("  thread pool threads:   %d max" % self.max_threads)
+			print("  pending work items:    %d max, %.1f avg" % (self.max_pending, self.total_pending / self.samples))
+		else:
+			print("  no thread pool samples; pass --admin-token to read them from /admin/gc.")
+
+pool_stats = PoolStats()
+sampler = None
+
+def sample_pool(environment):
+	options = environment.parsed_options
+	while True:
+		try:
+			response = requests.get(environment.host.rstrip("/") + GC, headers = { "Authorization": "Bearer " + options.admin_token }, timeout = 10)
+			response.raise_for_status()
+			pool_stats.sample(response.json()["threadPool"])
+		except Exception as e:
+			print("Unable to read thread pool stats: " + str(e))
+		gevent.sleep(SAMPLE_SECONDS)
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+	global sampler
+	pool_stats.__init__()
+	if environment.parsed_options.admin_token and not isinstance(environment.runner, MasterRunner):
+		sampler = gevent.spawn(sample_pool, environment)
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+	global sampler
+	if sampler:
+		sampler.kill()
+		sampler = None
+	pool_stats.report(environment)
+
+class ContentionUser(HttpUser):
+	"""
+	Sends the large /nuke body (10 components, ~60 items) with no think time, so many transactions are in flight at
+	once.  Run it against a build before and after a change to compare p99 and thread pool growth.
+	"""
+	weight = 1
+
+	def on_start(self):
+		self.session = LoginSession(self)
+
+	@tag("contention")
+	@task
+	def update(self):
+		if not self.session.ensure_token():
+			return
+		with self.client.patch("/player/v2/update", name = NAME, headers = payloads.JSON_HEADERS,
+			data = payloads.render_nuke(self.session.accountId, self.session.screenname),
+			catch_response = True) as response:
+			if not response.ok:
+				response.failure("Update failed (%d)" % response.status_code)
+				return
+			try:
+				pool_stats.add(response.json())
+			except ValueError as e:
+				response.failure("Update returned invalid JSON: " + str(e))
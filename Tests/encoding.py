@@ -0,0 +1,143 @@
+"""
+Switches how the harness talks to the service with --encoding: plain JSON, JSON compressed with gzip or br, or
+MessagePack (optionally compressed).  The encoding is applied by a transport adapter on each user's client, so every
+scenario that logs in through LoginSession uses it without changes; bodies are still built as JSON and responses are
+handed back as JSON.  Only /update, /read, and /items are affected, matching the routes the server encodes.
+
+When the test stops, each worker prints bytes on the wire per path, next to the uncompressed JSON size.  With
+--admin-token, the run also reads the server's CPU time from /admin/gc before and after, for CPU per request.
+"""
+import gzip
+import json
+
+import requests
+from locust import events
+from requests.adapters import HTTPAdapter
+
+try:
+	import msgpack
+except ImportError:
+	msgpack = None
+try:
+	import brotli
+except ImportError:
+	brotli = None
+
+ENCODINGS = ["json", "json+gzip", "json+br", "msgpack", "msgpack+gzip", "msgpack+br"]
+MESSAGE_PACK = "application/x-msgpack"
+ROUTES = ("/player/v2/update", "/player/v2/read", "/player/v2/items")
+GC = "/player/v2/admin/gc"
+
+# Path -> [requests, bytes sent, bytes received, JSON bytes sent, JSON bytes received]
+wire = {}
+cpu_before = None
+
+@events.init_command_line_parser.add_listener
+def on_parser_init(parser):
+	parser.add_argument("--encoding", type = str, default = "json", choices = ENCODINGS, env_var = "LOCUST_ENCODING",
+		help = "Body format and compression for /update, /read, and /items.  msgpack needs the msgpack package; br needs brotli.")
+
+@events.init.add_listener
+def on_locust_init(environment, **kwargs):
+	options = environment.parsed_options
+	if options is None:
+		return
+	body, _, compression = options.encoding.partition("+")
+	if body == "msgpack" and msgpack is None:
+		raise SystemExit("--encoding %s needs msgpack: pip install msgpack" % options.encoding)
+	if compression == "br" and brotli is None:
+		raise SystemExit("--encoding %s needs brotli: pip install brotli" % options.encoding)
+
+def server_cpu(environment):
+	options = environment.parsed_options
+	if not getattr(options, "admin_token", ""):
+		return None
+	try:
+		response = requests.get(environment.host.rstrip("/") + GC, headers = { "Authorization": "Bearer " + options.admin_token }, timeout = 10)
+		response.raise_for_status()
+		return response.json()["processorTimeMs"]
+	except Exception as e:
+		print("Unable to read server CPU time: " + str(e))
+		return None
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+	global cpu_before
+	wire.clear()
+	cpu_before = server_cpu(environment)
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+	if not wire:
+		return
+	print("Bytes on the wire (%s)" % environment.parsed_options.encoding)
+	print("  %-28s %8s %10s %10s %10s %10s" % ("path", "count", "sent", "as JSON", "received", "as JSON"))
+	for name in sorted(wire):
+		count, sent, received, json_sent, json_received = wire[name]
+		print("  %-28s %8d %10.0f %10.0f %10.0f %10.0f" % (name, count, sent / count, json_sent / count, received / count, json_received / count))
+
+	cpu_after = server_cpu(environment)
+	if cpu_before is None or cpu_after is None:
+		return
+	total = sum(entry[0] for entry in wire.values())
+	print("  server CPU %d ms, %.2f ms per encoded request (whole pod; run one encoding at a time)" % (cpu_after - cpu_before, (cpu_after - cpu_before) / total))
+
+def compress(data, compression):
+	return gzip.compress(data, compresslevel = 1) if compression == "gzip" else brotli.compress(data, quality = 1)
+
+class EncodingAdapter(HTTPAdapter):
+	"""Encodes request bodies and decodes responses on the wire, so callers only ever see JSON."""
+	def __init__(self, encoding):
+		super().__init__()
+		self.body, _, self.compression = encoding.partition("+")
+
+	def send(self, request, **kwargs):
+		path = request.path_url.split("?")[0]
+		if not path.startswith(ROUTES):
+			return super().send(request, **kwargs)
+
+		body = request.body or b""
+		if isinstance(body, str):
+			body = body.encode("utf-8")
+		json_sent = len(body)
+		if body and self.body == "msgpack":
+			body = msgpack.packb(json.loads(body))
+			request.headers["Content-Type"] = MESSAGE_PACK
+		if body and self.compression:
+			body = compress(body, self.compression)
+			request.headers["Content-Encoding"] = self.compression
+		if body:
+			request.body = body
+			request.headers["Content-Length"] = str(len(body))
+		if self.body == "msgpack":
+			request.headers["Accept"] = MESSAGE_PACK
+		request.headers["Accept-Encoding"] = self.compression or "identity"
+
+		response = super().send(request, **kwargs)
+		content = response.content
+		# tell() counts what came over the socket, before urllib3 decompressed it.
+		received = response.raw.tell() or len(content)
+		if response.headers.get("Content-Type", "").startswith(MESSAGE_PACK):
+			content = json.dumps(msgpack.unpackb(content), separators = (",", ":")).encode("utf-8")
+			response._content = content
+			response.headers["Content-Type"] = "application/json"
+
+		entry = wire.setdefault(path, [0, 0, 0, 0, 0])
+		entry[0] += 1
+		entry[1] += len(body)
+		entry[2] += received
+		entry[3] += json_sent
+		entry[4] += len(content)
+		return response
+
+def apply(client, options):
+	"""
+	Mounts the adapter for --encoding on a user's client.  Plain JSON gets it too, so the baseline is counted the same
+	way and doesn't pick up the compression requests asks for by default.
+	"""
+	if getattr(client, "encoding_applied", False):
+		return
+	adapter = EncodingAdapter(getattr(options, "encoding", "json"))
+	client.mount("http://", adapter)
+	client.mount("https://", adapter)
+	client.encoding_applied = True
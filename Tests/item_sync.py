@@ -0,0 +1,138 @@
+import json
+import random
+import time
+
+from locust import HttpUser, events, tag, task, between
+
+import payloads
+from login import LoginSession
+from profiles import ProfileGenerator
+import server_metrics # Unused name; importing it registers the Server-Timing listeners.
+
+@events.init_command_line_parser.add_listener
+def on_parser_init(parser):
+	parser.add_argument("--sync-items", type = int, default = 500, env_var = "LOCUST_SYNC_ITEMS",
+		help = "Items each ItemSyncUser account starts with.")
+	parser.add_argument("--sync-changes", type = int, default = 10, env_var = "LOCUST_SYNC_CHANGES",
+		help = "Items an ItemSyncUser changes between syncs; roughly one in ten of those is a deletion.")
+	parser.add_argument("--sync-page", type = int, default = 500, env_var = "LOCUST_SYNC_PAGE",
+		help = "Page size for incremental /items syncs.")
+
+class SyncStats:
+	"""Bytes received, requests, and wall time per sync mode, kept per worker and printed when the test stops."""
+	def __init__(self):
+		self.rows = {}
+
+	def add(self, mode, requests, received, elapsed):
+		row = self.rows.setdefault(mode, [0, 0, 0, 0.0])
+		row[0] += 1
+		row[1] += requests
+		row[2] += received
+		row[3] += elapsed
+
+	def report(self):
+		if not self.rows:
+			return
+		print("%-12s %8s %14s %14s %12s" % ("sync", "count", "avg requests", "avg recv (B)", "avg ms"))
+		for mode, (count, requests, received, elapsed) in sorted(self.rows.items()):
+			print("%-12s %8d %14.1f %14.0f %12.1f" % (mode, count, requests / count, received / count, elapsed / count))
+
+sync_stats = SyncStats()
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+	sync_stats.report()
+
+class ItemSyncUser(HttpUser):
+	"""
+	Compares full and incremental /items syncs on the same account.  Each iteration changes --sync-changes items
+	through /update, then syncs both ways: "/items [full]" downloads everything, "/items [incremental]" pages through
+	the changes since the last cursor.  Both must agree on which items exist.
+	"""
+	weight = 1
+	wait_time = between(1, 3)
+	count = 0
+
+	def on_start(self):
+		ItemSyncUser.count += 1
+		options = self.environment.parsed_options
+		self.generator = ProfileGenerator(options.profile_seed + ItemSyncUser.count)
+		self.session = LoginSession(self)
+		self.session.login(self.session.new_device(), False)
+		self.known = {}
+		self.cursor = None
+
+		body = self.generator.update_body(self.session.accountId, self.session.screenname, options.sync_items)
+		self.client.patch("/player/v2/update", name = "/update [seed]", headers = payloads.JSON_HEADERS, data = json.dumps(body))
+		self.full_sync()
+		self.incremental_sync()
+
+	@tag("itemsync")
+	@task(1)
+	def play(self):
+		if not self.session.ensure_token():
+			return
+		self.change_items()
+		expected = self.full_sync()
+		self.incremental_sync()
+		if expected is not None and set(self.known) != expected:
+			events.request.fire(request_type = "GET", name = "/items [incremental]", response_time = 0, response_length = 0,
+				exception = Exception("Incremental sync disagrees with full sync (%d vs %d items)" % (len(self.known), len(expected))),
+				context = {})
+			self.known = { iid: self.known.get(iid) for iid in expected }
+
+	def change_items(self):
+		options = self.environment.parsed_options
+		if not self.known:
+			return
+		chosen = random.sample(list(self.known), min(len(self.known), options.sync_changes))
+		deleted = [iid for iid in chosen if random.random() < 0.1 and self.known[iid].get("id")]
+		updated = [iid for iid in chosen if iid not in deleted]
+		changes = []
+		for iid in updated:
+			kind = self.known[iid]["type"]
+			_, data = self.generator.item(kind, random.randrange(100_000))
+			changes.append({ "id": self.known[iid].get("id"), "aid": self.session.accountId, "iid": iid, "type": kind, "data": data })
+		body = {
+			"components": [],
+			"updatedItems": [change for change in changes if change["id"]],
+			"deletedItems": [{ "id": self.known[iid]["id"] } for iid in deleted]
+		}
+		self.client.patch("/player/v2/update", name = "/update [items]", headers = payloads.JSON_HEADERS, data = json.dumps(body))
+
+	def full_sync(self):
+		started = time.perf_counter()
+		with self.client.get("/player/v2/items", name = "/items [full]", catch_response = True) as response:
+			try:
+				items = response.json()["items"]
+			except Exception as e:
+				response.failure("Items did not return a list: " + str(e))
+				return None
+		sync_stats.add("full", 1, len(response.content or b""), (time.perf_counter() - started) * 1000)
+		return { item["iid"] for item in items }
+
+	def incremental_sync(self):
+		options = self.environment.parsed_options
+		started = time.perf_counter()
+		requests = 0
+		received = 0
+		more = True
+		while more:
+			requests += 1
+			with self.client.get("/player/v2/items", name = "/items [incremental]", params = { "since": self.cursor or "0", "limit": options.sync_page },
+				catch_response = True) as response:
+				try:
+					body = response.json()
+				except Exception as e:
+					response.failure("Items did not return changes: " + str(e))
+					return
+				received += len(response.content or b"")
+				if body.get("fullSync"):
+					self.known = {}
+				for item in body.get("items", []):
+					self.known[item["iid"]] = { "id": item.get("id"), "type": item.get("type") }
+				for tombstone in body.get("deleted", []):
+					self.known.pop(tombstone["iid"], None)
+				self.cursor = body.get("cursor")
+				more = body.get("more", False)
+		sync_stats.add("incremental", requests, received, (time.perf_counter() - started) * 1000)
@@ -0,0 +1,230 @@
+import json
+import math
+import os
+import random
+
+from locust import HttpUser, SequentialTaskSet, task, events, tag
+
+import payloads
+from login import LoginSession
+import server_metrics # Unused name; importing it registers the Server-Timing listeners.
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "journey.json")
+
+# Account IDs seen by any journey in this process; /lookup draws from these so it returns real players.
+known_accounts = []
+
+@events.init_command_line_parser.add_listener
+def on_parser_init(parser):
+	parser.add_argument("--journey-config", type = str, default = DEFAULT_CONFIG, env_var = "LOCUST_JOURNEY_CONFIG",
+		help = "JSON file with the endpoint mix and think-time distributions for JourneyUser.")
+	parser.add_argument("--think-scale", type = float, default = 1.0, env_var = "LOCUST_THINK_SCALE",
+		help = "Multiplier applied to every JourneyUser think time.  0 removes think time entirely.")
+	parser.add_argument("--update-mode", type = str, default = "patch", choices = ["patch", "full"], env_var = "LOCUST_UPDATE_MODE",
+		help = "Whether JourneyUser autosaves send patch operations or whole components.")
+
+# Request name -> [requests, request bytes], for the bandwidth comparison printed when the test stops.
+update_bytes = {}
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+	update_bytes.clear()
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+	if not update_bytes:
+		return
+	print("Autosave request sizes")
+	for name in sorted(update_bytes):
+		count, size = update_bytes[name]
+		print("  %-24s %8d requests %10.0f bytes avg" % (name, count, size / count))
+
+def sample(spec, default = 0):
+	"""
+	Draws a value from a distribution in the journey config:
+		{ "distribution": "constant", "value": 5 }
+		{ "distribution": "uniform", "min": 1, "max": 3 }
+		{ "distribution": "lognormal", "median": 15, "sigma": 0.6 }
+		{ "distribution": "exponential", "mean": 6 }
+	"""
+	if not spec:
+		return default
+	kind = spec.get("distribution", "constant")
+	if kind == "uniform":
+		return random.uniform(spec["min"], spec["max"])
+	if kind == "lognormal":
+		return random.lognormvariate(math.log(spec["median"]), spec.get("sigma", 0.5))
+	if kind == "exponential":
+		return random.expovariate(1 / spec["mean"])
+	return spec.get("value", default)
+
+class JourneyConfig:
+	def __init__(self, path):
+		with open(path) as file:
+			data = json.load(file)
+		self.session_length = data.get("sessionLength")
+		self.read_names = data.get("readNames", [name for name, _ in payloads.COMPONENTS])
+		self.read_subsets = data.get("readSubsets", [])
+		self.lookup_batch = data.get("lookupBatch")
+		self.boot = data.get("boot", {})
+		self.between_sessions = data.get("betweenSessions")
+		actions = data["actions"]
+		self.actions = list(actions.keys())
+		self.weights = [actions[name].get("weight", 0) for name in self.actions]
+		self.think = { name: actions[name].get("think") for name in self.actions }
+
+	def next_action(self):
+		return random.choices(self.actions, weights = self.weights)[0]
+
+_configs = {}
+
+def load_config(path):
+	if path not in _configs:
+		_configs[path] = JourneyConfig(path)
+	return _configs[path]
+
+@tag("journey")
+class Journey(SequentialTaskSet):
+	"""
+	One play session: log in, fetch /config, /read every component, /items, then a run of weighted actions (mostly
+	autosaves) with think time between them.  When the run ends the session closes and the next iteration logs in
+	again as a returning player.  Component versions are read from the server and incremented on every /update, so
+	the server's version check is exercised the same way the client does.
+	"""
+	# When set, sent as the nonprod "storage" override on component endpoints and appended to their request names.
+	storage = None
+
+	def on_start(self):
+		self.options = self.user.environment.parsed_options
+		self.config = load_config(self.options.journey_config)
+		self.session = LoginSession(self.user)
+		self.device = None
+		self.versions = {}
+		self.saved = False
+		self.pause = None
+
+	def wait_time(self):
+		think, self.pause = self.pause, None
+		return think * self.options.think_scale if think else 0
+
+	def think(self, spec):
+		self.pause = sample(spec)
+
+	def label(self, name):
+		return name + " <" + self.storage + ">" if self.storage else name
+
+	def query(self, params = None):
+		params = dict(params or {})
+		if self.storage:
+			params["storage"] = self.storage
+		return params
+
+	@task
+	def login(self):
+		returning = self.device is not None
+		if not self.session.login(self.device or self.session.new_device(), returning):
+			self.think(self.config.boot.get("login"))
+			self.interrupt()
+		self.device = self.session.device
+		if self.session.accountId not in known_accounts:
+			known_accounts.append(self.session.accountId)
+		self.think(self.config.boot.get("login"))
+
+	@task
+	def boot_config(self):
+		self.config_call()
+		self.think(self.config.boot.get("config"))
+
+	@task
+	def boot_read(self):
+		self.read(self.config.read_names, "/read [boot]")
+		self.think(self.config.boot.get("read"))
+
+	@task
+	def boot_items(self):
+		self.items()
+		self.think(self.config.boot.get("items"))
+
+	@task
+	def play(self):
+		remaining = max(1, int(sample(self.config.session_length, 1)))
+		for _ in range(remaining):
+			if not self.session.ensure_token():
+				break
+			action = self.config.next_action()
+			getattr(self, "do_" + action)()
+			self.think(self.config.think.get(action))
+			self.wait()
+		self.think(self.config.between_sessions)
+
+	def do_update(self):
+		# A new account's components don't exist until its first full save, so patching starts after that.
+		if self.options.update_mode == "patch" and self.saved:
+			patches = payloads.random_patches()
+			versions = dict(self.versions, **{ name: self.versions.get(name, 0) + 1 for name in patches })
+			name = self.label("/update [patch]")
+			body = payloads.render_patch(self.session.screenname, patches, versions)
+		else:
+			versions = { name: self.versions.get(name, 0) + 1 for name, _ in payloads.COMPONENTS }
+			name = self.label("/update")
+			body = payloads.render_update(self.session.accountId, self.session.screenname, versions)
+
+		count, size = update_bytes.get(name, (0, 0))
+		update_bytes[name] = (count + 1, size + len(body))
+		with self.client.patch("/player/v2/update", name = name, headers = payloads.JSON_HEADERS,
+			params = self.query(), data = body, catch_response = True) as response:
+			if response.ok:
+				self.versions = versions
+				self.saved = True
+				return
+			response.failure("Update rejected (%d); resyncing component versions." % response.status_code)
+		self.read(self.config.read_names, "/read [resync]")
+
+	def do_read(self):
+		names = random.choice(self.config.read_subsets) if self.config.read_subsets else self.config.read_names
+		self.read(names, "/read")
+
+	def do_items(self):
+		self.items()
+
+	def do_config(self):
+		self.config_call()
+
+	def do_lookup(self):
+		if not known_accounts:
+			return
+		count = min(len(known_accounts), max(1, int(sample(self.config.lookup_batch, 1))))
+		ids = random.sample(known_accounts, count)
+		self.client.get("/player/v2/lookup", name = "/lookup", params = { "accountIds": ",".join(ids) })
+
+	def do_screenname(self):
+		with self.client.patch("/player/v2/screenname", name = "/screenname", json = {
+			"screenname": "Locust%04d" % random.randrange(10_000)
+		}, catch_response = True) as response:
+			try:
+				body = response.json()
+				self.session.screenname = body["player"]["screenname"]
+				token = body.get("accessToken")
+				if token:
+					self.session.accept(dict(body["player"], token = token))
+			except Exception as e:
+				response.failure("Screenname change did not return a player: " + str(e))
+
+	def config_call(self):
+		self.client.get("/player/v2/config", name = "/config", params = { "clientVersion": self.options.client_version })
+
+	def items(self):
+		self.client.get("/player/v2/items", name = "/items")
+
+	def read(self, names, label):
+		with self.client.get("/player/v2/read", name = self.label(label), params = self.query({ "names": ",".join(names) }), catch_response = True) as response:
+			try:
+				for component in response.json()["components"]:
+					self.versions[component["name"]] = component.get("version", 0)
+			except Exception as e:
+				response.failure("Read did not return components: " + str(e))
+
+class JourneyUser(HttpUser):
+	"""Full client sessions with the production endpoint mix from --journey-config.  Think time comes from the Journey."""
+	weight = 1
+	tasks = [Journey]
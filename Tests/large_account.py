@@ -0,0 +1,102 @@
+import json
+
+import requests
+from locust import HttpUser, events, tag, task, between
+
+import payloads
+from login import LoginSession
+from profiles import ProfileGenerator
+import server_metrics # Unused name; importing it registers the Server-Timing listeners.
+
+GC = "/player/v2/admin/gc"
+CHUNK = 1000
+
+@events.init_command_line_parser.add_listener
+def on_parser_init(parser):
+	parser.add_argument("--large-items", type = int, default = 5000, env_var = "LOCUST_LARGE_ITEMS",
+		help = "Items each LargeAccountUser account is seeded with.")
+	parser.add_argument("--stream-mode", type = str, default = "stream", choices = ["stream", "buffered"], env_var = "LOCUST_STREAM_MODE",
+		help = "Whether LargeAccountUser asks for streamed or buffered /items and /read responses.")
+
+def fetch_gc(environment):
+	options = environment.parsed_options
+	if not options.admin_token:
+		return None
+	try:
+		response = requests.get(environment.host.rstrip("/") + GC, headers = { "Authorization": "Bearer " + options.admin_token }, timeout = 10)
+		response.raise_for_status()
+		return response.json()
+	except Exception as e:
+		print("Unable to read GC stats: " + str(e))
+		return None
+
+class GcReport:
+	"""Server allocation counters from the start of the run; the difference is what the run cost.  Requires --admin-token."""
+	def __init__(self):
+		self.before = None
+
+	def start(self, environment):
+		self.before = fetch_gc(environment)
+
+	def report(self, environment):
+		after = fetch_gc(environment)
+		if self.before is None or after is None:
+			return
+		mode = environment.parsed_options.stream_mode
+		requests = sum(environment.stats.get("%s [%s]" % (endpoint, mode), "GET").num_requests for endpoint in ["/items", "/read"])
+		allocated = after["allocatedBytes"] - self.before["allocatedBytes"]
+		print("Server allocations (%s)" % mode)
+		print("  allocated %14d B   per request %12.0f B" % (allocated, allocated / requests if requests else 0))
+		print("  collections   gen0 %6d   gen1 %6d   gen2 %6d" % (
+			after["gen0Collections"] - self.before["gen0Collections"],
+			after["gen1Collections"] - self.before["gen1Collections"],
+			after["gen2Collections"] - self.before["gen2Collections"]))
+		print("  LOH %14d B   heap %14d B   GC pause %.2f%%" % (after["largeObjectHeapBytes"], after["heapBytes"], after["pauseTimePercentage"]))
+
+report = GcReport()
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+	report.start(environment)
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+	report.report(environment)
+
+class LargeAccountUser(HttpUser):
+	"""
+	Full /items and /read downloads for accounts with thousands of items, either streamed or buffered depending on
+	--stream-mode.  Run once per mode against the same pod; with --admin-token, each run prints the server's
+	allocations per request and the garbage collections it caused.
+	"""
+	weight = 1
+	wait_time = between(0.5, 1.5)
+	count = 0
+
+	def on_start(self):
+		LargeAccountUser.count += 1
+		options = self.environment.parsed_options
+		self.mode = options.stream_mode
+		self.names = ",".join(name for name, _ in payloads.COMPONENTS)
+		self.session = LoginSession(self)
+		self.session.login(self.session.new_device(), False)
+
+		generator = ProfileGenerator(options.profile_seed + LargeAccountUser.count)
+		body = generator.update_body(self.session.accountId, self.session.screenname, options.large_items)
+		items = body.pop("items")
+		for start in range(0, len(items), CHUNK):
+			body["items"] = items[start:start + CHUNK]
+			self.client.patch("/player/v2/update", name = "/update [seed]", headers = payloads.JSON_HEADERS, data = json.dumps(body))
+			body["components"] = []
+
+	@tag("large")
+	@task(3)
+	def items(self):
+		if self.session.ensure_token():
+			self.client.get("/player/v2/items", name = "/items [%s]" % self.mode, params = { "stream": str(self.mode == "stream").lower() })
+
+	@tag("large")
+	@task(1)
+	def read(self):
+		if self.session.ensure_token():
+			self.client.get("/player/v2/read", name = "/read [%s]" % self.mode, params = { "names": self.names, "stream": str(self.mode == "stream").lower() })
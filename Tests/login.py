@@ -0,0 +1,210 @@
+import json
+import random
+import time
+import urllib.request
+import uuid
+
+from locust import HttpUser, task, events, between, tag
+
+import encoding
+import server_metrics # Unused name; importing it registers the Server-Timing listeners.
+
+LOGIN = "/player/v2/account/login"
+REFRESH = "/player/v2/account/refresh"
+
+# Devices that have completed at least one login in this process.  Returning logins draw from this pool so that
+# FromDevice() takes the update path instead of the insert path.
+known_devices = []
+
+@events.init_command_line_parser.add_listener
+def on_parser_init(parser):
+	parser.add_argument("--returning-ratio", type = float, default = 0.8, env_var = "LOCUST_RETURNING_RATIO",
+		help = "Fraction of logins that reuse a device which has already logged in (0-1).")
+	parser.add_argument("--token-lifetime", type = float, default = 300, env_var = "LOCUST_TOKEN_LIFETIME",
+		help = "Seconds after which a simulated user treats its token as expired and calls /account/refresh.")
+	parser.add_argument("--device-pool", type = int, default = 10000, env_var = "LOCUST_DEVICE_POOL",
+		help = "Maximum number of known devices kept for returning logins.")
+	parser.add_argument("--client-version", type = str, default = "1.14.0", env_var = "LOCUST_CLIENT_VERSION",
+		help = "clientVersion reported in deviceInfo.")
+	parser.add_argument("--token-stub", type = str, default = "", env_var = "LOCUST_TOKEN_STUB",
+		help = "URL of Tests/token_stub.py; prints token-service calls per login and refresh when the test stops.")
+	parser.add_argument("--admin-token", type = str, default = "", env_var = "LOCUST_ADMIN_TOKEN",
+		help = "Admin token for the server-side stats scenarios read before and after a run.  Without it, only latency is reported.")
+
+token_stub_start = None
+
+def token_stub_stats(environment):
+	url = environment.parsed_options.token_stub
+	if not url:
+		return None
+	try:
+		return json.loads(urllib.request.urlopen(url.rstrip("/") + "/stats", timeout = 10).read())
+	except Exception as e:
+		print("Unable to read token stub stats: " + str(e))
+		return None
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+	global token_stub_start
+	token_stub_start = token_stub_stats(environment)
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+	end = token_stub_stats(environment)
+	if token_stub_start is None or end is None:
+		return
+	generated = end["generated"] - token_stub_start["generated"]
+	logins = sum(entry.num_requests for (name, method), entry in environment.stats.entries.items()
+		if name.startswith("/account/login") or name == "/account/refresh")
+	print("token-service generate calls %d   logins and refreshes %d   per call %.3f" % (generated, logins, generated / logins if logins else 0))
+
+def record_phase(name, started, exception = None):
+	"""Reports a client-side phase as its own row in the Locust stats, separate from the HTTP requests inside it."""
+	events.request.fire(
+		request_type = "PHASE",
+		name = name,
+		response_time = (time.perf_counter() - started) * 1000,
+		response_length = 0,
+		exception = exception,
+		context = {}
+	)
+
+class Device:
+	def __init__(self, client_version):
+		self.installId = "locust-" + uuid.uuid4().hex
+		self.clientVersion = client_version
+		self.dataVersion = "locust"
+		self.language = random.choice(["en-US", "en-GB", "de-DE", "fr-FR", "ja-JP"])
+		self.osVersion = random.choice(["iOS 17.4", "iOS 16.7", "Android 14", "Android 13"])
+		self.type = random.choice(["iPhone15,2", "iPhone14,5", "Pixel 8", "SM-S918B"])
+		self.privateKey = None
+
+	def to_json(self):
+		output = {
+			"installId": self.installId,
+			"clientVersion": self.clientVersion,
+			"dataVersion": self.dataVersion,
+			"language": self.language,
+			"osVersion": self.osVersion,
+			"type": self.type
+		}
+		if self.privateKey:
+			output["privateKey"] = self.privateKey
+		return output
+
+class LoginSession:
+	"""
+	Tracks one player's authentication state: the device used to log in, the token returned in player.token, and
+	when that token was issued.  Sets the Authorization header on the owning user's client.
+	"""
+	def __init__(self, user):
+		self.user = user
+		self.client = user.client
+		self.options = user.environment.parsed_options
+		self.device = None
+		self.token = ""
+		self.accountId = ""
+		self.screenname = ""
+		self.discriminator = None
+		self.issued = 0
+		encoding.apply(self.client, self.options)
+
+	@property
+	def expired(self):
+		return not self.token or time.monotonic() - self.issued > self.options.token_lifetime
+
+	def new_device(self):
+		return Device(self.options.client_version)
+
+	def pick_device(self):
+		"""Returns (device, returning).  Falls back to a new device when nothing has logged in yet."""
+		if known_devices and random.random() < self.options.returning_ratio:
+			return random.choice(known_devices), True
+		return self.new_device(), False
+
+	def login(self, device = None, returning = None):
+		if device is None:
+			device, returning = self.pick_device()
+		self.device = device
+		started = time.perf_counter()
+		label = "returning" if returning else "new"
+		self.client.headers.pop("Authorization", None)
+
+		with self.client.post(LOGIN, name = "/account/login [" + label + "]", json = {
+			"deviceInfo": device.to_json()
+		}, catch_response = True) as response:
+			try:
+				player = response.json()["player"]
+				self.accept(player)
+			except Exception as e:
+				response.failure("Login did not return a player token: " + str(e))
+				record_phase("login [" + label + "]", started, exception = e)
+				return False
+
+		# The private key is only exposed until the client acknowledges it; send it back on every later login.
+		key = (player.get("deviceInfo") or {}).get("privateKey")
+		if key:
+			device.privateKey = key
+		if not returning:
+			remember(device, self.options.device_pool)
+
+		record_phase("login [" + label + "]", started)
+		return True
+
+	def refresh(self):
+		started = time.perf_counter()
+		with self.client.get(REFRESH, name = "/account/refresh", catch_response = True) as response:
+			try:
+				self.accept(response.json())
+			except Exception as e:
+				response.failure("Refresh did not return a player token: " + str(e))
+				record_phase("token refresh", started, exception = e)
+				return False
+		record_phase("token refresh", started)
+		return True
+
+	def ensure_token(self):
+		"""Logs in when there's no token; refreshes when the simulated lifetime has elapsed."""
+		if not self.token:
+			return self.login()
+		if self.expired:
+			return self.refresh() or self.login(self.device, True)
+		return True
+
+	def accept(self, player):
+		self.token = player["token"]
+		self.accountId = player["id"]
+		self.screenname = player.get("screenname", "")
+		self.discriminator = player.get("discriminator")
+		self.issued = time.monotonic()
+		self.client.headers["Authorization"] = "Bearer " + self.token
+
+def remember(device, limit):
+	if len(known_devices) < limit:
+		known_devices.append(device)
+	else:
+		known_devices[random.randrange(limit)] = device
+
+class LoginUser(HttpUser):
+	"""
+	Login-only traffic.  Each iteration either starts a session on a new or returning device, or refreshes the token
+	of the current one once it has "expired".
+	"""
+	weight = 1
+	wait_time = between(1, 5)
+
+	def on_start(self):
+		self.session = LoginSession(self)
+
+	@tag("login")
+	@task(3)
+	def login(self):
+		self.session.login()
+
+	@tag("login")
+	@task(1)
+	def refresh(self):
+		if self.session.expired and self.session.token:
+			self.session.refresh()
+		else:
+			self.session.ensure_token()
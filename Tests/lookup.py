@@ -0,0 +1,47 @@
+import random
+
+from locust import HttpUser, events, tag, task, between
+
+from journey import known_accounts
+from login import LoginSession
+import server_metrics # Unused name; importing it registers the Server-Timing listeners.
+
+@events.init_command_line_parser.add_listener
+def on_parser_init(parser):
+	parser.add_argument("--lookup-batches", type = str, default = "10,50,200", env_var = "LOCUST_LOOKUP_BATCHES",
+		help = "Comma-separated /lookup batch sizes for LookupUser, picked at random per request.")
+	parser.add_argument("--lookup-seed", type = int, default = 20, env_var = "LOCUST_LOOKUP_SEED",
+		help = "New accounts each LookupUser creates on start, so there are enough real players to look up.")
+
+class LookupUser(HttpUser):
+	"""
+	Guild, chat, and leaderboard screens resolving many players at once.  Each user first creates --lookup-seed
+	accounts, then calls /lookup with batches drawn from --lookup-batches, named by size ("/lookup [200]").  Every id
+	sent belongs to a real account, so a response with fewer results than ids is a failure.
+	"""
+	weight = 1
+	wait_time = between(0.5, 2)
+
+	def on_start(self):
+		self.session = LoginSession(self)
+		self.batches = [int(size) for size in self.environment.parsed_options.lookup_batches.split(",") if size.strip()]
+		for _ in range(max(1, self.environment.parsed_options.lookup_seed)):
+			if self.session.login(self.session.new_device(), False) and self.session.accountId not in known_accounts:
+				known_accounts.append(self.session.accountId)
+
+	@tag("lookup")
+	@task(1)
+	def lookup(self):
+		if not known_accounts or not self.session.ensure_token():
+			return
+		batch = random.choice(self.batches)
+		ids = random.sample(known_accounts, min(batch, len(known_accounts)))
+		with self.client.get("/player/v2/lookup", name = "/lookup [%d]" % batch, params = { "accountIds": ",".join(ids) },
+			catch_response = True) as response:
+			try:
+				found = len(response.json()["results"])
+			except Exception as e:
+				response.failure("Lookup did not return results: " + str(e))
+				return
+			if found != len(ids):
+				response.failure("Lookup returned %d of %d players" % (found, len(ids)))
@@ -0,0 +1,192 @@
+import json
+import random
+import re
+import uuid
+
+JSON_HEADERS = { "Content-Type": "application/json" }
+
+GAME = "57901c6df82a45708018ba73b8d16004"
+SECRET = "72d0676767714480b1e4cec845105332"
+
+# Placeholders are serialized as quoted strings and replaced with the JSON encoding of the value at render time.
+SLOT = re.compile(r'"@@(\w+)@@"')
+
+def slot(name):
+	return "@@" + name + "@@"
+
+def encode(value):
+	if type(value) is int:
+		return str(value).encode("ascii")
+	return json.dumps(value).encode("utf-8")
+
+class BodyTemplate:
+	"""
+	A request body serialized once.  Per-user fields are left as slots in the cached bytes and filled by render(),
+	which only encodes the slot values and joins byte chunks.
+	"""
+	def __init__(self, body):
+		encoded = json.dumps(body, separators = (",", ":"))
+		self.chunks = []
+		self.slots = []
+		position = 0
+		for match in SLOT.finditer(encoded):
+			self.chunks.append(encoded[position:match.start()].encode("utf-8"))
+			self.slots.append(match.group(1))
+			position = match.end()
+		self.chunks.append(encoded[position:].encode("utf-8"))
+
+	def render(self, **values):
+		encoded = { key: encode(value) for key, value in values.items() }
+		parts = [self.chunks[0]]
+		for name, chunk in zip(self.slots, self.chunks[1:]):
+			parts.append(encoded[name])
+			parts.append(chunk)
+		return b"".join(parts)
+
+COMPONENTS = [
+	("abTest", "{\"testGroups\":[],\"component\":{\"isDirty\":true,\"version\":1}}"),
+	("hero", "{\"heroes\":[],\"heroIds\":[\"human_infantryman\",\"elven_crossbow_recruit\"],\"teams\":[{\"id\":\"f46bfd851caa7267810463b87ac81f77\",\"name\":\"Team 1\",\"teamSlot\":0,\"heroIds\":[\"human_infantryman\",\"elven_crossbow_recruit\"],\"isAutoPlayTeam\":false},{\"id\":\"62893ba2977cf78482612b88ab61bd1e\",\"name\":\" Team 2\",\"teamSlot\":1,\"heroIds\":[],\"isAutoPlayTeam\":false},{\"id\":\"0a780bc64ce11f58a3f8fa89771b021d\",\"name\":\" Team 3\",\"teamSlot\":2,\"heroIds\":[],\"isAutoPlayTeam\":false},{\"id\":\"7d5de5b56c93a2bbd266023f8b4efc98\",\"name\":\" Team 4\",\"teamSlot\":3,\"heroIds\":[],\"isAutoPlayTeam\":false},{\"id\":\"d23065a6b6dc55beb2b0e13de816a259\",\"name\":\" Team 5\",\"teamSlot\":4,\"heroIds\":[],\"isAutoPlayTeam\":false}],\"component\":{\"isDirty\":true,\"version\":3}}"),
+	("wallet", "{\"currencies\":[{\"currencyId\":\"energy\",\"amount\":72},{\"currencyId\":\"hard_currency\",\"amount\":100},{\"currencyId\":\"soft_currency\",\"amount\":25},{\"currencyId\":\"xp_currency\",\"amount\":125},{\"currencyId\":\"username_change\",\"amount\":1}],\"component\":{\"isDirty\":true,\"version\":1}}"),
+	("account", "{\"accountLevel\":1,\"lastEnergyRegenTime\":\"132866786242999490\",\"lastDungeonKeyRegenTime\":\"132866786242999490\",\"lastOfflineTime\":\"132866786242999490\",\"lastDailyResetTime\":\"132866786242999490\",\"lastCalendarLoginTime\":\"132866786242999490\",\"accountCreationDate\":\"132866786242999490\",\"accountName\":\"Player19944066\",\"accountAvatar\":\"human_infantryman\",\"lifetimeSessionCount\":0,\"sentInstallEvent\":false,\"migrated3DayCalendarData\":false,\"useActionCams\":true,\"component\":{\"isDirty\":true,\"version\":9},\"timeOffset\":{\"days\":0,\"hours\":0,\"minutes\":0},\"seenEntities\":[],\"calendarRewards\":[],\"bannerPulls\":[],\"dynamicTimespans\":[],\"hasDebugPermissions\":false,\"hasLocalNotificationsAuth\":false,\"patrolMinutesChecked\":0,\"patrolAccumulatedRewards\":[],\"patrolFlatRewardLevelsClaimed\":[],\"tutorialRecords\":[]}"),
+	("equipment", "{\"equipment\":[],\"equipmentIds\":[],\"inventoryLevel\":0,\"component\":{\"isDirty\":true,\"version\":2}}"),
+	("world", "{\"campaigns\":[],\"lockedLevels\":[],\"component\":{\"isDirty\":true,\"version\":2},\"activeBattles\":[],\"teamsUsed\":[],\"starRewards\":[],\"autoPlayLogLevelIds\":[],\"lastLevelCurrencyUsed\":[],\"dungeonPasses\":[],\"lastTeamUsedId\":\"\",\"levelRuns\":[]}"),
+	("tutorial", "{\"component\":{\"isDirty\":true,\"version\":3},\"tutorialRecords\":[],\"tutorialProgressionTracker\":{\"LevelupsSinceMetagame1\":0},\"tutorialFlags\":[]}"),
+	("quest", "{\"collectedQuests\":[],\"startedQuests\":[],\"progressedQuests\":[],\"questProgress\":[],\"dailyResets\":[],\"questTimespans\":[],\"questTimespansV2\":[],\"component\":{\"isDirty\":true,\"version\":3}}"),
+	("store", "{\"purchases\":[],\"pendingTransactions\":[],\"lifetimePurchasedStoreOfferIds\":[],\"popUpInfos\":[],\"component\":{\"isDirty\":true,\"version\":1},\"hasMadeRealMoneyTransaction\":false}"),
+	("multiplayer", "{\"component\":{\"isDirty\":true,\"version\":1},\"currentMatch\":null}"),
+]
+
+UPDATE_ITEMS = [
+	("hero_human_infantryman", "hero", "{\"id\":\"human_infantryman\",\"level\":1,\"ascension\":0,\"evolution\":1,\"skill\":1,\"equipment\":[]}"),
+	("hero_elven_crossbow_recruit", "hero", "{\"id\":\"elven_crossbow_recruit\",\"level\":1,\"ascension\":0,\"evolution\":1,\"skill\":1,\"equipment\":[]}"),
+]
+
+# (iid, type, data) for the deprecated "items" upsert path.
+NUKE_ITEMS = [
+	("hero_human_infantryman", "hero", {"id": "human_infantryman", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("levelRunInfo_campaign_01_01", "levelRunInfo", {"levelId": "campaign_01_01", "completionTime": 15, "stars": 3, "failedAttempts": 0, "attempts": 1}),
+	("hero_elven_crossbow_recruit", "hero", {"id": "elven_crossbow_recruit", "level": 1, "ascension": 2, "evolution": 2, "skill": 1, "equipment": []}),
+	("levelRunInfo_campaign_01_02", "levelRunInfo", {"levelId": "campaign_01_02", "completionTime": 30, "stars": 3, "failedAttempts": 0, "attempts": 1}),
+	("hero_orc_fam1_bow", "hero", {"id": "orc_fam1_bow", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_demon_healer", "hero", {"id": "demon_healer", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("levelRunInfo_campaign_01_03", "levelRunInfo", {"levelId": "campaign_01_03", "completionTime": 35, "stars": 3, "failedAttempts": 0, "attempts": 1}),
+	("hero_human_noblewoman", "hero", {"id": "human_noblewoman", "level": 2, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("levelRunInfo_campaign_01_04", "levelRunInfo", {"levelId": "campaign_01_04", "completionTime": 67, "stars": 3, "failedAttempts": 0, "attempts": 1}),
+	("hero_elven_noble_protector", "hero", {"id": "elven_noble_protector", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("levelRunInfo_campaign_01_05", "levelRunInfo", {"levelId": "campaign_01_05", "completionTime": 68, "stars": 3, "failedAttempts": 1, "attempts": 2}),
+	("levelRunInfo_campaign_01_06", "levelRunInfo", {"levelId": "campaign_01_06", "completionTime": 59, "stars": 3, "failedAttempts": 3, "attempts": 7}),
+	("hero_demon_axe_thrower", "hero", {"id": "demon_axe_thrower", "level": 1, "ascension": 0, "evolution": 4, "skill": 1, "equipment": []}),
+	("hero_werewolf_berserker", "hero", {"id": "werewolf_berserker", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("levelRunInfo_campaign_01_07", "levelRunInfo", {"levelId": "campaign_01_07", "completionTime": 102, "stars": 3, "failedAttempts": 3, "attempts": 4}),
+	("levelRunInfo_campaign_01_08", "levelRunInfo", {"levelId": "campaign_01_08", "completionTime": 113, "stars": 3, "failedAttempts": 0, "attempts": 1}),
+	("levelRunInfo_campaign_01_09", "levelRunInfo", {"levelId": "campaign_01_09", "completionTime": 118, "stars": 3, "failedAttempts": 2, "attempts": 3}),
+	("levelRunInfo_campaign_01_10", "levelRunInfo", {"levelId": "campaign_01_10", "completionTime": 140, "stars": 3, "failedAttempts": 3, "attempts": 7}),
+	("hero_orc_fam1_warrior", "hero", {"id": "orc_fam1_warrior", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("levelRunInfo_campaign_02_01", "levelRunInfo", {"levelId": "campaign_02_01", "completionTime": 121, "stars": 3, "failedAttempts": 0, "attempts": 1}),
+	("levelRunInfo_campaign_02_02", "levelRunInfo", {"levelId": "campaign_02_02", "completionTime": -1, "stars": 3, "failedAttempts": 2, "attempts": 3}),
+	("hero_orc_fam1_crossbow", "hero", {"id": "orc_fam1_crossbow", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_demon_cleaver", "hero", {"id": "demon_cleaver", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_human_crystal_tank", "hero", {"id": "human_crystal_tank", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_orc_reaver", "hero", {"id": "orc_reaver", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_angel_valkyrie", "hero", {"id": "angel_valkyrie", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_human_desert_spear", "hero", {"id": "human_desert_spear", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_human_ba_knight", "hero", {"id": "human_ba_knight", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_elven_wind_mage", "hero", {"id": "elven_wind_mage", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_human_cleric", "hero", {"id": "human_cleric", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_ogre_brawler", "hero", {"id": "ogre_brawler", "level": 1, "ascension": 2, "evolution": 2, "skill": 1, "equipment": []}),
+	("hero_human_lancer", "hero", {"id": "human_lancer", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_orc_shrapnel", "hero", {"id": "orc_shrapnel", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_giant_forest_sage", "hero", {"id": "giant_forest_sage", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_orc_armored_defender", "hero", {"id": "orc_armored_defender", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_elven_phoenix", "hero", {"id": "elven_phoenix", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_human_archmage", "hero", {"id": "human_archmage", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("levelRunInfo_campaign_02_03", "levelRunInfo", {"levelId": "campaign_02_03", "completionTime": 99, "stars": 3, "failedAttempts": 4, "attempts": 6}),
+	("levelRunInfo_campaign_02_04", "levelRunInfo", {"levelId": "campaign_02_04", "completionTime": -1, "stars": 3, "failedAttempts": 1, "attempts": 2}),
+	("levelRunInfo_dungeon_skill_ranged_01", "levelRunInfo", {"levelId": "dungeon_skill_ranged_01", "completionTime": -1, "stars": 0, "failedAttempts": 3, "attempts": 3}),
+	("hero_angel_breaker", "hero", {"id": "angel_breaker", "level": 1, "ascension": 2, "evolution": 2, "skill": 1, "equipment": []}),
+	("hero_angel_duelist", "hero", {"id": "angel_duelist", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_angel_grove_warden", "hero", {"id": "angel_grove_warden", "level": 1, "ascension": 6, "evolution": 6, "skill": 1, "equipment": []}),
+	("hero_demon_lavamancer", "hero", {"id": "demon_lavamancer", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_elven_gothic_defender", "hero", {"id": "elven_gothic_defender", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_elven_hydra", "hero", {"id": "elven_hydra", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_elven_magitech_archer", "hero", {"id": "elven_magitech_archer", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_elven_mender", "hero", {"id": "elven_mender", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_elven_swordsman", "hero", {"id": "elven_swordsman", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_giant_frost_defender", "hero", {"id": "giant_frost_defender", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_human_pharaoh", "hero", {"id": "human_pharaoh", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_human_reaper", "hero", {"id": "human_reaper", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_werewolf_frostpierce", "hero", {"id": "werewolf_frostpierce", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_werewolf_hammergod", "hero", {"id": "werewolf_hammergod", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("hero_werewolf_justicar", "hero", {"id": "werewolf_justicar", "level": 1, "ascension": 0, "evolution": 1, "skill": 1, "equipment": []}),
+	("levelRunInfo_dungeon_skill_ranged_02", "levelRunInfo", {"levelId": "dungeon_skill_ranged_02", "completionTime": -1, "stars": 0, "failedAttempts": 1, "attempts": 1}),
+	("levelRunInfo_dungeon_skill_ranged_05", "levelRunInfo", {"levelId": "dungeon_skill_ranged_05", "completionTime": -1, "stars": 0, "failedAttempts": 1, "attempts": 1}),
+	("levelRunInfo_dungeon_skill_melee_01", "levelRunInfo", {"levelId": "dungeon_skill_melee_01", "completionTime": -1, "stars": 0, "failedAttempts": 1, "attempts": 1}),
+	("levelRunInfo_dungeon_skill_melee_04", "levelRunInfo", {"levelId": "dungeon_skill_melee_04", "completionTime": -1, "stars": 0, "failedAttempts": 1, "attempts": 1}),
+	("levelRunInfo_campaign_03_02", "levelRunInfo", {"levelId": "campaign_03_02", "completionTime": -1, "stars": 0, "failedAttempts": 5, "attempts": 5}),
+	("levelRunInfo_dungeon_gold_06", "levelRunInfo", {"levelId": "dungeon_gold_06", "completionTime": -1, "stars": 0, "failedAttempts": 4, "attempts": 4}),
+	("levelRunInfo_dungeon_gold_03", "levelRunInfo", {"levelId": "dungeon_gold_03", "completionTime": -1, "stars": 3, "failedAttempts": 6, "attempts": 7}),
+	("levelRunInfo_dungeon_gold_05", "levelRunInfo", {"levelId": "dungeon_gold_05", "completionTime": -1, "stars": 0, "failedAttempts": 1, "attempts": 1}),
+	("levelRunInfo_campaign_02_15", "levelRunInfo", {"levelId": "campaign_02_15", "completionTime": -1, "stars": 0, "failedAttempts": 2, "attempts": 2}),
+	("levelRunInfo_dungeon_exp_06", "levelRunInfo", {"levelId": "dungeon_exp_06", "completionTime": -1, "stars": 0, "failedAttempts": 1, "attempts": 1}),
+]
+
+def version_slot(component):
+	return "v_" + component
+
+def update_body(aid, screenname, versions):
+	"""Builds the standard /update body from scratch; this is what the locustfile used to do on every call."""
+	return {
+		"components": [{ "name": name, "data": data, "version": versions.get(name, 0) } for name, data in COMPONENTS],
+		"items": [{ "iid": iid, "type": kind, "data": data, "delete": False } for iid, kind, data in UPDATE_ITEMS],
+		"screenName": screenname,
+		"game": GAME,
+		"secret": SECRET
+	}
+
+def nuke_body(aid, screenname, versions):
+	body = update_body(aid, screenname, versions)
+	body["items"] = [{ "aid": aid, "iid": iid, "data": dict(data), "type": kind } for iid, kind, data in NUKE_ITEMS]
+	return body
+
+def template_values(aid, screenname, versions):
+	values = { version_slot(name): versions.get(name, 0) for name, _ in COMPONENTS }
+	values["aid"] = aid
+	values["screenName"] = screenname
+	return values
+
+def _template(build):
+	return BodyTemplate(build(slot("aid"), slot("screenName"), { name: slot(version_slot(name)) for name, _ in COMPONENTS }))
+
+UPDATE = _template(update_body)
+NUKE = _template(nuke_body)
+
+def render_update(aid, screenname, versions = None):
+	return UPDATE.render(**template_values(aid, screenname, versions or {}))
+
+def render_nuke(aid, screenname, versions = None):
+	return NUKE.render(**template_values(aid, screenname, versions or {}))
+
+# Autosave deltas per component, sent as patch operations instead of whole components.  Nothing here grows the data,
+# so long runs don't inflate the accounts.
+PATCHES = {
+	"wallet": lambda: [{ "op": "set", "path": "currencies.%d.amount" % random.randrange(5), "value": random.randint(0, 10_000) }],
+	"account": lambda: [{ "op": "set", "path": "lastOfflineTime", "value": str(random.getrandbits(57)) }],
+	"world": lambda: [{ "op": "set", "path": "lastTeamUsedId", "value": uuid.uuid4().hex }],
+	"tutorial": lambda: [{ "op": "inc", "path": "tutorialProgressionTracker.LevelupsSinceMetagame1", "value": 1 }],
+	"multiplayer": lambda: [{ "op": "unset", "path": "currentMatch" }],
+}
+
+def random_patches(most = 3):
+	"""Patch operations for 1 to most random components, keyed by component name."""
+	names = random.sample(list(PATCHES), random.randint(1, min(most, len(PATCHES))))
+	return { name: PATCHES[name]() for name in names }
+
+def render_patch(screenname, patches, versions = None):
+	"""An /update body that only carries the patched components.  Small enough to encode per call."""
+	versions = versions or {}
+	return json.dumps({
+		"components": [{ "name": name, "version": versions.get(name, 0), "patch": operations } for name, operations in patches.items()],
+		"screenName": screenname,
+		"game": GAME,
+		"secret": SECRET
+	}, separators = (",", ":")).encode("utf-8")
@@ -0,0 +1,194 @@
+import json
+import math
+import random
+import time
+
+from locust import HttpUser, task, events, tag
+
+import payloads
+from login import LoginSession
+import server_metrics # Unused name; importing it registers the Server-Timing listeners.
+
+# Median sizes, in bytes, for each component's serialized data, and the list field grown to reach them.  The shapes
+# come from payloads.COMPONENTS; sizes follow a log-normal distribution around these medians.
+COMPONENT_SIZES = {
+	"abTest": (200, "testGroups"),
+	"hero": (4_000, "heroes"),
+	"wallet": (400, "currencies"),
+	"account": (3_000, "seenEntities"),
+	"equipment": (2_000, "equipmentIds"),
+	"world": (12_000, "levelRuns"),
+	"tutorial": (1_500, "tutorialFlags"),
+	"quest": (6_000, "questProgress"),
+	"store": (2_500, "purchases"),
+	"multiplayer": (150, None)
+}
+
+# Share of a profile's items by type, and the median item count for a generated (non-sweep) profile.
+ITEM_MIX = { "hero": 0.3, "levelRunInfo": 0.5, "equipment": 0.2 }
+MEDIAN_ITEMS = 300
+SIGMA = 0.8
+
+@events.init_command_line_parser.add_listener
+def on_parser_init(parser):
+	parser.add_argument("--profile-seed", type = int, default = 1, env_var = "LOCUST_PROFILE_SEED",
+		help = "Seed for generated player profiles.  User n uses seed + n.")
+	parser.add_argument("--sweep-tiers", type = str, default = "10,100,1000,5000", env_var = "LOCUST_SWEEP_TIERS",
+		help = "Comma-separated item counts per account for SweepUser.")
+	parser.add_argument("--sweep-repeats", type = int, default = 5, env_var = "LOCUST_SWEEP_REPEATS",
+		help = "Number of /update + /items round trips per tier before a SweepUser moves to the next tier.")
+
+class ProfileGenerator:
+	"""
+	Builds realistic player profiles from a seed.  The same seed always produces the same profile, so a sweep can be
+	repeated against a new build and compared request for request.
+	"""
+	def __init__(self, seed):
+		self.rando = random.Random(seed)
+
+	def lognormal(self, median, sigma = SIGMA):
+		return max(1, int(self.rando.lognormvariate(math.log(median), sigma)))
+
+	def component(self, name, data):
+		median, field = COMPONENT_SIZES.get(name, (500, None))
+		target = self.lognormal(median, 0.6)
+		data = json.loads(data)
+		if name == "hero":
+			data["teams"] = [self.team(i) for i in range(self.rando.randint(5, 20))]
+		if field:
+			entries = data.setdefault(field, [])
+			while len(json.dumps(data, separators = (",", ":"))) < target:
+				entries.extend(self.filler(field) for _ in range(8))
+		return json.dumps(data, separators = (",", ":"))
+
+	def components(self):
+		return { name: self.component(name, data) for name, data in payloads.COMPONENTS }
+
+	def team(self, slot):
+		return {
+			"id": "%032x" % self.rando.getrandbits(128),
+			"name": "Team %d" % (slot + 1),
+			"teamSlot": slot,
+			"heroIds": ["hero_%04d" % self.rando.randrange(500) for _ in range(self.rando.randint(0, 5))],
+			"isAutoPlayTeam": self.rando.random() < 0.2
+		}
+
+	def filler(self, field):
+		return {
+			"id": "%s_%08x" % (field, self.rando.getrandbits(32)),
+			"value": self.rando.randrange(100_000),
+			"timestamp": str(132866786242999490 + self.rando.randrange(10 ** 12))
+		}
+
+	def item(self, kind, index):
+		if kind == "hero":
+			return "hero_%05d" % index, {
+				"id": "hero_%05d" % index,
+				"level": self.rando.randint(1, 60),
+				"ascension": self.rando.randint(0, 6),
+				"evolution": self.rando.randint(1, 6),
+				"skill": self.rando.randint(1, 5),
+				"equipment": ["equipment_%05d" % self.rando.randrange(10_000) for _ in range(self.rando.randint(0, 6))]
+			}
+		if kind == "levelRunInfo":
+			return "levelRunInfo_campaign_%05d" % index, {
+				"levelId": "campaign_%05d" % index,
+				"completionTime": self.rando.choice([-1, self.rando.randint(10, 300)]),
+				"stars": self.rando.randint(0, 3),
+				"failedAttempts": self.rando.randint(0, 8),
+				"attempts": self.rando.randint(1, 12)
+			}
+		return "equipment_%05d" % index, {
+			"id": "equipment_%05d" % index,
+			"slot": self.rando.choice(["weapon", "armor", "helm", "boots", "ring", "amulet"]),
+			"level": self.rando.randint(1, 40),
+			"rarity": self.rando.randint(1, 5),
+			"stats": [{ "stat": self.rando.choice(["atk", "def", "hp", "spd"]), "value": self.rando.randint(1, 500) } for _ in range(self.rando.randint(1, 4))]
+		}
+
+	def items(self, count = None):
+		"""Returns (iid, type, data) tuples; count defaults to a log-normal draw around MEDIAN_ITEMS."""
+		count = count if count is not None else self.lognormal(MEDIAN_ITEMS)
+		output = []
+		for kind, share in ITEM_MIX.items():
+			output.extend(self.item(kind, i) + (kind,) for i in range(int(round(count * share))))
+		output = output[:count]
+		while len(output) < count:
+			output.append(self.item("levelRunInfo", len(output)) + ("levelRunInfo",))
+		return [(iid, kind, data) for iid, data, kind in output]
+
+	def update_body(self, aid, screenname, item_count = None):
+		return {
+			"components": [{ "name": name, "data": data, "version": 0 } for name, data in self.components().items()],
+			"items": [{ "aid": aid, "iid": iid, "type": kind, "data": data } for iid, kind, data in self.items(item_count)],
+			"screenName": screenname,
+			"game": payloads.GAME,
+			"secret": payloads.SECRET
+		}
+
+def tier_label(count):
+	return "%dk" % (count // 1000) if count >= 1000 and count % 1000 == 0 else str(count)
+
+class TierStats:
+	"""Request and response sizes per tier, kept per worker and printed when the test stops."""
+	def __init__(self):
+		self.rows = {}
+
+	def add(self, tier, endpoint, sent, received, elapsed):
+		row = self.rows.setdefault((tier, endpoint), [0, 0, 0, 0.0])
+		row[0] += 1
+		row[1] += sent
+		row[2] += received
+		row[3] += elapsed
+
+	def report(self):
+		if not self.rows:
+			return
+		print("%-8s %-10s %8s %14s %14s %12s" % ("tier", "endpoint", "count", "avg sent (B)", "avg recv (B)", "avg ms"))
+		for (tier, endpoint), (count, sent, received, elapsed) in sorted(self.rows.items()):
+			print("%-8s %-10s %8d %14.0f %14.0f %12.1f" % (tier_label(tier), endpoint, count, sent / count, received / count, elapsed / count))
+
+tier_stats = TierStats()
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+	tier_stats.report()
+
+class SweepUser(HttpUser):
+	"""
+	Drives /update and /items with generated profiles at increasing item counts per account.  Each user creates one
+	account, runs --sweep-repeats round trips per tier, then moves on; after the last tier it stops.
+	"""
+	weight = 1
+	count = 0
+
+	def on_start(self):
+		SweepUser.count += 1
+		options = self.environment.parsed_options
+		self.generator = ProfileGenerator(options.profile_seed + SweepUser.count)
+		self.tiers = [int(tier) for tier in options.sweep_tiers.split(",") if tier.strip()]
+		self.repeats = options.sweep_repeats
+		self.step = 0
+		self.session = LoginSession(self)
+		self.session.login(self.session.new_device(), False)
+
+	@tag("sweep")
+	@task
+	def sweep(self):
+		if self.step >= len(self.tiers) * self.repeats:
+			self.stop()
+			return
+		if not self.session.ensure_token():
+			return
+		tier = self.tiers[self.step // self.repeats]
+		self.step += 1
+		label = tier_label(tier)
+
+		body = json.dumps(self.generator.update_body(self.session.accountId, self.session.screenname, tier)).encode("utf-8")
+		started = time.perf_counter()
+		response = self.client.patch("/player/v2/update", name = "/update [" + label + "]", headers = payloads.JSON_HEADERS, data = body)
+		tier_stats.add(tier, "/update", len(body), len(response.content or b""), (time.perf_counter() - started) * 1000)
+
+		started = time.perf_counter()
+		response = self.client.get("/player/v2/items", name = "/items [" + label + "]")
+		tier_stats.add(tier, "/items", 0, len(response.content or b""), (time.perf_counter() - started) * 1000)
@@ -0,0 +1,99 @@
+import random
+
+from locust import HttpUser, events, tag, task, between
+
+import payloads
+from login import LoginSession
+from storage_ab import fetch_stats
+import server_metrics # Unused name; importing it registers the Server-Timing listeners.
+
+@events.init_command_line_parser.add_listener
+def on_parser_init(parser):
+	parser.add_argument("--write-ratio", type = float, default = 0.05, env_var = "LOCUST_WRITE_RATIO",
+		help = "Fraction of ReadHeavyUser requests that are a versioned /update instead of a /read.")
+
+class CacheReport:
+	"""Cache and Mongo counters from the start of the run; requires --admin-token."""
+	def __init__(self):
+		self.cache = None
+		self.stats = None
+
+	def start(self, environment):
+		self.cache = fetch_stats(environment, "cache")
+		self.stats = fetch_stats(environment)
+
+	def report(self, environment):
+		cache = fetch_stats(environment, "cache")
+		stats = fetch_stats(environment)
+		if None in (self.cache, self.stats, cache, stats):
+			return
+		hits = cache["hits"] - self.cache["hits"]
+		redis_hits = cache["redisHits"] - self.cache["redisHits"]
+		misses = cache["misses"] - self.cache["misses"]
+		lookups = hits + redis_hits + misses
+		reads = sum(stats.get("ops.%s.reads" % layout, 0) - self.stats.get("ops.%s.reads" % layout, 0) for layout in ["collections", "records"])
+		requests = environment.stats.get("/read [cached]", "GET").num_requests
+
+		print("Component cache")
+		print("  hits %10d   redis hits %8d   misses %8d   hit rate %.2f%%" % (hits, redis_hits, misses, 100 * (hits + redis_hits) / lookups if lookups else 0))
+		print("  stale fills rejected %6d   evictions %8d   entries %8d   bytes %10d" % (
+			cache["staleFillsRejected"] - self.cache["staleFillsRejected"], cache["evictions"] - self.cache["evictions"],
+			cache["entries"], cache["bytes"]))
+		print("  Mongo reads %10d   per /read %.3f" % (reads, reads / requests if requests else 0))
+
+report = CacheReport()
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+	report.start(environment)
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+	report.report(environment)
+
+class ReadHeavyUser(HttpUser):
+	"""
+	Reads the same components over and over, with an occasional versioned /update, so most /read calls should be
+	served by the component cache.  Every /read checks that it sees the versions the last /update wrote; a stale read
+	is reported as a failure.  Run with --admin-token to print the cache hit rate and Mongo reads per /read.
+	"""
+	weight = 1
+	wait_time = between(0.1, 0.5)
+
+	def on_start(self):
+		self.session = LoginSession(self)
+		self.names = [name for name, _ in payloads.COMPONENTS]
+		self.versions = {}
+
+	@tag("readheavy")
+	@task(1)
+	def play(self):
+		if not self.session.ensure_token():
+			return
+		if self.versions and random.random() < self.environment.parsed_options.write_ratio:
+			self.update()
+		else:
+			self.read()
+
+	def read(self):
+		with self.client.get("/player/v2/read", name = "/read [cached]", params = { "names": ",".join(self.names) }, catch_response = True) as response:
+			try:
+				versions = { component["name"]: component.get("version", 0) for component in response.json()["components"] }
+			except Exception as e:
+				response.failure("Read did not return components: " + str(e))
+				return
+			stale = [name for name, version in self.versions.items() if versions.get(name, 0) < version]
+			if stale:
+				response.failure("Stale read: " + ",".join(sorted(stale)))
+			self.versions = versions
+
+	def update(self):
+		versions = { name: self.versions.get(name, 0) + 1 for name in self.names }
+		with self.client.patch("/player/v2/update", name = "/update [cached]", headers = payloads.JSON_HEADERS,
+			data = payloads.render_update(self.session.accountId, self.session.screenname, versions),
+			catch_response = True) as response:
+			if response.ok:
+				self.versions = versions
+				return
+			response.failure("Update rejected (%d); resyncing component versions." % response.status_code)
+		self.versions = {}
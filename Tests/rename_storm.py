@@ -0,0 +1,93 @@
+import random
+
+from locust import HttpUser, events, tag, task, between
+
+from login import LoginSession
+import server_metrics # Unused name; importing it registers the Server-Timing listeners.
+
+# (screenname, discriminator) -> accountId for every name a user in this worker currently holds.
+held = {}
+
+@events.init_command_line_parser.add_listener
+def on_parser_init(parser):
+	parser.add_argument("--hot-names", type = str, default = "Shadow,Dragon,Ninja,Wolf,Phoenix", env_var = "LOCUST_HOT_NAMES",
+		help = "Comma-separated screennames RenameStormUser keeps renaming between.")
+
+class RenameStormUser(HttpUser):
+	"""
+	Many players renaming between a handful of popular screennames, so every rename has to find a free discriminator
+	in a crowded name and give its old one back.  Requests are named "/screenname [hot]".  A discriminator of 0, or
+	one another user in this worker already holds under the same name, is a failure.  A tenth of the iterations check
+	that a rename releases its number instead, as "/screenname [reclaim]".
+	"""
+	weight = 1
+	wait_time = between(0.1, 0.5)
+
+	def on_start(self):
+		self.session = LoginSession(self)
+		self.names = [name.strip() for name in self.environment.parsed_options.hot_names.split(",") if name.strip()]
+		self.session.login(self.session.new_device(), False)
+
+	def on_stop(self):
+		self.release()
+
+	def release(self):
+		key = (self.session.screenname, self.session.discriminator)
+		if held.get(key) == self.session.accountId:
+			del held[key]
+
+	def send(self, name, request_name, check = None):
+		"""
+		Renames the user and returns the discriminator it got, or None if the response had no player.  check gets the
+		discriminator and returns a failure message, if any.
+		"""
+		with self.client.patch("/player/v2/screenname", name = request_name, json = { "screenname": name },
+			catch_response = True) as response:
+			try:
+				body = response.json()
+				player = body["player"]
+				discriminator = body["discriminator"]
+			except Exception as e:
+				response.failure("Rename did not return a player: " + str(e))
+				return None
+
+			self.release()
+			self.session.accept(dict(player, token = body.get("accessToken") or self.session.token))
+
+			if not discriminator:
+				response.failure("No discriminator available for " + name)
+				return None
+			failure = check(discriminator) if check else None
+			if failure:
+				response.failure(failure)
+			return discriminator
+
+	@tag("renamestorm")
+	@task(9)
+	def rename(self):
+		if not self.names or not self.session.ensure_token():
+			return
+		name = random.choice([name for name in self.names if name != self.session.screenname] or self.names)
+
+		def unique(discriminator):
+			owner = held.setdefault((name, discriminator), self.session.accountId)
+			if owner != self.session.accountId:
+				return "%s#%04d is already held by %s" % (name, discriminator, owner)
+
+		self.send(name, "/screenname [hot]", unique)
+
+	@tag("reclaim")
+	@task(1)
+	def reclaim(self):
+		"""
+		Renames to a name only this user holds, away from it, and back.  Nobody else can take the number in between,
+		so getting a different number back means the rename away didn't release it.
+		"""
+		if not self.session.ensure_token():
+			return
+		own = "Reclaim%06d" % random.randrange(1_000_000)
+		first = self.send(own, "/screenname [reclaim]")
+		if not first or not self.send("Away%06d" % random.randrange(1_000_000), "/screenname [reclaim]"):
+			return
+		self.send(own, "/screenname [reclaim]", lambda discriminator: None if discriminator == first
+			else "%s#%04d wasn't released; got #%04d back" % (own, first, discriminator))
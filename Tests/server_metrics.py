@@ -0,0 +1,145 @@
+"""
+Server-reported timings, recorded next to what the client observed.  Importing this module registers its Locust
+listeners, so a scenario only needs the import; there's nothing to add to a user class.  Two sources are read:
+
+	* The Server-Timing header on every response: per-phase durations (components, c_account, items, commit,
+	  token-service, ...), plus the request's Mongo operation and retry counts.
+	* Timing fields in the body of /update (componentTaskCreationMS, itemTaskCreationMS, totalMS) and /items (itemMS).
+
+Each duration shows up in the normal stats as a SERVER row named after the request and phase, e.g. "/update commit".
+Workers also send compact histograms of client times, server phases, and counts to the master with a custom message.
+When Locust quits, the master (or a standalone run) prints them per request name and, with --csv, writes them to
+<prefix>_server_timings.csv alongside Locust's own files.
+"""
+import csv
+import re
+from collections import Counter, defaultdict
+
+from locust import events
+from locust.runners import MasterRunner, WorkerRunner
+
+MESSAGE = "server_timings"
+FIELDS = re.compile(rb'"(componentTaskCreationMS|itemTaskCreationMS|totalMS|itemMS)"\s*:\s*(\d+)')
+BODY_ENDPOINTS = ("/update", "/items")
+FULL_SCAN_BYTES = 256 * 1024
+TAIL_BYTES = 2048
+
+# request name -> metric -> Counter(value -> count).  "client" is the time Locust measured for the same request;
+# metrics ending in "#" are counts rather than milliseconds.
+pending = defaultdict(lambda: defaultdict(Counter))
+totals = defaultdict(lambda: defaultdict(Counter))
+
+def merge(into, histograms):
+	for name, metrics in histograms.items():
+		for metric, counts in metrics.items():
+			for value, count in counts.items():
+				into[name][metric][int(value)] += count
+
+def percentile(counts, fraction):
+	total = sum(counts.values())
+	seen = 0
+	for value in sorted(counts):
+		seen += counts[value]
+		if seen >= total * fraction:
+			return value
+	return 0
+
+def parse_body(response):
+	"""Large /items bodies end with itemMS, so only their tail is searched."""
+	content = response.content or b""
+	if len(content) > FULL_SCAN_BYTES:
+		content = content[-TAIL_BYTES:]
+	return { name.decode(): int(value) for name, value in FIELDS.findall(content) }
+
+def parse_header(value):
+	"""'items;dur=3.2, mongo;desc="4"' -> ({ "items": 3 }, { "mongo": 4 })"""
+	durations = {}
+	counts = {}
+	for metric in (value or "").split(","):
+		parts = [part.strip() for part in metric.split(";")]
+		if not parts[0]:
+			continue
+		params = dict(part.split("=", 1) for part in parts[1:] if "=" in part)
+		try:
+			if "dur" in params:
+				durations[parts[0]] = int(round(float(params["dur"])))
+			elif "desc" in params:
+				counts[parts[0]] = int(params["desc"].strip('"'))
+		except ValueError:
+			continue
+	return durations, counts
+
+@events.request.add_listener
+def on_request(request_type, name, response_time, response = None, exception = None, **kwargs):
+	if request_type in ("SERVER", "PHASE") or exception or response is None:
+		return
+
+	durations, counts = parse_header(response.headers.get("Server-Timing"))
+	path = (getattr(response.request, "path_url", "") or "").split("?")[0]
+	if path.endswith(BODY_ENDPOINTS):
+		durations.update(parse_body(response))
+	if not durations and not counts:
+		return
+
+	pending[name]["client"][int(round(response_time))] += 1
+	for metric, ms in durations.items():
+		pending[name][metric][ms] += 1
+		events.request.fire(request_type = "SERVER", name = "%s %s" % (name, metric), response_time = ms,
+			response_length = 0, exception = None, context = {})
+	for metric, count in counts.items():
+		pending[name][metric + " #"][count] += 1
+
+def flush(environment):
+	"""Workers ship what they've collected to the master; everyone else keeps it."""
+	if not pending:
+		return
+	# String keys survive the message encoding regardless of msgpack settings; merge() converts them back.
+	batch = { name: { metric: { str(value): n for value, n in counts.items() } for metric, counts in metrics.items() } for name, metrics in pending.items() }
+	pending.clear()
+	if isinstance(environment.runner, WorkerRunner):
+		environment.runner.send_message(MESSAGE, batch)
+	else:
+		merge(totals, batch)
+
+@events.init.add_listener
+def on_locust_init(environment, **kwargs):
+	if isinstance(environment.runner, MasterRunner):
+		environment.runner.register_message(MESSAGE, lambda environment, msg, **_: merge(totals, msg.data))
+	if isinstance(environment.runner, WorkerRunner):
+		# Piggyback on the regular stats report so batches arrive every few seconds.
+		events.report_to_master.add_listener(lambda client_id, data, **_: flush(environment))
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+	pending.clear()
+	totals.clear()
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+	flush(environment)
+
+@events.quitting.add_listener
+def on_quitting(environment, **kwargs):
+	"""Reported on quit rather than test stop, so the workers' last batches have reached the master."""
+	if isinstance(environment.runner, WorkerRunner) or not totals:
+		return
+
+	rows = []
+	for name in sorted(totals):
+		for metric in sorted(totals[name], key = lambda m: (m != "client", m != "total", m)):
+			counts = totals[name][metric]
+			count = sum(counts.values())
+			rows.append([name, metric, count, percentile(counts, 0.5), percentile(counts, 0.9), percentile(counts, 0.99),
+				max(counts), round(sum(value * n for value, n in counts.items()) / count, 1)])
+
+	print("Server timings (ms; metrics ending in # are counts per request)")
+	print("  %-32s %-26s %8s %7s %7s %7s %7s %8s" % ("request", "metric", "count", "p50", "p90", "p99", "max", "avg"))
+	for row in rows:
+		print("  %-32s %-26s %8d %7d %7d %7d %7d %8.1f" % tuple(row))
+
+	prefix = getattr(environment.parsed_options, "csv_prefix", None)
+	if prefix:
+		with open(prefix + "_server_timings.csv", "w", newline = "") as file:
+			writer = csv.writer(file)
+			writer.writerow(["Name", "Metric", "Count", "50%", "90%", "99%", "Max", "Average"])
+			writer.writerows(rows)
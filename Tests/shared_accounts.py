@@ -0,0 +1,171 @@
+import random
+import time
+from collections import Counter, defaultdict
+
+from gevent.lock import Semaphore
+from locust import HttpUser, events, tag, task, between
+
+import payloads
+from login import LoginSession
+from server_metrics import parse_header
+
+CURRENCY = "/player/v2/admin/currency"
+NAMES = ["Shared", "Crowded", "Busy", "Overlap"]
+MAX_LEVEL = 8
+
+# One entry per shared account in this worker: the device that owns it, created by the first user to need it.
+pool = []
+pool_lock = Semaphore()
+# accountId -> requests currently in flight against it from this worker.
+in_flight = Counter()
+
+@events.init_command_line_parser.add_listener
+def on_parser_init(parser):
+	parser.add_argument("--shared-accounts", type = int, default = 10, env_var = "LOCUST_SHARED_ACCOUNTS",
+		help = "Number of accounts SharedAccountUser spreads each worker's users across; users / accounts is the concurrency per account.")
+
+class Outcomes:
+	"""Results per (concurrency, request), where concurrency is how many requests were in flight on the account."""
+	def __init__(self):
+		self.counts = defaultdict(Counter)
+		self.retries = defaultdict(Counter)
+		self.times = defaultdict(list)
+
+	def add(self, level, name, outcome, ms, retries):
+		key = (min(level, MAX_LEVEL), name)
+		self.counts[key][outcome] += 1
+		self.retries[key][retries] += 1
+		self.times[key].append(ms)
+
+	def report(self):
+		if not self.counts:
+			return
+		print("Shared accounts (concurrency = requests in flight on the account, %d+ grouped)" % MAX_LEVEL)
+		print("  %-5s %-28s %8s %8s %8s %8s %8s %8s %8s" % ("conc", "request", "count", "abort %", "stale %", "error %", "retries", "p50", "p99"))
+		for level, name in sorted(self.counts):
+			counts = self.counts[(level, name)]
+			total = sum(counts.values())
+			retries = self.retries[(level, name)]
+			times = sorted(self.times[(level, name)])
+			print("  %-5s %-28s %8d %8.2f %8.2f %8.2f %8.2f %8d %8d" % ("%d%s" % (level, "+" if level == MAX_LEVEL else ""), name, total,
+				100 * counts["aborted"] / total, 100 * counts["stale"] / total, 100 * counts["error"] / total,
+				sum(value * n for value, n in retries.items()) / total,
+				times[len(times) // 2], times[min(len(times) - 1, int(len(times) * 0.99))]))
+
+outcomes = Outcomes()
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+	outcomes.__init__()
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+	outcomes.report()
+
+def claim_account(session, slot):
+	"""Logs in to the shared account in a slot, creating it on first use."""
+	with pool_lock:
+		while len(pool) <= slot:
+			pool.append(None)
+		if pool[slot] is None:
+			device = session.new_device()
+			if not session.login(device, False):
+				return False
+			pool[slot] = device
+			return True
+	return session.login(pool[slot], True)
+
+class SharedAccountUser(HttpUser):
+	"""
+	Many users sharing a small pool of accounts, firing overlapping /update, /admin/currency, and /screenname calls so
+	that transactions on the same account collide.  Each result is classified as ok, aborted (5xx, including "The
+	active transaction number is -1"), stale (a version conflict or a currency update that lost its race), or error,
+	and bucketed by how many requests were in flight on the account when it was sent.  Retries come from the
+	Server-Timing header.  /admin/currency needs --admin-token; without it, that task is skipped.
+	"""
+	weight = 1
+	wait_time = between(0, 0.2)
+
+	def on_start(self):
+		self.session = LoginSession(self)
+		self.options = self.environment.parsed_options
+		self.slot = random.randrange(max(1, self.options.shared_accounts))
+		self.ready = claim_account(self.session, self.slot)
+
+	def send(self, name, call, classify):
+		if not self.ready:
+			self.ready = claim_account(self.session, self.slot)
+			return
+		if not self.session.ensure_token():
+			return
+		account = self.session.accountId
+		in_flight[account] += 1
+		level = in_flight[account]
+		started = time.perf_counter()
+		try:
+			with call() as response:
+				outcome = classify(response)
+				if outcome != "ok":
+					response.failure("%s (%d)" % (outcome, response.status_code))
+				_, counts = parse_header(response.headers.get("Server-Timing"))
+				outcomes.add(level, name, outcome, int((time.perf_counter() - started) * 1000), counts.get("retries", 0))
+		finally:
+			in_flight[account] -= 1
+			if not in_flight[account]:
+				del in_flight[account]
+
+	@staticmethod
+	def status(response):
+		if response.ok:
+			return "ok"
+		if response.status_code >= 500:
+			return "aborted"
+		if "version" in (response.text or "").lower():
+			return "stale"
+		return "error"
+
+	@tag("shared")
+	@task(6)
+	def update(self):
+		# Version 0 skips the component version check, so collisions surface as transaction errors, not conflicts.
+		self.send("/update [shared]", lambda: self.client.patch("/player/v2/update", name = "/update [shared]",
+			headers = payloads.JSON_HEADERS, data = payloads.render_update(self.session.accountId, self.session.screenname),
+			catch_response = True), self.status)
+
+	@tag("shared")
+	@task(2)
+	def currency(self):
+		if not self.options.admin_token or not self.session.ensure_token():
+			return
+		with self.client.get("/player/v2/read", name = "/read [shared wallet]", params = { "names": "wallet" }, catch_response = True) as response:
+			try:
+				version = response.json()["components"][0].get("version", 0)
+			except Exception as e:
+				response.failure("Read did not return the wallet: " + str(e))
+				return
+
+		def classify(response):
+			outcome = self.status(response)
+			if outcome == "ok" and not response.json().get("success"):
+				return "stale"
+			return outcome
+
+		self.send("/admin/currency [shared]", lambda: self.client.patch(CURRENCY, name = "/admin/currency [shared]", json = {
+			"accountId": self.session.accountId,
+			"name": "soft_currency",
+			"amount": random.randint(0, 100000),
+			"version": version + 1
+		}, headers = { "Authorization": "Bearer " + self.options.admin_token }, catch_response = True), classify)
+
+	@tag("shared")
+	@task(1)
+	def rename(self):
+		def classify(response):
+			outcome = self.status(response)
+			if outcome == "ok":
+				body = response.json()
+				self.session.accept(dict(body["player"], token = body.get("accessToken") or self.session.token))
+			return outcome
+
+		self.send("/screenname [shared]", lambda: self.client.patch("/player/v2/screenname", name = "/screenname [shared]",
+			json = { "screenname": random.choice(NAMES) }, catch_response = True), classify)
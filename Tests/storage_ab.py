@@ -0,0 +1,100 @@
+import itertools
+
+import requests
+from locust import HttpUser, events, tag
+
+from journey import Journey
+import server_metrics # Unused name; importing it registers the Server-Timing listeners.
+
+LAYOUTS = ["collections", "record"]
+STATS = "/player/v2/admin/storage/stats"
+
+@events.init_command_line_parser.add_listener
+def on_parser_init(parser):
+	parser.add_argument("--storage-modes", type = str, default = ",".join(LAYOUTS), env_var = "LOCUST_STORAGE_MODES",
+		help = "Comma-separated storage modes StorageABUser alternates between (collections, record, dual).")
+
+def fetch_stats(environment, key = "stats"):
+	options = environment.parsed_options
+	if not options.admin_token:
+		return None
+	try:
+		response = requests.get(environment.host.rstrip("/") + STATS, headers = { "Authorization": "Bearer " + options.admin_token }, timeout = 10)
+		response.raise_for_status()
+		return response.json()[key]
+	except Exception as e:
+		print("Unable to read storage stats: " + str(e))
+		return None
+
+class StorageReport:
+	"""Server counters from the start of the run; the difference at the end is what this run caused."""
+	def __init__(self):
+		self.before = None
+
+	def start(self, environment):
+		self.before = fetch_stats(environment)
+
+	def report(self, environment):
+		modes = [mode.strip() for mode in environment.parsed_options.storage_modes.split(",") if mode.strip()]
+		print("%-12s %-10s %8s %8s %8s %8s" % ("storage", "endpoint", "count", "p50", "p99", "fail %"))
+		for mode in modes:
+			for endpoint, method in [("/read", "GET"), ("/update", "PATCH")]:
+				entry = environment.stats.get(endpoint + " <" + mode + ">", method)
+				if not entry.num_requests:
+					continue
+				print("%-12s %-10s %8d %8d %8d %8.2f" % (mode, endpoint, entry.num_requests,
+					entry.get_response_time_percentile(0.5), entry.get_response_time_percentile(0.99),
+					100 * entry.num_failures / entry.num_requests))
+
+		after = fetch_stats(environment)
+		if self.before is None or after is None:
+			return
+		delta = { key: value - self.before.get(key, 0) for key, value in after.items() }
+		print()
+		print("Mongo operations")
+		for layout in ["collections", "records"]:
+			reads = delta.get("ops.%s.reads" % layout, 0)
+			writes = delta.get("ops.%s.writes" % layout, 0)
+			print("  %-12s reads %10d   writes %10d" % (layout, reads, writes))
+		print("Transactions")
+		for mode in modes:
+			committed = delta.get("transactions.%s.committed" % mode, 0)
+			attempts = delta.get("transactions.%s.attempts" % mode, 0)
+			aborted = delta.get("transactions.%s.aborted" % mode, 0)
+			conflicts = delta.get("transactions.%s.versionConflicts" % mode, 0)
+			total = committed + aborted + conflicts
+			print("  %-12s committed %8d   retries %6d   aborted %6d   conflicts %6d   abort rate %.2f%%" % (
+				mode, committed, max(0, attempts - total), aborted, conflicts, 100 * aborted / total if total else 0))
+
+report = StorageReport()
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+	report.start(environment)
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+	report.report(environment)
+
+_modes = None
+
+def next_mode(options):
+	global _modes
+	if _modes is None:
+		_modes = itertools.cycle([mode.strip() for mode in options.storage_modes.split(",") if mode.strip()])
+	return next(_modes)
+
+@tag("storage")
+class StorageJourney(Journey):
+	"""The standard journey, pinned to one storage mode for the life of the account."""
+	def on_start(self):
+		super().on_start()
+		self.storage = next_mode(self.options)
+
+class StorageABUser(HttpUser):
+	"""
+	Runs the same journey against both component layouts at once.  Users alternate between --storage-modes, so every
+	mode sees the same mix under the same load; /read and /update are named by mode, e.g. "/update <record>".
+	"""
+	weight = 1
+	tasks = [StorageJourney]
@@ -0,0 +1,113 @@
+"""
+A local stand-in for token-service, so login load tests can run without it and show how many tokens player-service
+actually asks for.  It mints HS256 JWTs with iat / exp claims, validates them, and counts every generate call.
+
+	python Tests/token_stub.py --port 8089 --delay-ms 40 --lifetime 3600
+
+Point player-service's token-service URLs at http://<this host>:8089 and pass --token-stub to Locust to print
+token-service calls per login when the test stops.
+
+	POST /token/admin/generate    { "aid", "screenname", "email", "discriminator", ... } -> { "authorization": { "token", "expiration" } }
+	GET  /token/validate          Authorization: Bearer <token> -> { "tokenInfo": { ... } }
+	GET  /stats                   { "generated", "validated" }
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SECRET = b"locust-token-stub"
+
+counts = { "generated": 0, "validated": 0 }
+lock = threading.Lock()
+
+def encode(value):
+	return base64.urlsafe_b64encode(json.dumps(value, separators = (",", ":")).encode()).rstrip(b"=").decode()
+
+def decode(segment):
+	return json.loads(base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4)))
+
+def sign(body):
+	return base64.urlsafe_b64encode(hmac.new(SECRET, body.encode(), hashlib.sha256).digest()).rstrip(b"=").decode()
+
+def mint(claims, lifetime):
+	now = int(time.time())
+	body = encode({ "alg": "HS256", "typ": "JWT" }) + "." + encode(dict(claims, iat = now, exp = now + lifetime))
+	return body + "." + sign(body), now + lifetime
+
+def verify(token):
+	try:
+		header, payload, signature = token.split(".")
+		if not hmac.compare_digest(signature, sign(header + "." + payload)):
+			return None
+		claims = decode(payload)
+		return claims if claims.get("exp", 0) > time.time() else None
+	except Exception:
+		return None
+
+class Handler(BaseHTTPRequestHandler):
+	lifetime = 3600
+	delay = 0
+
+	def log_message(self, format, *args):
+		pass
+
+	def reply(self, status, body):
+		data = json.dumps(body).encode()
+		self.send_response(status)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(data)))
+		self.end_headers()
+		self.wfile.write(data)
+
+	def do_POST(self):
+		if not self.path.split("?")[0].endswith("/generate"):
+			return self.reply(404, { "message": "Not found" })
+		length = int(self.headers.get("Content-Length") or 0)
+		try:
+			request = json.loads(self.rfile.read(length) or b"{}")
+		except ValueError:
+			return self.reply(400, { "message": "Invalid JSON" })
+
+		time.sleep(self.delay)
+		claims = { key: request.get(key) for key in ["aid", "screenname", "email", "discriminator", "origin", "audiences"] if key in request }
+		token, expiration = mint(claims, self.lifetime)
+		with lock:
+			counts["generated"] += 1
+		self.reply(200, { "authorization": { "token": token, "expiration": expiration, "tokenInfo": claims } })
+
+	def do_GET(self):
+		path = self.path.split("?")[0]
+		if path == "/stats":
+			with lock:
+				return self.reply(200, dict(counts))
+		if not path.endswith("/validate"):
+			return self.reply(404, { "message": "Not found" })
+
+		time.sleep(self.delay)
+		claims = verify(self.headers.get("Authorization", "").replace("Bearer ", "", 1).strip())
+		with lock:
+			counts["validated"] += 1
+		if claims is None:
+			return self.reply(401, { "message": "Invalid or expired token" })
+		self.reply(200, { "success": True, "tokenInfo": claims })
+
+def main():
+	parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--port", type = int, default = 8089, help = "Port to listen on.")
+	parser.add_argument("--delay-ms", type = float, default = 0, help = "Simulated network and processing time per call.")
+	parser.add_argument("--lifetime", type = int, default = 3600, help = "Seconds until minted tokens expire.")
+	args = parser.parse_args()
+
+	Handler.lifetime = args.lifetime
+	Handler.delay = args.delay_ms / 1000
+	server = ThreadingHTTPServer(("", args.port), Handler)
+	print("token stub listening on :%d" % args.port)
+	server.serve_forever()
+
+if __name__ == "__main__":
+	main()
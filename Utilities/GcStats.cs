@@ -0,0 +1,44 @@
+using System;
+using System.Diagnostics;
+using Rumble.Platform.Common.Utilities.JsonTools;
+
+namespace PlayerService.Utilities;
+
+/// <summary>
+/// A snapshot of the process's allocation, garbage collection, and CPU counters.  Load tests read it before and after a
+/// run; the difference shows what the run allocated, how many collections it caused, and how much CPU it used.  The
+/// thread pool snapshot is a point-in-time reading instead, sampled during a run.
+/// </summary>
+public class GcStats : PlatformDataModel
+{
+	public long AllocatedBytes { get; set; }
+	public int Gen0Collections { get; set; }
+	public int Gen1Collections { get; set; }
+	public int Gen2Collections { get; set; }
+	public long HeapBytes { get; set; }
+	public long LargeObjectHeapBytes { get; set; }
+	public double PauseTimePercentage { get; set; }
+	public long ProcessorTimeMs { get; set; }
+	public ThreadPoolStats ThreadPool { get; set; }
+
+	public static GcStats Capture()
+	{
+		GCMemoryInfo info = GC.GetGCMemoryInfo();
+
+		return new GcStats
+		{
+			AllocatedBytes = GC.GetTotalAllocatedBytes(),
+			Gen0Collections = GC.CollectionCount(0),
+			Gen1Collections = GC.CollectionCount(1),
+			Gen2Collections = GC.CollectionCount(2),
+			HeapBytes = info.HeapSizeBytes,
+			// Generation 3 is the large object heap.
+			LargeObjectHeapBytes = info.GenerationInfo.Length > 3
+				? info.GenerationInfo[3].SizeAfterBytes
+				: 0,
+			PauseTimePercentage = info.PauseTimePercentage,
+			ProcessorTimeMs = (long)Process.GetCurrentProcess().TotalProcessorTime.TotalMilliseconds,
+			ThreadPool = ThreadPoolStats.Capture()
+		};
+	}
+}
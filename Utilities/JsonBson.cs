@@ -0,0 +1,83 @@
+using System;
+using System.Linq;
+using System.Text.Json;
+using MongoDB.Bson;
+
+namespace PlayerService.Utilities;
+
+/// <summary>
+/// Reads plain JSON straight into BSON, for component data that's written without becoming a RumbleJson tree first.
+/// Unlike BsonDocument.Parse(), only strict JSON is accepted: no extended JSON, shell helpers like NumberLong(), or
+/// keys starting with '$', which a client could otherwise use to store typed values or operator-like fields.  Numbers
+/// are typed by their value alone: Int32 for an integer that fits, Int64 for a larger one, and Double otherwise.  A
+/// repeated key keeps its last value.
+///
+/// Malformed JSON, a top level that isn't an object, and '$' keys throw a FormatException.
+/// </summary>
+public static class JsonBson
+{
+	public static BsonDocument ReadDocument(string json)
+	{
+		try
+		{
+			using JsonDocument document = JsonDocument.Parse(json);
+			return ReadDocument(document.RootElement);
+		}
+		catch (JsonException e)
+		{
+			throw new FormatException(e.Message, e);
+		}
+	}
+
+	public static BsonDocument ReadDocument(JsonElement element) => element.ValueKind == JsonValueKind.Object
+		? (BsonDocument)ReadValue(element)
+		: throw new FormatException($"expected an object, not {element.ValueKind}");
+
+	public static BsonValue ReadValue(JsonElement element) => element.ValueKind switch
+	{
+		JsonValueKind.Object => element
+			.EnumerateObject()
+			.Aggregate(new BsonDocument(), (document, property) => document.Set(Key(property.Name), ReadValue(property.Value))),
+		JsonValueKind.Array => new BsonArray(element.EnumerateArray().Select(ReadValue)),
+		JsonValueKind.String => new BsonString(element.GetString()),
+		JsonValueKind.Number => Number(element),
+		JsonValueKind.True => BsonBoolean.True,
+		JsonValueKind.False => BsonBoolean.False,
+		_ => BsonNull.Value
+	};
+
+	/// <summary>
+	/// Throws if any key in the document, at any depth, starts with '$'.  For data that reached BSON some other way.
+	/// </summary>
+	public static BsonDocument RejectOperators(BsonDocument document)
+	{
+		foreach (BsonElement element in document)
+		{
+			Key(element.Name);
+			Reject(element.Value);
+		}
+		return document;
+	}
+
+	private static void Reject(BsonValue value)
+	{
+		if (value is BsonDocument document)
+			RejectOperators(document);
+		else if (value is BsonArray array)
+			foreach (BsonValue item in array)
+				Reject(item);
+	}
+
+	private static string Key(string name) => name.StartsWith('$')
+		? throw new FormatException($"'{name}' is not a valid key")
+		: name;
+
+	private static BsonValue Number(JsonElement element)
+	{
+		if (element.TryGetInt32(out int asInt))
+			return new BsonInt32(asInt);
+		if (element.TryGetInt64(out long asLong))
+			return new BsonInt64(asLong);
+		return new BsonDouble(element.GetDouble());
+	}
+}
@@ -0,0 +1,126 @@
+using System;
+using System.Collections.Generic;
+using System.IO.Pipelines;
+using System.Text.Json;
+using System.Threading.Tasks;
+using Microsoft.AspNetCore.Http;
+using Microsoft.AspNetCore.Mvc;
+using MongoDB.Driver;
+using Rumble.Platform.Common.Enums;
+using Rumble.Platform.Common.Utilities;
+
+namespace PlayerService.Utilities;
+
+/// <summary>
+/// Writes a JSON object straight to the response body instead of building it in memory first.  Arrays can be fed
+/// from a Mongo cursor, so only one driver batch is alive at a time and each batch is flushed to the client before the
+/// next one is fetched; large accounts no longer need one big list and one big buffer on the large object heap.
+///
+/// Once the first batch is flushed the status code is already sent.  If a later batch fails, the connection is aborted
+/// so the client sees a truncated response rather than a valid-looking partial one.
+/// </summary>
+public class JsonStream
+{
+	// One shared instance; creating options per request is what grows System.Text.Json's internal caches.
+	private static readonly JsonSerializerOptions Options = new()
+	{
+		PropertyNamingPolicy = JsonNamingPolicy.CamelCase
+	};
+
+	private readonly Utf8JsonWriter _writer;
+	private readonly PipeWriter _body;
+
+	private JsonStream(Utf8JsonWriter writer, PipeWriter body)
+	{
+		_writer = writer;
+		_body = body;
+	}
+
+	/// <summary>
+	/// Creates a result that streams the object written by the callback.  The callback writes properties only; the
+	/// enclosing braces are written for it.
+	/// </summary>
+	public static IActionResult Result(Func<JsonStream, Task> write) => new StreamResult(write);
+
+	public void Write<T>(string name, T value)
+	{
+		_writer.WritePropertyName(name);
+		JsonSerializer.Serialize(_writer, value, Options);
+	}
+
+	/// <summary>
+	/// Writes a cursor as an array, one driver batch at a time.  Each element is passed to onElement before it's
+	/// written, so callers can tally what was sent without keeping it.  Returns the number of elements written.
+	/// </summary>
+	public async Task<int> WriteArrayAsync<T>(string name, IAsyncCursor<T> cursor, Action<T> onElement = null)
+	{
+		int count = 0;
+		_writer.WriteStartArray(name);
+		while (await cursor.MoveNextAsync())
+		{
+			foreach (T element in cursor.Current)
+			{
+				onElement?.Invoke(element);
+				JsonSerializer.Serialize(_writer, element, Options);
+				count++;
+			}
+			await FlushAsync();
+		}
+		_writer.WriteEndArray();
+		return count;
+	}
+
+	/// <summary>
+	/// Writes an in-memory collection as an array, flushing every batchSize elements.
+	/// </summary>
+	public async Task WriteArrayAsync<T>(string name, IEnumerable<T> elements, int batchSize = 100)
+	{
+		int count = 0;
+		_writer.WriteStartArray(name);
+		foreach (T element in elements)
+		{
+			JsonSerializer.Serialize(_writer, element, Options);
+			if (++count % batchSize == 0)
+				await FlushAsync();
+		}
+		_writer.WriteEndArray();
+	}
+
+	private async Task FlushAsync()
+	{
+		await _writer.FlushAsync();
+		await _body.FlushAsync();
+	}
+
+	private class StreamResult : IActionResult
+	{
+		private readonly Func<JsonStream, Task> _write;
+
+		public StreamResult(Func<JsonStream, Task> write) => _write = write;
+
+		public async Task ExecuteResultAsync(ActionContext context)
+		{
+			HttpResponse response = context.HttpContext.Response;
+			response.StatusCode = StatusCodes.Status200OK;
+			response.ContentType = "application/json; charset=utf-8";
+
+			await using Utf8JsonWriter writer = new(response.BodyWriter);
+			JsonStream stream = new(writer, response.BodyWriter);
+			try
+			{
+				writer.WriteStartObject();
+				await _write(stream);
+				writer.WriteEndObject();
+				await stream.FlushAsync();
+			}
+			catch (Exception e)
+			{
+				Log.Error(Owner.Will, "Unable to finish a streamed response; aborting the connection.", data: new
+				{
+					Path = context.HttpContext.Request.Path.Value
+				}, exception: e);
+				context.HttpContext.Abort();
+			}
+		}
+	}
+}
@@ -0,0 +1,152 @@
+using System;
+using System.Collections.Concurrent;
+using System.Collections.Generic;
+using System.Diagnostics;
+using System.Globalization;
+using System.Linq;
+using System.Text;
+using System.Threading;
+
+namespace PlayerService.Utilities;
+
+/// <summary>
+/// Per-request phase durations and counters.  TimingFilter starts one for every request; code on the hot path wraps
+/// work in Measure("phase") and calls Count("counter") without needing a reference to it, since the current request's
+/// timings flow with the async context.  Outside a request both are no-ops.
+///
+/// At the end of the request the phases are sent back in a Server-Timing header and added to process-wide histograms,
+/// which /admin/metrics exposes in the Prometheus text format.
+/// </summary>
+public class RequestTimings
+{
+	public const string COUNTER_MONGO = "mongo";
+	public const string COUNTER_RETRIES = "retries";
+
+	// Milliseconds; Prometheus buckets are cumulative, so each one counts everything at or below its bound.
+	private static readonly double[] Buckets = { 1, 2, 5, 10, 25, 50, 100, 250, 500, 1_000, 2_500, 5_000, 10_000 };
+
+	private static readonly AsyncLocal<RequestTimings> Ambient = new();
+	private static readonly ConcurrentDictionary<(string route, string phase), Histogram> Phases = new();
+	private static readonly ConcurrentDictionary<(string route, string counter), long[]> Counters = new();
+
+	private readonly long _started = Stopwatch.GetTimestamp();
+	private readonly ConcurrentDictionary<string, double> _phases = new();
+	private readonly ConcurrentDictionary<string, int> _counters = new();
+
+	public static RequestTimings Current => Ambient.Value;
+
+	public static RequestTimings Start() => Ambient.Value = new RequestTimings();
+
+	public static Scope Measure(string phase) => new(Current, phase);
+
+	/// <summary>
+	/// Adds time measured some other way to a phase, e.g. when the start and end aren't in the same scope.
+	/// </summary>
+	public static void Add(string phase, double ms) => Current?._phases.AddOrUpdate(phase, ms, (_, value) => value + ms);
+
+	public static void Count(string counter, int amount = 1) => Current?._counters.AddOrUpdate(counter, amount, (_, value) => value + amount);
+
+	public double ElapsedMs => Stopwatch.GetElapsedTime(_started).TotalMilliseconds;
+
+	/// <summary>
+	/// Formats the request's phases as a Server-Timing header value, e.g. "items;dur=3.2, mongo;desc=\"4\", total;dur=9.8".
+	/// A phase measured more than once, such as a component write retried with its transaction, is the sum of its runs.
+	/// </summary>
+	public string ToHeader()
+	{
+		IEnumerable<string> phases = _phases
+			.OrderBy(pair => pair.Key, StringComparer.Ordinal)
+			.Select(pair => $"{pair.Key};dur={pair.Value.ToString("0.0", CultureInfo.InvariantCulture)}");
+		IEnumerable<string> counters = _counters
+			.OrderBy(pair => pair.Key, StringComparer.Ordinal)
+			.Select(pair => $"{pair.Key};desc=\"{pair.Value}\"");
+
+		return string.Join(", ", phases
+			.Concat(counters)
+			.Append($"total;dur={ElapsedMs.ToString("0.0", CultureInfo.InvariantCulture)}")
+		);
+	}
+
+	/// <summary>
+	/// Adds this request to the process-wide histograms under the route it was served by.
+	/// </summary>
+	public void Record(string route)
+	{
+		foreach ((string phase, double ms) in _phases.Append(new KeyValuePair<string, double>("total", ElapsedMs)))
+			Phases.GetOrAdd((route, phase), _ => new Histogram()).Observe(ms);
+		foreach ((string counter, int value) in _counters)
+			Interlocked.Add(ref Counters.GetOrAdd((route, counter), _ => new long[1])[0], value);
+	}
+
+	public static string Prometheus()
+	{
+		StringBuilder output = new();
+		output.AppendLine("# HELP player_request_phase_ms Time spent in each phase of a request, in milliseconds.");
+		output.AppendLine("# TYPE player_request_phase_ms histogram");
+		foreach (((string route, string phase), Histogram histogram) in Phases.OrderBy(pair => pair.Key))
+		{
+			string labels = $"route=\"{route}\",phase=\"{phase}\"";
+			long[] counts = histogram.Snapshot(out long count, out double sum);
+			long cumulative = 0;
+			for (int i = 0; i < Buckets.Length; i++)
+			{
+				cumulative += counts[i];
+				output.AppendLine($"player_request_phase_ms_bucket{{{labels},le=\"{Buckets[i].ToString(CultureInfo.InvariantCulture)}\"}} {cumulative}");
+			}
+			output.AppendLine($"player_request_phase_ms_bucket{{{labels},le=\"+Inf\"}} {count}");
+			output.AppendLine($"player_request_phase_ms_sum{{{labels}}} {sum.ToString("0.###", CultureInfo.InvariantCulture)}");
+			output.AppendLine($"player_request_phase_ms_count{{{labels}}} {count}");
+		}
+
+		output.AppendLine("# HELP player_request_operations_total Mongo operations and retries made while serving requests.");
+		output.AppendLine("# TYPE player_request_operations_total counter");
+		foreach (((string route, string counter), long[] value) in Counters.OrderBy(pair => pair.Key))
+			output.AppendLine($"player_request_operations_total{{route=\"{route}\",counter=\"{counter}\"}} {Interlocked.Read(ref value[0])}");
+
+		return output.ToString();
+	}
+
+	public readonly struct Scope : IDisposable
+	{
+		private readonly RequestTimings _timings;
+		private readonly string _phase;
+		private readonly long _started;
+
+		public Scope(RequestTimings timings, string phase)
+		{
+			_timings = timings;
+			_phase = phase;
+			_started = timings == null ? 0 : Stopwatch.GetTimestamp();
+		}
+
+		public void Dispose()
+		{
+			if (_timings == null)
+				return;
+			double ms = Stopwatch.GetElapsedTime(_started).TotalMilliseconds;
+			_timings._phases.AddOrUpdate(_phase, ms, (_, value) => value + ms);
+		}
+	}
+
+	private class Histogram
+	{
+		private readonly long[] _counts = new long[Buckets.Length + 1];
+		private long _count;
+		private long _sumMicroseconds;
+
+		public void Observe(double ms)
+		{
+			int bucket = Array.FindIndex(Buckets, bound => ms <= bound);
+			Interlocked.Increment(ref _counts[bucket < 0 ? Buckets.Length : bucket]);
+			Interlocked.Increment(ref _count);
+			Interlocked.Add(ref _sumMicroseconds, (long)(ms * 1_000));
+		}
+
+		public long[] Snapshot(out long count, out double sum)
+		{
+			count = Interlocked.Read(ref _count);
+			sum = Interlocked.Read(ref _sumMicroseconds) / 1_000d;
+			return (long[])_counts.Clone();
+		}
+	}
+}
@@ -0,0 +1,115 @@
+using System;
+using System.Collections.Generic;
+using System.Linq;
+
+namespace PlayerService.Utilities;
+
+/// <summary>
+/// Counts recent events per key in memory.  Each key keeps only its newest timestamps, up to the limit passed in, which
+/// is all a threshold check needs.  Keys are spread across independently locked shards so a burst on one key doesn't
+/// block the rest, and each shard holds a bounded number of keys; when one fills up, expired keys are dropped first,
+/// then the key that has been quiet the longest.
+/// </summary>
+public class SlidingWindowCounter
+{
+	private const int SHARDS = 64;
+
+	private class Shard
+	{
+		public readonly Dictionary<string, Queue<long>> Windows = new();
+	}
+
+	private readonly Shard[] _shards = Enumerable.Range(0, SHARDS).Select(_ => new Shard()).ToArray();
+	private readonly int _keysPerShard;
+
+	public SlidingWindowCounter(int maxKeys) => _keysPerShard = Math.Max(1, maxKeys / SHARDS);
+
+	public int Count => _shards.Sum(shard =>
+	{
+		lock (shard)
+			return shard.Windows.Count;
+	});
+
+	private Shard For(string key) => _shards[(key.GetHashCode() & int.MaxValue) % SHARDS];
+
+	/// <summary>
+	/// Returns the timestamps for the key newer than the cutoff, newest first.
+	/// </summary>
+	public long[] Recent(string key, long cutoff)
+	{
+		Shard shard = For(key);
+		lock (shard)
+			return shard.Windows.TryGetValue(key, out Queue<long> window)
+				? window.Where(timestamp => timestamp > cutoff).Reverse().ToArray()
+				: Array.Empty<long>();
+	}
+
+	/// <summary>
+	/// Records an event and returns the key's timestamps newer than the cutoff, newest first.
+	/// </summary>
+	public long[] Add(string key, long timestamp, long cutoff, int keep)
+	{
+		Shard shard = For(key);
+		lock (shard)
+		{
+			if (!shard.Windows.TryGetValue(key, out Queue<long> window))
+			{
+				if (shard.Windows.Count >= _keysPerShard)
+					Evict(shard, cutoff);
+				shard.Windows[key] = window = new Queue<long>();
+			}
+
+			window.Enqueue(timestamp);
+			while (window.Count > Math.Max(1, keep) || window.Count > 0 && window.Peek() <= cutoff)
+				window.Dequeue();
+
+			return window.Reverse().ToArray();
+		}
+	}
+
+	/// <summary>
+	/// Merges timestamps recorded elsewhere, e.g. by another pod, into the key's window.
+	/// </summary>
+	public void Merge(string key, IEnumerable<long> timestamps, long cutoff, int keep)
+	{
+		Shard shard = For(key);
+		lock (shard)
+		{
+			shard.Windows.TryGetValue(key, out Queue<long> window);
+			long[] merged = (window ?? Enumerable.Empty<long>())
+				.Union(timestamps)
+				.Where(timestamp => timestamp > cutoff)
+				.OrderBy(timestamp => timestamp)
+				.TakeLast(Math.Max(1, keep))
+				.ToArray();
+			if (!merged.Any())
+				return;
+			if (window == null && shard.Windows.Count >= _keysPerShard)
+				Evict(shard, cutoff);
+			shard.Windows[key] = new Queue<long>(merged);
+		}
+	}
+
+	public void Remove(Func<string, bool> predicate)
+	{
+		foreach (Shard shard in _shards)
+			lock (shard)
+				foreach (string key in shard.Windows.Keys.Where(predicate).ToArray())
+					shard.Windows.Remove(key);
+	}
+
+	private static void Evict(Shard shard, long cutoff)
+	{
+		string[] expired = shard.Windows
+			.Where(pair => pair.Value.LastOrDefault() <= cutoff)
+			.Select(pair => pair.Key)
+			.ToArray();
+		foreach (string key in expired)
+			shard.Windows.Remove(key);
+		if (expired.Any())
+			return;
+
+		string quietest = shard.Windows.MinBy(pair => pair.Value.LastOrDefault()).Key;
+		shard.Windows.Remove(quietest);
+	}
+}
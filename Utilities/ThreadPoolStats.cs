@@ -0,0 +1,32 @@
+using System.Threading;
+using Rumble.Platform.Common.Utilities.JsonTools;
+
+namespace PlayerService.Utilities;
+
+/// <summary>
+/// A snapshot of thread pool usage, part of GET /admin/gc, so load tests can see starvation as it happens rather than
+/// inferring it from latency.
+/// </summary>
+public class ThreadPoolStats : PlatformDataModel
+{
+	public int ThreadCount { get; set; }
+	public long PendingWorkItems { get; set; }
+	public long CompletedWorkItems { get; set; }
+	public int AvailableWorkers { get; set; }
+	public int MinWorkers { get; set; }
+
+	public static ThreadPoolStats Capture()
+	{
+		ThreadPool.GetAvailableThreads(out int available, out int _);
+		ThreadPool.GetMinThreads(out int min, out int _);
+
+		return new ThreadPoolStats
+		{
+			ThreadCount = ThreadPool.ThreadCount,
+			PendingWorkItems = ThreadPool.PendingWorkItemCount,
+			CompletedWorkItems = ThreadPool.CompletedWorkItemCount,
+			AvailableWorkers = available,
+			MinWorkers = min
+		};
+	}
+}
@@ -0,0 +1,118 @@
+using System;
+using System.IO;
+using System.IO.Compression;
+using System.Linq;
+using System.Text;
+using System.Threading.Tasks;
+using MessagePack;
+using Microsoft.AspNetCore.Builder;
+using Microsoft.AspNetCore.Hosting;
+using Microsoft.AspNetCore.Http;
+using Microsoft.AspNetCore.ResponseCompression;
+using Microsoft.Extensions.DependencyInjection;
+using Microsoft.Net.Http.Headers;
+
+namespace PlayerService.Utilities;
+
+/// <summary>
+/// Smaller bodies for the routes that carry whole player profiles: /update, /read, and /items.  On those routes:
+///
+///   * Request bodies sent with Content-Encoding gzip or br are decompressed.
+///   * Responses are compressed when Accept-Encoding allows it, preferring br.
+///   * A request body sent as application/x-msgpack is converted to JSON, and a response is converted to MessagePack
+///     when the request Accepts it.  Controllers and models only ever see JSON.
+///
+/// Registered as a startup filter so it wraps the whole pipeline, including the platform's own middleware.  Other
+/// routes are untouched.
+/// </summary>
+public class WireEncoding : IStartupFilter
+{
+	public const string MESSAGE_PACK = "application/x-msgpack";
+
+	private static readonly PathString[] Routes =
+	{
+		new("/player/v2/update"),
+		new("/player/v2/read"),
+		new("/player/v2/items")
+	};
+
+	public static void Register(IServiceCollection services)
+	{
+		services.AddRequestDecompression();
+		// Responses on these routes carry the player's token.  The bodies don't reflect attacker-controlled input next
+		// to it, which is what compression side channels (BREACH) need, so compressing over HTTPS is allowed.
+		services.AddResponseCompression(options =>
+		{
+			options.EnableForHttps = true;
+			options.Providers.Add<BrotliCompressionProvider>();
+			options.Providers.Add<GzipCompressionProvider>();
+			options.MimeTypes = ResponseCompressionDefaults.MimeTypes.Append(MESSAGE_PACK);
+		});
+		// The default levels are tuned for static files; these bodies are compressed once, per request.
+		services.Configure<BrotliCompressionProviderOptions>(options => options.Level = CompressionLevel.Fastest);
+		services.Configure<GzipCompressionProviderOptions>(options => options.Level = CompressionLevel.Fastest);
+		services.AddTransient<IStartupFilter, WireEncoding>();
+	}
+
+	public Action<IApplicationBuilder> Configure(Action<IApplicationBuilder> next) => app =>
+	{
+		// Compression is outermost, so it compresses whatever the transcoder produces.
+		app.UseWhen(context => Routes.Any(route => context.Request.Path.StartsWithSegments(route)), branch => branch
+			.UseResponseCompression()
+			.UseRequestDecompression()
+			.Use(TranscodeAsync)
+		);
+		next(app);
+	};
+
+	private static bool IsMessagePack(string contentType) => MediaTypeHeaderValue.TryParse(contentType, out MediaTypeHeaderValue type)
+		&& type.MediaType.Equals(MESSAGE_PACK, StringComparison.OrdinalIgnoreCase);
+
+	private static async Task TranscodeAsync(HttpContext context, Func<Task> next)
+	{
+		HttpRequest request = context.Request;
+		if (IsMessagePack(request.ContentType))
+		{
+			await using MemoryStream packed = new();
+			await request.Body.CopyToAsync(packed);
+			byte[] json = Encoding.UTF8.GetBytes(MessagePackSerializer.ConvertToJson(packed.GetBuffer().AsMemory(0, (int)packed.Length)));
+			request.Body = new MemoryStream(json);
+			request.ContentType = "application/json; charset=utf-8";
+			request.ContentLength = json.Length;
+		}
+
+		if (!request.GetTypedHeaders().Accept.Any(accept => accept.MediaType.Equals(MESSAGE_PACK, StringComparison.OrdinalIgnoreCase)))
+		{
+			await next();
+			return;
+		}
+
+		// The response has to be complete before it can be converted, so streamed responses are buffered here.
+		HttpResponse response = context.Response;
+		Stream original = response.Body;
+		await using MemoryStream buffer = new();
+		response.Body = buffer;
+		try
+		{
+			await next();
+		}
+		finally
+		{
+			response.Body = original;
+		}
+
+		buffer.Position = 0;
+		if (buffer.Length == 0 || response.ContentType?.StartsWith("application/json", StringComparison.OrdinalIgnoreCase) != true)
+		{
+			await buffer.CopyToAsync(original);
+			return;
+		}
+
+		using StreamReader reader = new(buffer, Encoding.UTF8);
+		byte[] output = MessagePackSerializer.ConvertFromJson(reader);
+		response.ContentType = MESSAGE_PACK;
+		response.ContentLength = output.Length;
+		response.Headers.Append(HeaderNames.Vary, HeaderNames.Accept);
+		await original.WriteAsync(output);
+	}
+}